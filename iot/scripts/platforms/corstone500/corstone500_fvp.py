@@ -42,8 +42,16 @@ a5dsDefaultConfig = {
     "host_uart0"     : "css.uart_0.out_file",
 
     # Telnet parameters
+    # The telnet port is leased when the FVP is instantiated, as the first
+    # free port starting from telnet_port_base
     "telnet_host"           : 'localhost',
-    "host_telnet_port0"     : 5000,
+    "telnet_port_base"      : 5000,
+    "host_telnet_param0"    : "css.terminal_0.start_port",
+
+    # Failure strings, aborting a test as soon as they are found
+    "host_fail_strs"        : ["Kernel panic - not syncing",
+                               "Internal error: Oops",
+                               "ERROR:   "],      # TF-A error messages
 
     # =============== Test parameters ==============
     "linux_login_prompt"    : "corstone500 login:",
@@ -63,10 +71,12 @@ a5dsDefaultTestspec = {
     "board_flash"   : None,       # Board flash image
     "host_stop_str" : None,       # Stop condition string for Host
     "host_ver_strs" : [],     # Verification strings for Host
+    "host_fail_strs": [],     # Failure strings for Host, added to the platform ones
 }
 
 class A5dsFVP(FVPWrapper):
-    def __init__(self, testspec, fvp_path, image_dir, usermode, fvp_timeout, stdin):
+    def __init__(self, testspec, fvp_path, image_dir, usermode, fvp_timeout, stdin,
+                 **kwargs):
         FVPWrapper.__init__(
             self,
             fvp_path=fvp_path,
@@ -75,34 +85,46 @@ class A5dsFVP(FVPWrapper):
             work_dir=a5ds_dir,
             fvp_timeout=fvp_timeout,
             testname=testspec['name'],
-            stdin=stdin
+            stdin=stdin,
+            **kwargs
         )
 
         self.config = a5dsDefaultConfig
         self.testspec = self.parseTestspec(testspec)
         self.image_dir = image_dir
 
+        host0_port = self.leasePorts(1, self.config['telnet_port_base'])[0]
+
         # Define watchers for each terminal
         # Host terminal 0 watcher
-        host0_watcher = TelnetWatcher(
+        # The stop string, verification strings and test commands of the
+        # watcher are set by applyTestspec
+        self.host0_watcher = TelnetWatcher(
                 name="host0",
                 termfile=os.path.join(self.work_dir, self.log_dir, self.testspec['name'] + "_host0.txt"),
-                stop_str=self.testspec['host_stop_str'],
+                stop_str=None,
                 fvp_uart=self.config['host_uart0'],
-                port=self.config['host_telnet_port0'],
+                port=host0_port,
+                fvp_port_param=self.config['host_telnet_param0'],
                 sys_stop_str=self.config['stop_cnd'],
-                verification_strs=self.testspec['host_ver_strs']
+                fail_strs=self.config['host_fail_strs'],
             )
         # We define an initial command sequence for host0 which will login
         # and await until a user can enter commands
-        host0_watcher.addCommand('r', self.config['linux_login_prompt'])
-        host0_watcher.addCommand('w', self.config['linux_user'])
-        host0_watcher.addCommand('r', self.config['linux_shstring'])
-        # Once the host is logged in, we add the user-provided test commands
-        for commandtype, command in self.testspec['commands']:
-            host0_watcher.addCommand(commandtype, command)
-        self.watchers.append(host0_watcher)
+        self.host0_watcher.addCommand('r', self.config['linux_login_prompt'], boot=True)
+        self.host0_watcher.addCommand('w', self.config['linux_user'], boot=True)
+        self.host0_watcher.addCommand('r', self.config['linux_shstring'], boot=True)
+        self.watchers.append(self.host0_watcher)
 
+        self.applyTestspec(self.testspec)
+
+    def applyTestspec(self, testspec):
+        testspec = self.parseTestspec(testspec)
+        self.host0_watcher.setTestStrings(testspec['host_stop_str'], testspec['host_ver_strs'],
+                                          testspec['host_fail_strs'])
+        # Once the host is logged in, we add the user-provided test commands
+        for commandtype, command in testspec['commands']:
+            self.host0_watcher.addCommand(commandtype, command)
 
     def getModelParameters(self):
         # Assign images to FVP flashloaders
@@ -125,6 +147,6 @@ class A5dsFVP(FVPWrapper):
             sys.exit(1)
 
         # Merge user-specified arguments with default test specification
-        defaultTestspec = a5dsDefaultTestspec
+        defaultTestspec = dict(a5dsDefaultTestspec)
         defaultTestspec.update(testspec)
         return defaultTestspec
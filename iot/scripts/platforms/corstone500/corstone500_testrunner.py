@@ -45,6 +45,9 @@ class A5dsTestRunner(TestRunner):
         self.registerTest({
             'name'          :   "boot_test",
             'description'   :   "Test A5 Boot",
+            # Verifies the boot of the model, which must not be started from
+            # a checkpoint
+            'clean_boot'    :   True,
             'commands'      :   [
                                     ('w', "uname -srmn"),
             ],
@@ -44,11 +44,24 @@ corstone700DefaultConfig = {
     "es_uart"       : "extsys0.uart{0}.out_file",
 
     # Telnet parameters
+    # The telnet ports are leased when the FVP is instantiated, as a range of
+    # free ports starting from telnet_port_base. Within the range, the ports
+    # are assigned in the order host0, host1, se, es0...
     "telnet_host"           : 'localhost',
-    "host_telnet_port0"     : 5000,
-    "host_telnet_port1"     : 5001,
-    "se_telnet_port0"       : 5002,
-    "es_telnet_ports"       : [5003,-1,-1,-1],
+    "telnet_port_base"      : 5000,
+
+    # Telnet terminal port parameters
+    "host_telnet_param0"    : "host.telnetterminal0.start_port",
+    "host_telnet_param1"    : "host.telnetterminal1.start_port",
+    "se_telnet_param0"      : "se.telnetterminal0.start_port",
+    "es_telnet_param"       : "extsys{0}.telnetterminal0.start_port",
+
+    # Failure strings, aborting a test as soon as they are found
+    "host_fail_strs"        : ["Kernel panic - not syncing",
+                               "Internal error: Oops",
+                               "ERROR:   "],      # TF-A error messages
+    "se_fail_strs"          : [],
+    "es_fail_strs"          : ["HardFault"],
 
     # =============== Test parameters ==============
     "linux_login_prompt"    : "corstone700-fvp login:",
@@ -73,11 +86,15 @@ corstone700DefaultTestspec = {
     "es_stop_strs"  : [None],     # Stop condition string for ES
     "host_ver_strs" : [],     # Verification strings for Host
     "se_ver_strs"   : [],     # Verification strings for SE
-    "es_ver_strs"   : [[]]    # Verification strings for ES
+    "es_ver_strs"   : [[]],   # Verification strings for ES
+    "host_fail_strs": [],     # Failure strings for Host, added to the platform ones
+    "se_fail_strs"  : [],     # Failure strings for SE, added to the platform ones
+    "es_fail_strs"  : [[]]    # Failure strings for ES, added to the platform ones
 }
 
 class Corstone700FVP(FVPWrapper):
-    def __init__(self, testspec, fvp_path, image_dir, usermode, fvp_timeout, stdin):
+    def __init__(self, testspec, fvp_path, image_dir, usermode, fvp_timeout, stdin,
+                 **kwargs):
         FVPWrapper.__init__(
             self,
             fvp_path=fvp_path,
@@ -86,33 +103,44 @@ class Corstone700FVP(FVPWrapper):
             work_dir=corstone700_dir,
             fvp_timeout=fvp_timeout,
             testname=testspec['name'],
-            stdin=stdin
+            stdin=stdin,
+            **kwargs
         )
 
         self.config = corstone700DefaultConfig
         self.testspec = self.parseTestspec(testspec)
         self.image_dir = image_dir
 
+        # External system watchers. For now, only ES 0 is created
+        self.es_cnt = 1
+
+        telnet_ports = self.leasePorts(3 + self.es_cnt, self.config['telnet_port_base'])
+        host0_port, host1_port, se_port = telnet_ports[:3]
+        es_ports = telnet_ports[3:]
+
         # Define watchers for each terminal
         # Host terminal 0 watcher
-        host0_watcher = TelnetWatcher(
+        # The stop strings, verification strings and test commands of the
+        # watchers are set by applyTestspec
+        self.host0_watcher = TelnetWatcher(
                 name="host0",
                 termfile=os.path.join(self.work_dir, self.log_dir, self.testspec['name'] + "_host0.txt"),
-                stop_str=self.testspec['host_stop_str'],
+                stop_str=None,
                 fvp_uart=self.config['host_uart0'],
-                port=self.config['host_telnet_port0'],
+                port=host0_port,
+                fvp_port_param=self.config['host_telnet_param0'],
                 sys_stop_str=self.config['stop_cnd'],
-                verification_strs=self.testspec['host_ver_strs']
+                fail_strs=self.config['host_fail_strs'],
             )
         # We define an initial command sequence for host0 which will login
         # and await until a user can enter commands
-        host0_watcher.addCommand('r', self.config['linux_login_prompt'])
-        host0_watcher.addCommand('w', self.config['linux_user'])
-        host0_watcher.addCommand('r', self.config['linux_shstring'])
-        # Once the host is logged in, we add the user-provided test commands
-        for commandtype, command in self.testspec['commands']:
-            host0_watcher.addCommand(commandtype, command)
-        self.watchers.append(host0_watcher)
+        self.host0_watcher.addCommand('r', self.config['linux_login_prompt'], boot=True)
+        self.host0_watcher.addCommand('w', self.config['linux_user'], boot=True)
+        self.host0_watcher.addCommand('r', self.config['linux_shstring'], boot=True)
+        # The tests change the working directory, which is part of the prompt
+        # awaited between the tests of a batch
+        self.host0_watcher.setPrompt("# ")
+        self.watchers.append(self.host0_watcher)
 
         # Host terminal 1 watcher
         self.watchers.append(
@@ -121,39 +149,58 @@ class Corstone700FVP(FVPWrapper):
                 termfile=os.path.join(self.work_dir, self.log_dir, self.testspec['name'] + "_host1.txt"),
                 stop_str=None,
                 fvp_uart=self.config['host_uart1'],
-                port=self.config['host_telnet_port1'],
+                port=host1_port,
+                fvp_port_param=self.config['host_telnet_param1'],
                 sys_stop_str=self.config['stop_cnd'],
+                fail_strs=self.config['host_fail_strs'],
             )
         )
 
 
         # se watcher
-        self.watchers.append(
-            TelnetWatcher(
+        self.se_watcher = TelnetWatcher(
                 name="se",
                 termfile=os.path.join(self.work_dir, self.log_dir, self.testspec['name'] + "_se.txt"),
                 fvp_uart=self.config['se_uart'],
-                stop_str=self.testspec['se_stop_str'],
-                port=self.config['se_telnet_port0'],
+                stop_str=None,
+                port=se_port,
+                fvp_port_param=self.config['se_telnet_param0'],
                 sys_stop_str=self.config['stop_cnd'],
-                verification_strs=self.testspec['se_ver_strs']
+                fail_strs=self.config['se_fail_strs'],
             )
-        )
+        self.watchers.append(self.se_watcher)
 
-        # External system watchers. For now, only ES 0 is created
-        self.es_cnt = 1
+        self.es_watchers = []
         for i in range(0, self.es_cnt):
-            self.watchers.append(TelnetWatcher(
+            self.es_watchers.append(TelnetWatcher(
                     name="es{0}".format(str(i)),
                     termfile=os.path.join(self.work_dir, self.log_dir, self.testspec['name'] +
                                 "_es{0}.txt".format(str(i))),
                     fvp_uart=self.config['es_uart'].format(str(i)),
-                    stop_str=self.testspec['es_stop_strs'][i],
-                    port=self.config['es_telnet_ports'][i],
+                    stop_str=None,
+                    port=es_ports[i],
+                    fvp_port_param=self.config['es_telnet_param'].format(str(i)),
                     sys_stop_str=self.config['stop_cnd'],
-                    verification_strs=self.testspec['es_ver_strs'][i]
+                    fail_strs=self.config['es_fail_strs'],
                 )
             )
+        self.watchers.extend(self.es_watchers)
+
+        self.applyTestspec(self.testspec)
+
+    def applyTestspec(self, testspec):
+        testspec = self.parseTestspec(testspec)
+        self.host0_watcher.setTestStrings(testspec['host_stop_str'], testspec['host_ver_strs'],
+                                          testspec['host_fail_strs'])
+        # Once the host is logged in, we add the user-provided test commands
+        for commandtype, command in testspec['commands']:
+            self.host0_watcher.addCommand(commandtype, command)
+        self.se_watcher.setTestStrings(testspec['se_stop_str'], testspec['se_ver_strs'],
+                                       testspec['se_fail_strs'])
+        for i, es_watcher in enumerate(self.es_watchers):
+            es_fail_strs = testspec['es_fail_strs'][i] if i < len(testspec['es_fail_strs']) else []
+            es_watcher.setTestStrings(testspec['es_stop_strs'][i], testspec['es_ver_strs'][i],
+                                      es_fail_strs)
 
     def getModelParameters(self):
         # Assign images to FVP flashloaders
@@ -179,6 +226,6 @@ class Corstone700FVP(FVPWrapper):
             sys.exit(1)
 
         # Merge user-specified arguments with default test specification
-        defaultTestspec = corstone700DefaultTestspec
+        defaultTestspec = dict(corstone700DefaultTestspec)
         defaultTestspec.update(testspec)
         return defaultTestspec
@@ -46,6 +46,10 @@ class Corstone700TestRunner(TestRunner):
         self.registerTest({
             'name' : "es_boot",
             'description'   :   "Test external system boot",
+            # The boot banner of the external system is only printed once per
+            # model boot, the test can neither be batched with other tests
+            # nor started from a checkpoint
+            'clean_boot'    :   True,
             'commands'      :   [
                                     ('w', "cd /usr/bin/"),
                                     ('r', "/usr/bin#"),
@@ -0,0 +1,289 @@
+#!/usr/bin/env python2.7
+# Python 2.7 is <required> for fm.debug
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import sys
+import os
+import gzip
+import shutil
+refinfra_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join((refinfra_dir),'..','..', 'test'))
+from fvp_wrapper import FVPWrapper, TelnetWatcher
+
+""" refinfra_fvp.py
+This file contains the FVP subclass of the generic FVP wrapper class for the
+SGI and RD-Infra platforms (SGI-575, RD-N1-Edge, RD-E1-Edge, RD-Daniel), which
+share the layout of their UARTs and firmware images.
+Upon instantiation, telnet watchers are created for the UARTs of the platform
+(TF-A/Linux console, MM, AP console, SCP and MCP), and - using the provided
+test specification - watchers are set up with their respective stop and
+verification conditions. It replaces the run_model.sh scripts of sgi/ and
+rdinfra/ for the single chip platforms.
+"""
+
+
+""" refinfraPlatforms
+Model specific parameters of the supported platforms: the CMN interconnect of
+the model and its mesh configuration file, found in the directory of the FVP
+binary, and additional model parameters and environment variables.
+"""
+refinfraTzcBypass = {}
+for tzc in range(4):
+    refinfraTzcBypass.update({
+        "css.mem.tzc{0}.tzc400.rst_gate_keeper".format(tzc)          : "0x0f",
+        "css.mem.tzc{0}.tzc400.rst_region_attributes_0".format(tzc)  : "0xc000000f",
+        "css.mem.tzc{0}.tzc400.rst_region_id_access_0".format(tzc)   : "0xffffffff",
+    })
+
+refinfraPlatforms = {
+    "sgi575"    : {"name": "SGI-575", "cmn": "css.cmn600",
+                   "mesh_config": "SGI-575_cmn600.yml"},
+    "rdn1edge"  : {"name": "RD-N1-Edge", "cmn": "css.cmn600",
+                   "mesh_config": "RD_N1_E1_cmn600.yml"},
+    "rde1edge"  : {"name": "RD-E1-Edge", "cmn": "css.cmn600",
+                   "mesh_config": "RD_N1_E1_cmn600.yml"},
+    "rddaniel"  : {"name": "RD-Daniel", "cmn": "css.cmn_rhodes",
+                   "mesh_config": "rhodes_daniel_cfgm.yml",
+                   "params": refinfraTzcBypass,
+                   "env": {"FASTSIM_CMN600_INTERNAL_RNSAM": "1"}},
+}
+
+# Watched terminals, in the order of their telnet ports
+refinfraTerminals = ["armtf", "mm", "console", "scp", "mcp"]
+
+"""refinfraDefaultConfig
+default SGI/RD-Infra configuration parameters.
+Note that these are fully platform dependant, and are only specified in the
+following map to provide a clear overview of what the configuration constants
+of this script are.
+"""
+refinfraDefaultConfig = {
+    # =============== FVP Parameters ===============
+    # Stop condition
+    "stop_cnd" : "/OSCI/SystemC: Simulation stopped by user",
+
+    # ROM, RAM & Flash loaders
+    "mcp_romloader"     : "css.mcp.ROMloader.fname",
+    "scp_romloader"     : "css.scp.ROMloader.fname",
+    "scp_ramloader"     : "css.scp.armcortexm7ct",
+    "scp_ram_address"   : "0x0BD80000",
+    "bl1_loader"        : "css.trustedBootROMloader.fname",
+    "fip_loader"        : "board.flashloader0.fname",
+    "nor_flashloaders"  : ["board.flashloader1", "board.flashloader2"],
+    "nor_flash_size"    : 64 * 1024 * 1024,
+
+    # Disks
+    "virtio_disk"       : "board.virtioblockdevice.image_path",
+    "sata_disk"         : "pci.ahci.ahci.image_path",
+
+    # UART logs
+    "armtf_uart"        : "soc.pl011_uart0",        # TF-A, UEFI and Linux
+    "mm_uart"           : "soc.pl011_uart1",        # Standalone MM
+    "console_uart"      : "css.pl011_uart_ap",
+    "scp_uart"          : "css.scp.pl011_uart_scp",
+    "mcp_uart"          : "soc.pl011_uart_mcp",
+
+    # Telnet parameters
+    # The telnet ports are leased when the FVP is instantiated, as a range of
+    # free ports starting from telnet_port_base. Within the range, the ports
+    # are assigned in the order of refinfraTerminals
+    "telnet_host"       : 'localhost',
+    "telnet_port_base"  : 5000,
+
+    # Telnet terminals of the UARTs
+    "armtf_terminal"    : "soc.terminal_s0",
+    "mm_terminal"       : "soc.terminal_s1",
+    "console_terminal"  : "css.terminal_uart_ap",
+    "scp_terminal"      : "css.scp.terminal_uart_aon",
+    "mcp_terminal"      : "soc.terminal_mcp",
+    # Terminals which are not watched. No terminal starts a telnet client
+    "other_terminals"   : ["css.mcp.terminal_uart0", "css.mcp.terminal_uart1",
+                           "css.terminal_uart1_ap", "board.terminal_0",
+                           "board.terminal_1"],
+
+    # Failure strings, aborting a test as soon as they are found
+    "armtf_fail_strs"   : ["Kernel panic - not syncing",
+                           "Internal error: Oops",
+                           "ERROR:   "],        # TF-A error messages
+    "mm_fail_strs"      : [],
+    "console_fail_strs" : [],
+    "scp_fail_strs"     : [],
+    "mcp_fail_strs"     : [],
+}
+
+
+""" refinfraDefaultTestspec
+Test-specification parameters for the SGI/RD-Infra platforms.
+Note that this is fully platform-dependant, and only used during the
+initialization of RefInfraFVP.
+Disk images may refer to the image and prebuilts directories as {image_dir}
+and {prebuilts_dir}.
+"""
+refinfraDefaultTestspec = {
+    "name"              : None,     # Test name
+    "commands"          : [],       # Commands to execute on the TF-A/Linux console
+    "boot_commands"     : [],       # Commands bringing the console to a shell (ie. login)
+    "bl1"               : "tf-bl1.bin",     # Trusted boot ROM image
+    "fip"               : "fip-uefi.bin",   # FIP image
+    "virtio_image"      : None,     # Virtio block device image
+    "sata_image"        : None,     # SATA disk image
+    "platform_fail_strs": True,     # Abort on the failure strings of the platform
+}
+for terminal in refinfraTerminals:
+    refinfraDefaultTestspec.update({
+        terminal + "_stop_str"  : None,     # Stop condition string
+        terminal + "_ver_strs"  : [],       # Verification strings
+        terminal + "_fail_strs" : [],       # Failure strings, added to the platform ones
+    })
+
+class RefInfraFVP(FVPWrapper):
+    def __init__(self, testspec, fvp_path, platform, image_dir, prebuilts_dir,
+                 usermode, fvp_timeout, stdin, **kwargs):
+        FVPWrapper.__init__(
+            self,
+            fvp_path=fvp_path,
+            fvp_name=refinfraPlatforms[platform]['name'],
+            usermode=usermode,
+            work_dir=refinfra_dir,
+            fvp_timeout=fvp_timeout,
+            testname=testspec['name'],
+            stdin=stdin,
+            **kwargs
+        )
+
+        self.config = refinfraDefaultConfig
+        self.platform = refinfraPlatforms[platform]
+        self.testspec = self.parseTestspec(testspec)
+        self.image_dir = image_dir
+        self.prebuilts_dir = prebuilts_dir
+        # Firmware images of the platform
+        self.fw_dir = os.path.join(image_dir, platform)
+
+        os.environ.update(self.platform.get('env', {}))
+
+        telnet_ports = self.leasePorts(len(refinfraTerminals), self.config['telnet_port_base'])
+
+        # Define watchers for each terminal
+        # The stop strings, verification strings and test commands of the
+        # watchers are set by applyTestspec
+        self.terminal_watchers = {}
+        for terminal, port in zip(refinfraTerminals, telnet_ports):
+            watcher = TelnetWatcher(
+                    name=terminal,
+                    termfile=os.path.join(self.work_dir, self.log_dir,
+                                          self.testspec['name'] + "_{0}.txt".format(terminal)),
+                    stop_str=None,
+                    fvp_uart=self.config[terminal + '_uart'] + ".out_file",
+                    port=port,
+                    fvp_port_param=self.config[terminal + '_terminal'] + ".start_port",
+                    sys_stop_str=self.config['stop_cnd'],
+                    fail_strs=self.config[terminal + '_fail_strs'],
+                )
+            self.terminal_watchers[terminal] = watcher
+            self.watchers.append(watcher)
+
+        # TF-A, UEFI and Linux all use the first UART. The boot commands of
+        # the test bring Linux to a shell (ie. logging in to a distribution)
+        self.armtf_watcher = self.terminal_watchers['armtf']
+        for commandtype, command in self.testspec['boot_commands']:
+            self.armtf_watcher.addCommand(commandtype, command, boot=True)
+
+        self.applyTestspec(self.testspec)
+
+    def getTestParameters(self):
+        # The NOR flashes are written by the model (ie. UEFI variables), each
+        # test starts from blank flashes of its own. Like the log files, they
+        # differ between tests and are left out of the model parameters keying
+        # checkpoints and cached results
+        return self.createNorFlashes()
+
+    def createNorFlashes(self):
+        """ Create the NOR flash images of the test from a blank, gzipped
+        flash image. Returns their model parameters """
+        blank = os.path.join(self.work_dir, "nor_flash_blank.img")
+        if not os.path.exists(blank):
+            partial = "{0}.{1}".format(blank, os.getpid())
+            block = b"\0" * (256 * 1024)
+            with gzip.open(partial, "wb") as f:
+                for _ in range(self.config['nor_flash_size'] // len(block)):
+                    f.write(block)
+            os.rename(partial, blank)
+
+        params = {}
+        for i, loader in enumerate(self.config['nor_flashloaders']):
+            path = os.path.join(self.log_dir, "{0}_nor{1}_flash.img".format(
+                self.testspec['name'], i + 1))
+            shutil.copyfile(blank, path)
+            params[loader + ".fname"] = path
+            params[loader + ".fnameWrite"] = path
+        return params
+
+    def applyTestspec(self, testspec):
+        testspec = self.parseTestspec(testspec)
+        for terminal, watcher in self.terminal_watchers.items():
+            watcher.platform_fail_strs = list(self.config[terminal + '_fail_strs']) \
+                                         if testspec['platform_fail_strs'] else []
+            watcher.setTestStrings(testspec[terminal + '_stop_str'],
+                                   testspec[terminal + '_ver_strs'],
+                                   testspec[terminal + '_fail_strs'])
+        # Once the boot commands are done, we add the user-provided test commands
+        for commandtype, command in testspec['commands']:
+            self.armtf_watcher.addCommand(commandtype, command)
+
+    def imagePath(self, path):
+        return os.path.abspath(path.format(image_dir=self.image_dir,
+                                           prebuilts_dir=self.prebuilts_dir))
+
+    def getModelParameters(self):
+        fvp_params = {}
+        cmn = self.platform['cmn']
+        fvp_params[cmn + ".mesh_config_file"] = os.path.join(
+            os.path.dirname(os.path.abspath(self.fvp_path)), self.platform['mesh_config'])
+        fvp_params[cmn + ".force_on_from_start"] = "1"
+
+        # Assign images to FVP loaders
+        fvp_params[self.config['mcp_romloader']] = os.path.join(self.fw_dir, "mcp_romfw.bin")
+        fvp_params[self.config['scp_romloader']] = os.path.join(self.fw_dir, "scp_romfw.bin")
+        fvp_params[self.config['bl1_loader']] = os.path.join(self.fw_dir, self.testspec['bl1'])
+        fvp_params[self.config['fip_loader']] = os.path.join(self.fw_dir, self.testspec['fip'])
+        if self.testspec['virtio_image'] is not None:
+            fvp_params[self.config['virtio_disk']] = self.imagePath(self.testspec['virtio_image'])
+        if self.testspec['sata_image'] is not None:
+            fvp_params[self.config['sata_disk']] = self.imagePath(self.testspec['sata_image'])
+
+        # The UARTs are read through the telnet sessions of the watchers, no
+        # telnet client or visualisation window is started
+        fvp_params["disable_visualisation"] = "true"
+        for terminal in refinfraTerminals:
+            fvp_params[self.config[terminal + '_terminal'] + ".start_telnet"] = "0"
+        for terminal in self.config['other_terminals']:
+            fvp_params[terminal + ".start_telnet"] = "0"
+        for terminal in ["armtf", "mm", "console"]:
+            fvp_params[self.config[terminal + '_uart'] + ".unbuffered_output"] = "1"
+
+        fvp_params.update(self.platform.get('params', {}))
+        return fvp_params
+
+    def getModelData(self):
+        # Assign images to FVP data
+        fvp_data = {}
+        fvp_data[self.config['scp_ramloader']] = "{0}@{1}".format(
+            os.path.join(self.fw_dir, "scp_ramfw.bin"), self.config['scp_ram_address'])
+        return fvp_data
+
+    def parseTestspec(self, testspec):
+        """ Function for parsing a test-specification in line with the arguments
+        made available by refinfraDefaultTestspec
+        """
+        if 'name' not in testspec:
+            sys.exit(1)
+
+        # Merge user-specified arguments with default test specification
+        defaultTestspec = dict(refinfraDefaultTestspec)
+        defaultTestspec.update(testspec)
+        return defaultTestspec
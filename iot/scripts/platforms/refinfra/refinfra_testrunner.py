@@ -0,0 +1,137 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import sys
+import os
+sys.path.append(os.path.join((os.path.dirname(os.path.realpath(__file__))),'..','..','test'))
+from testrunner import TestRunner
+from refinfra_fvp import RefInfraFVP, refinfraPlatforms
+
+# Timeout of the validation suites, as used by the scripts of sgi/ and rdinfra/
+# (SGI_TEST_MAX_TIMEOUT)
+g_refinfra_timeout = 7200
+
+class RefInfraTestRunner(TestRunner):
+    def __init__(self):
+        TestRunner.__init__(
+            self, RefInfraFVP
+        )
+
+    def setSpecializationArguments(self):
+        # refinfra_fvp (RefInfraFVP) requires the platform and the directory
+        # of its images for its constructor. Add these as command-line
+        # arguments
+        self.parser.add_argument("--platform", type=str,
+            choices=sorted(refinfraPlatforms.keys()),
+            help="SGI/RD-Infra platform of the FVP")
+        self.parser.add_argument("--image_dir", type=str,
+            help="Directory containing the images of the platform (ie. "
+                 "output/<platform>), with the firmware in <platform>/")
+        self.parser.add_argument("--prebuilts_dir", type=str, default=None,
+            help="Directory containing the prebuilt disk images (default: "
+                 "prebuilts/refinfra next to the output directory)")
+
+    def parseSpecializationArguments(self, args):
+        def tryParseStringArg(arg, argstring):
+            if arg is None:
+                print("Argument {0} was not specified, but required. exiting...".format(argstring))
+                sys.exit(1)
+            return arg
+
+        # Set the arguments required for constructing a RefInfraFVP object
+        # NOTE: the 'key' in FVPWrapperArgs is identical to the named argument
+        # in the RefInfraFVP constructor. This is important, given that the
+        # FVP Subclass is instantiated by the named arguments present in
+        # FVPWrapperArgs via kwargs expansion.
+        self.FVPWrapperArgs['platform'] = tryParseStringArg(args.platform, "--platform")
+        self.FVPWrapperArgs['image_dir'] = os.path.abspath(
+            tryParseStringArg(args.image_dir, "--image_dir"))
+        prebuilts_dir = args.prebuilts_dir
+        if prebuilts_dir is None:
+            prebuilts_dir = os.path.join(self.FVPWrapperArgs['image_dir'], '..', '..',
+                                         'prebuilts', 'refinfra')
+        self.FVPWrapperArgs['prebuilts_dir'] = os.path.abspath(prebuilts_dir)
+        # The remainder of the arguments for RefInfraFVP construction will be
+        # provided by the TestRunner base class
+
+    def registerTestSpecifications(self):
+        # Each suite boots its own images, the tests cannot be batched
+
+        # Boot Linux with a busybox root filesystem (sgi/boot.sh)
+        self.registerTest({
+            'name'          :   "boot",
+            'description'   :   "Boot Linux to the busybox shell",
+            'clean_boot'    :   True,
+            'timeout'       :   g_refinfra_timeout,
+            'virtio_image'  :   "{image_dir}/grub-busybox.img",
+            'armtf_stop_str':   "/ #",
+            'armtf_ver_strs':   ["/ #"],
+        })
+
+        # Trusted Firmware-A tests (sgi/tftf.sh), the FIP of a TF-A tests
+        # build starting TFTF as BL33
+        self.registerTest({
+            'name'          :   "tftf",
+            'description'   :   "Run the Trusted Firmware-A tests",
+            'clean_boot'    :   True,
+            'timeout'       :   g_refinfra_timeout,
+            'armtf_stop_str':   "Exiting tests.",
+            'armtf_ver_strs':   ["Exiting tests."],
+        })
+
+        # Boot to the UEFI shell (sgi/uefi.sh)
+        self.registerTest({
+            'name'          :   "uefi",
+            'description'   :   "Boot to the UEFI shell",
+            'clean_boot'    :   True,
+            'timeout'       :   g_refinfra_timeout,
+            'armtf_stop_str':   "Shell>",
+            'armtf_ver_strs':   ["Shell>"],
+        })
+
+        # UEFI self-certification tests (sgi/sct.sh)
+        self.registerTest({
+            'name'          :   "sct",
+            'description'   :   "Run the UEFI self-certification tests",
+            'clean_boot'    :   True,
+            'timeout'       :   g_refinfra_timeout,
+            'virtio_image'  :   "{image_dir}/uefisct/uefi-sct.img",
+            'armtf_stop_str':   "UEFI-SCT Done!",
+            'armtf_ver_strs':   ["UEFI-SCT Done!"],
+        })
+
+        # Boot a guest with kvmtool on the Fedora distribution, then shut the
+        # distribution down (sgi/kvm.sh). The guest kernel panics once its
+        # init exits, the failure strings of the platform do not apply
+        self.registerTest({
+            'name'          :   "kvm",
+            'description'   :   "Boot a KVM guest on the Fedora distribution",
+            'clean_boot'    :   True,
+            'timeout'       :   g_refinfra_timeout,
+            'sata_image'    :   "{prebuilts_dir}/fedora.satadisk",
+            'platform_fail_strs' : False,
+            'boot_commands' :   [
+                                    ('r', "localhost login: "),
+                                    ('w', "root"),
+                                    ('r', "[root@localhost ~]#"),
+            ],
+            'commands'      :   [
+                                    # As over ssh, the guest console reads no input
+                                    ('w', "./lkvm run -k /boot/vmlinux-refinfra -c 8 "
+                                          "--irqchip gicv3 -p \"console=ttyAMA0,115200 "
+                                          "earlycon=uart,mmio,0x3f8 debug\" < /dev/null"),
+                                    ('r', "# KVM session ended normally."),
+                                    ('w', "shutdown -h now"),
+            ],
+            'armtf_stop_str':   "reboot: Power down",
+            'armtf_ver_strs':   ["# KVM session ended normally.",
+                                 "reboot: Power down"],
+        })
+
+if __name__ == "__main__":
+    RefInfraTestRunner()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python2.7
+
+from __future__ import print_function
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" checkpoint.py:
+Storage of Iris checkpoints of a booted model.
+A checkpoint is identified by a key derived from the FVP binary, the model
+parameters and the contents of the images loaded into the model. A checkpoint
+taken with a given set of images is therefore never restored into a model
+running different images.
+The hashes of the files are kept in the index of the store (see
+resultcache.FileHashes), a file being hashed again only once it changed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from resultcache import FileHashes, g_hash_index
+
+
+def image_paths(fvp_params, fvp_data):
+    """ Returns the paths of the files referred to by model parameters and
+        data. Data arguments are formatted as <file>@<address> """
+    paths = []
+    for value in fvp_params.values():
+        if os.path.isfile(str(value)):
+            paths.append(str(value))
+    for value in fvp_data.values():
+        path = str(value).rpartition('@')[0] or str(value)
+        if os.path.isfile(path):
+            paths.append(path)
+    return sorted(paths)
+
+
+def checkpoint_key(fvp_path, fvp_params, fvp_data, hashes):
+    """ Returns the key of the checkpoint for a model executed with the given
+        parameters and data (without the watcher specific parameters), the
+        files being hashed through hashes (a FileHashes) """
+    digest = hashlib.sha1()
+    digest.update(json.dumps([os.path.basename(fvp_path), fvp_params, fvp_data],
+                             sort_keys=True).encode('utf-8'))
+    for path in [fvp_path] + image_paths(fvp_params, fvp_data):
+        digest.update(hashes.get(path).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CheckpointStore(object):
+    """ Directory of checkpoints, one subdirectory per checkpoint key.
+        A checkpoint is written to a temporary directory and renamed into
+        place once complete, so concurrent tests never restore a partially
+        written checkpoint.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+        self.hashes = FileHashes(os.path.join(self.root, g_hash_index))
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def key(self, fvp_path, fvp_params, fvp_data):
+        """ Returns the checkpoint key of the model, see checkpoint_key() """
+        key = checkpoint_key(fvp_path, fvp_params, fvp_data, self.hashes)
+        self.hashes.save()
+        return key
+
+    def exists(self, key):
+        return os.path.isfile(os.path.join(self.path(key), "meta.json"))
+
+    def begin(self, key):
+        """ Returns a temporary directory for the checkpoint to be saved to """
+        tmpdir = "{0}.tmp.{1}".format(self.path(key), os.getpid())
+        if os.path.exists(tmpdir):
+            shutil.rmtree(tmpdir)
+        os.makedirs(tmpdir)
+        return tmpdir
+
+    def commit(self, key, tmpdir, meta):
+        with open(os.path.join(tmpdir, "meta.json"), "w") as f:
+            json.dump(dict(meta, key=key, created=time.time()), f, indent=4)
+        try:
+            os.rename(tmpdir, self.path(key))
+        except OSError:
+            # Another test stored the same checkpoint first
+            shutil.rmtree(tmpdir)
+
+    def discard(self, tmpdir):
+        shutil.rmtree(tmpdir, ignore_errors=True)
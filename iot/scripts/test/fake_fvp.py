@@ -0,0 +1,531 @@
+#!/usr/bin/env python2.7
+
+from __future__ import print_function
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" fake_fvp.py:
+Stand-in for an FVP executable, for exercising and benchmarking the FVP wrapper
+on hosts without Arm models or licenses.
+It accepts the command line built by FVPWrapper.load_fvp
+(-I -p --iris-port N -C <param>=<value> --data <param>=<value>), prints the
+Iris server port like an FVP does, and serves:
+- a minimal Iris server, implementing the functions used by iris.debug's
+  NetworkModel to connect, run, stop, checkpoint, read CPU registers and
+  memory, and release/shut down the model
+- a telnet server per configured terminal, listening on the port given by the
+  terminal's start_port parameter, which replays a script of recorded logs at
+  a configurable byte rate while the simulation is running. Replayed output
+  is also written to the file given by the terminal's UART out_file parameter
+
+The terminals and CPUs are described by a JSON file, given by the
+FAKE_FVP_CONFIG environment variable or '-C fake.config=<file>':
+{
+    "terminals": {
+        "host.telnetterminal0": {
+            "out_file": "host.uart0.out_file",  # UART log file parameter
+            "rate": 200000,                     # bytes per second, 0: unlimited
+            "delay": 1.5,                       # seconds before the first byte
+            "echo": true,                       # echo received lines
+            "script": [
+                {"log": "boot.log"},            # replay a recorded log
+                {"text": "login: "},            # replay a string
+                {"expect": "root"},             # wait for a received line
+                {"sleep": 0.5}
+            ]
+        }
+    },
+    "cpus": [{"name": "host.cluster0.cpu0", "mips": 150}]
+}
+Relative log paths are relative to the configuration file. A CPU given
+"stall_after": <seconds> stops executing instructions after that simulated
+time (ie. for exercising hang detection).
+A checkpoint holds the simulated time and the script step of each terminal: a
+restored terminal resumes its script at that step, without replaying what
+preceded it (ie. the boot log).
+
+Usage, ie.:
+FAKE_FVP_CONFIG=replay.json python corstone700_testrunner.py --fvp fake_fvp.py ...
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+
+g_default_iris_port = 7100
+g_iris_port_search = 10
+
+# Telnet negotiation sent by FVP terminals when a client connects:
+# IAC WILL ECHO, IAC WILL SUPPRESS-GO-AHEAD
+g_telnet_greeting = b'\xff\xfb\x01\xff\xfb\x03'
+
+g_default_cpus = [{"name": "cluster0.cpu0", "mips": 100}]
+
+g_pc_base = 0x80000000
+g_pc_range = 0x100000
+
+
+def log(verbose, message):
+    if verbose:
+        sys.stderr.write("fake_fvp: {0}\n".format(message))
+        sys.stderr.flush()
+
+
+class Simulation(object):
+    """ Run state of the fake model. Simulated time advances with wall time
+        while the simulation is running. """
+    def __init__(self):
+        self.running = threading.Event()
+        self.shutdown = threading.Event()
+        self.lock = threading.Lock()
+        self.elapsed = 0.0
+        self.run_start = None
+
+    def run(self):
+        with self.lock:
+            if self.run_start is None:
+                self.run_start = time.time()
+                self.running.set()
+
+    def stop(self):
+        with self.lock:
+            if self.run_start is not None:
+                self.elapsed += time.time() - self.run_start
+                self.run_start = None
+                self.running.clear()
+
+    def time(self):
+        """ Seconds of simulation so far """
+        with self.lock:
+            if self.run_start is None:
+                return self.elapsed
+            return self.elapsed + time.time() - self.run_start
+
+    def wait_running(self):
+        """ Block while the simulation is stopped. Returns False on shutdown """
+        while not self.running.wait(0.1):
+            if self.shutdown.is_set():
+                return False
+        return not self.shutdown.is_set()
+
+
+class FakeCpu(object):
+    def __init__(self, inst_id, name, mips, sim, stall_after=None):
+        self.inst_id = inst_id
+        self.name = name
+        self.mips = mips
+        self.sim = sim
+        self.stall_after = stall_after
+
+    def instructions(self):
+        elapsed = self.sim.time()
+        if self.stall_after is not None:
+            elapsed = min(elapsed, self.stall_after)
+        return int(elapsed * self.mips * 1e6)
+
+    def pc(self):
+        # Walk through a code region, so that PC samples are spread over it
+        return g_pc_base + (self.instructions() * 4) % g_pc_range
+
+
+class TelnetTerminal(object):
+    """ Telnet server replaying the script of one terminal """
+    def __init__(self, name, config, port, out_file, sim, basedir, verbose):
+        self.name = name
+        self.rate = config.get("rate", 0)
+        self.delay = config.get("delay", 0)
+        self.echo = config.get("echo", False)
+        self.script = config.get("script", [])
+        self.out_file = out_file
+        self.sim = sim
+        self.basedir = basedir
+        self.verbose = verbose
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('', port))
+        self.server.listen(1)
+        self.port = port
+
+        self.conn = None
+        self.lines = []
+        self.lines_cond = threading.Condition()
+        # Index of the script step being replayed, and of the step the replay
+        # starts from (set when restoring a checkpoint)
+        self.step = 0
+        self.first_step = 0
+
+    def start(self):
+        thread = threading.Thread(target=self.serve)
+        thread.setDaemon(True)
+        thread.start()
+
+    def serve(self):
+        print("{0}: Listening for serial connection on port {1}".format(self.name, self.port))
+        sys.stdout.flush()
+        self.conn, _ = self.server.accept()
+        self.conn.sendall(g_telnet_greeting)
+        reader = threading.Thread(target=self.receive)
+        reader.setDaemon(True)
+        reader.start()
+
+        out = open(self.out_file, "ab") if self.out_file else None
+        try:
+            self.replay(out)
+        except socket.error:
+            pass
+        finally:
+            if out is not None:
+                out.close()
+
+    def receive(self):
+        """ Collect the lines written by the client, without telnet commands """
+        pending = b''
+        while True:
+            try:
+                data = self.conn.recv(4096)
+            except socket.error:
+                return
+            if not data:
+                return
+            data = re.sub(b'\xff[\xfb-\xfe].|\xff[\xf0-\xfa]', b'', data)
+            pending += data.replace(b'\r', b'')
+            while b'\n' in pending:
+                line, pending = pending.split(b'\n', 1)
+                log(self.verbose, "{0} received '{1}'".format(self.name, line))
+                if self.echo:
+                    self.conn.sendall(line + b'\r\n')
+                with self.lines_cond:
+                    self.lines.append(line.decode('utf-8', 'replace'))
+                    self.lines_cond.notify_all()
+
+    def send(self, data, out):
+        """ Send data at the configured rate, while the simulation runs """
+        chunk = max(1, int(self.rate / 100)) if self.rate else len(data)
+        for i in range(0, len(data), chunk):
+            if not self.sim.wait_running():
+                return
+            block = data[i:i + chunk]
+            self.conn.sendall(block)
+            if out is not None:
+                out.write(block)
+                out.flush()
+            if self.rate:
+                time.sleep(float(len(block)) / self.rate)
+
+    def sleep(self, seconds):
+        """ Sleep for a duration of simulation time """
+        deadline = self.sim.time() + seconds
+        while self.sim.time() < deadline:
+            if not self.sim.wait_running():
+                return
+            time.sleep(min(0.01, deadline - self.sim.time()))
+
+    def expect(self, string):
+        with self.lines_cond:
+            while not any(string in line for line in self.lines):
+                if self.sim.shutdown.is_set():
+                    return
+                self.lines_cond.wait(0.1)
+            self.lines = []
+
+    def replay(self, out):
+        if self.first_step == 0:
+            self.sleep(self.delay)
+        for index in range(self.first_step, len(self.script)):
+            self.step = index
+            step = self.script[index]
+            if "log" in step:
+                path = os.path.join(self.basedir, step["log"])
+                with open(path, "rb") as f:
+                    self.send(f.read(), out)
+            elif "text" in step:
+                self.send(step["text"].encode('utf-8'), out)
+            elif "expect" in step:
+                self.expect(step["expect"])
+            elif "sleep" in step:
+                self.sleep(step["sleep"])
+
+
+class IrisServer(object):
+    """ Minimal Iris server, speaking the IrisJson format of the Iris TCP
+        protocol: an HTTP-like upgrade handshake, followed by JSON-RPC 2.0
+        messages framed as 'IrisJson:<length>:<json>\\n'. """
+    def __init__(self, port, sim, cpus, terminals, verbose):
+        self.sim = sim
+        self.terminals = terminals
+        self.verbose = verbose
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('', port))
+        self.server.listen(4)
+        self.port = port
+
+        self.instances = {}
+        self.cpus = {}
+        self.next_inst_id = 0
+        self.add_instance("framework.GlobalInstance")
+        self.engine = self.add_instance("framework.SimulationEngine")
+        for cpu in cpus:
+            inst_id = self.add_instance("component." + cpu["name"])
+            self.cpus[inst_id] = FakeCpu(inst_id, cpu["name"], cpu.get("mips", 100), sim,
+                                         cpu.get("stall_after"))
+
+        self.memory = {}    # Sparse guest memory, one entry per byte
+        self.event_streams = {}     # esId -> (client connection, ecInstId, evSrcId)
+        self.next_es_id = 0
+
+    def add_instance(self, name):
+        inst_id = self.next_inst_id
+        self.next_inst_id += 1
+        self.instances[inst_id] = name
+        return inst_id
+
+    def start(self):
+        thread = threading.Thread(target=self.accept)
+        thread.setDaemon(True)
+        thread.start()
+
+    def accept(self):
+        while not self.sim.shutdown.is_set():
+            conn, _ = self.server.accept()
+            thread = threading.Thread(target=self.serve, args=(conn,))
+            thread.setDaemon(True)
+            thread.start()
+
+    def serve(self, conn):
+        stream = conn.makefile("rb")
+        # Handshake
+        request = b''
+        while not request.endswith(b'\r\n\r\n'):
+            line = stream.readline()
+            if not line:
+                return
+            request += line
+        conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\n"
+                     b"Upgrade: IrisRpc/1.0\r\n"
+                     b"Selected-Format: IrisJson\r\n\r\n")
+
+        while True:
+            header = b''
+            while not header.endswith(b':') or header.count(b':') < 2:
+                ch = stream.read(1)
+                if not ch:
+                    return
+                header += ch
+            length = int(header.split(b':')[1])
+            message = json.loads(stream.read(length).decode('utf-8'))
+            stream.read(1)  # Trailing newline
+
+            if "method" not in message:
+                continue    # Response from the client, ie. to an event
+            result = self.call(conn, message["method"], message.get("params", {}))
+            if "id" in message:
+                self.send(conn, {"jsonrpc": "2.0", "id": message["id"], "result": result})
+            if message["method"] == "simulation_requestShutdown":
+                self.sim.shutdown.set()
+
+    def send(self, conn, message):
+        data = json.dumps(message)
+        conn.sendall("IrisJson:{0}:{1}\n".format(len(data), data).encode('utf-8'))
+
+    def instance_info(self, inst_id):
+        return {"instId": inst_id, "instName": self.instances[inst_id]}
+
+    def notify_time(self):
+        """ Send IRIS_SIMULATION_TIME_EVENT to the subscribed clients """
+        fields = {"RUNNING": self.sim.running.is_set(),
+                  "TICKS": int(self.sim.time() * 1e9), "REASON": "fake_fvp"}
+        for es_id, (conn, ec_inst_id, _) in list(self.event_streams.items()):
+            try:
+                self.send(conn, {"jsonrpc": "2.0", "method": "ec_IRIS_SIMULATION_TIME_EVENT",
+                                 "params": {"instId": ec_inst_id, "esId": es_id,
+                                            "fields": fields, "time": fields["TICKS"],
+                                            "sInstId": self.engine, "syncEc": False}})
+            except socket.error:
+                del self.event_streams[es_id]
+
+    def call(self, conn, method, params):
+        log(self.verbose, "Iris call {0} {1}".format(method, params))
+        inst_id = params.get("instId", 0)
+
+        if method == "instanceRegistry_registerInstance":
+            return self.instance_info(self.add_instance(params.get("instName", "client")))
+        if method == "instanceRegistry_unregisterInstance":
+            return None
+        if method == "instanceRegistry_getList":
+            prefix = params.get("prefix", "")
+            return [self.instance_info(i) for i in sorted(self.instances)
+                    if self.instances[i].startswith(prefix)]
+        if method == "instanceRegistry_getInstanceInfoByName":
+            for i, name in self.instances.items():
+                if name == params.get("instName"):
+                    return self.instance_info(i)
+            return None
+        if method == "instanceRegistry_getInstanceInfoByInstId":
+            return self.instance_info(params.get("aInstId", inst_id))
+        if method == "instance_getProperty":
+            if params.get("propName") == "executesSoftware":
+                return 1 if inst_id in self.cpus else 0
+            return None
+
+        if method == "simulationTime_run":
+            self.sim.run()
+            self.notify_time()
+            return None
+        if method == "simulationTime_stop":
+            self.sim.stop()
+            self.notify_time()
+            return None
+        if method == "simulationTime_get":
+            return {"ticks": int(self.sim.time() * 1e9), "tickHz": int(1e9),
+                    "running": self.sim.running.is_set()}
+        if method == "simulation_requestShutdown":
+            return None
+
+        if method in ("checkpoint_save", "checkpoint_restore"):
+            path = os.path.join(params.get("checkpointDir", "."), "fake_fvp.checkpoint")
+            if method == "checkpoint_save":
+                with open(path, "w") as f:
+                    json.dump({"time": self.sim.time(),
+                               "steps": dict((terminal.name, terminal.step)
+                                             for terminal in self.terminals)}, f)
+            else:
+                with open(path) as f:
+                    checkpoint = json.load(f)
+                self.sim.elapsed = checkpoint["time"]
+                for terminal in self.terminals:
+                    terminal.first_step = checkpoint["steps"].get(terminal.name, 0)
+            return None
+
+        if method == "event_getEventSources":
+            return [{"evSrcId": 0, "name": "IRIS_SIMULATION_TIME_EVENT",
+                     "fields": [{"name": "RUNNING", "type": "bool"},
+                                {"name": "TICKS", "type": "uint"},
+                                {"name": "REASON", "type": "string"}]}]
+        if method == "event_getEventSource":
+            return self.call(conn, "event_getEventSources", params)[0]
+        if method == "eventStream_create":
+            es_id = self.next_es_id
+            self.next_es_id += 1
+            self.event_streams[es_id] = (conn, params.get("ecInstId"), params.get("evSrcId"))
+            return es_id
+        if method == "eventStream_destroy":
+            self.event_streams.pop(params.get("esId"), None)
+            return None
+
+        if method == "resource_getList":
+            if inst_id in self.cpus:
+                return [{"rscId": 0, "name": "PC", "bitWidth": 64, "type": "numeric"}]
+            return []
+        if method == "resource_getListOfResourceGroups":
+            return [{"name": "Core", "rscIds": [0]}] if inst_id in self.cpus else []
+        if method == "resource_read":
+            cpu = self.cpus[inst_id]
+            return {"data": [cpu.pc()] * len(params.get("rscIds", [0]))}
+        if method == "step_getStepCounterValue":
+            return self.cpus[inst_id].instructions()
+
+        if method == "memory_getMemorySpaces":
+            return [{"spaceId": 0, "name": "Memory", "minAddr": 0, "maxAddr": 0xffffffffffffffff}]
+        if method == "memory_read":
+            width = params.get("byteWidth", 1)
+            address = params.get("address", 0)
+            words = []
+            for i in range(params.get("count", 1)):
+                base = address + i * width
+                word = bytearray(self.memory.get(base + b, 0) for b in range(width))
+                words.append(sum(byte << (8 * b) for b, byte in enumerate(word)))
+            return {"data": words}
+        if method == "memory_write":
+            width = params.get("byteWidth", 1)
+            address = params.get("address", 0)
+            for i, word in enumerate(params.get("data", [])):
+                for b in range(width):
+                    self.memory[address + i * width + b] = (word >> (8 * b)) & 0xff
+            return None
+
+        # Breakpoints, semihosting, etc.: accepted and ignored
+        return None
+
+
+def parse_params(values):
+    params = {}
+    for value in values or []:
+        name, _, param_val = value.partition('=')
+        params[name] = param_val
+    return params
+
+
+def bind_iris_server(requested, sim, cpus, terminals, verbose):
+    """ Like an FVP, search a free port from the requested one """
+    for port in range(requested, requested + g_iris_port_search):
+        try:
+            return IrisServer(port, sim, cpus, terminals, verbose)
+        except socket.error:
+            continue
+    raise Exception("No free port for the Iris server")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake FVP for FVP wrapper testing")
+    parser.add_argument("-I", "--iris-server", action='store_true')
+    parser.add_argument("-p", "--print-port-number", action='store_true')
+    parser.add_argument("-i", "--iris-log", action='count', default=0)
+    parser.add_argument("--iris-port", type=int, default=g_default_iris_port)
+    parser.add_argument("-C", "--parameter", action='append', dest='params')
+    parser.add_argument("--data", action='append')
+    args = parser.parse_args()
+
+    params = parse_params(args.params)
+    verbose = args.iris_log > 0
+
+    config_path = params.get("fake.config", os.environ.get("FAKE_FVP_CONFIG"))
+    config = {}
+    basedir = os.getcwd()
+    if config_path:
+        with open(config_path) as f:
+            config = json.load(f)
+        basedir = os.path.dirname(os.path.abspath(config_path))
+
+    sim = Simulation()
+
+    terminals = []
+    for name, terminal in config.get("terminals", {}).items():
+        port = int(params.get(name + ".start_port", terminal.get("port", 5000)))
+        out_file = params.get(terminal.get("out_file", ""))
+        terminals.append(TelnetTerminal(name, terminal, port, out_file, sim, basedir, verbose))
+
+    iris = bind_iris_server(args.iris_port, sim, config.get("cpus", g_default_cpus),
+                            terminals, verbose)
+
+    if args.iris_server and args.print_port_number:
+        print("Iris server started listening to port {0}".format(iris.port))
+        sys.stdout.flush()
+
+    iris.start()
+    for terminal in terminals:
+        terminal.start()
+
+    try:
+        while not sim.shutdown.wait(0.1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    print("/OSCI/SystemC: Simulation stopped by user")
+    sys.stdout.flush()
+    # Let the shutdown response reach the client before the sockets close
+    time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,30 +21,71 @@ define the watchers (TelnetWatcher) for the FVP.
 import os
 import signal
 import sys
-from iris.debug import *
 import json
 import distutils.spawn
 import argparse
+import codecs
 import telnetlib
+import select
+import socket
 from time import sleep
-from threading import Thread
-import multiprocessing
+from threading import Thread, Event, Lock
 import Queue
 import time
-from subprocess import Popen, PIPE, check_output
-import re
+from subprocess import Popen, PIPE
 
 from utils import printHeader0, printHeader1
+from portlease import PortLease
+from checkpoint import CheckpointStore
+from matcher import StreamMatcher
+from ringbuffer import RingBuffer
+from outputdrain import OutputDrain
+from timeline import Timeline
+from resultcache import ResultCache, result_key
+from watchdog import HangWatchdog
+from throughput import ThroughputSampler
+from profiler import PCProfiler
+from uarttrace import TraceWriter, TRACE_RECEIVED, TRACE_WRITTEN, watcher_config
+from logstore import find_strings, archive
+from inject import Injector, parse_injection, injection_strings
 
 # Default network details for a model running locally a pyIRIS server
 g_model_hostname = "localhost"
 g_model_port = 7100
 
+# First port searched when leasing a telnet port range or an Iris server port
+g_telnet_port_base = 5000
+g_iris_port_base = g_model_port
+
 g_wait_fvp_ready = 30 #maximum waiting time for the model to be operational (in seconds)
 g_wait_fvp_finish = 30 #waiting for the model to terminate and release the TXT log files is expressed in seconds
+g_wait_poll_min = 0.005 #first polling interval while waiting for the model (in seconds)
+g_wait_poll_max = 0.1 #longest polling interval while waiting for the model (in seconds)
+g_wait_thread_join = 10 #maximum waiting time for each watcher thread to finish once stopped (in seconds)
+g_fvp_output_tail = 20 #number of lines of model output printed when the model fails to start
+g_watcher_connect_timeout = 10 #maximum waiting time for a telnet session to be opened (in seconds)
 
 g_fvp_cmd = ["" , '-I', '-p']
 
+# Upper bound on how long the watcher I/O loop sleeps in select() before
+# re-checking the global stop signal (in seconds)
+g_watcher_poll_interval = 0.1
+
+# Number of bytes of the most recent output kept by each watcher, ie. for
+# printing the context of a match
+g_watcher_history_size = 64 * 1024
+
+# Maximum number of bytes read from a telnet session at once
+g_watcher_read_size = 64 * 1024
+
+# Number of lines of terminal output printed when a failure string is found
+g_fail_context_lines = 10
+
+# Interval at which the CPUs of the model are sampled by the hang watchdog (in
+# seconds), and number of lines of each terminal printed when a hang is found
+g_watchdog_interval = 1
+g_hang_context_lines = 10
+
 #verbose FVP command
 #g_fvp_cmd = ["" , '-I' , '-ii' , '-p']
 
@@ -61,50 +102,50 @@ def show_exception_details(e,e_fvp_path,e_fvp_params):
     print(json.dumps(e_fvp_params, indent=4))
 
 
-def get_pid(name):
-    return int(check_output(["pidof","-s",name]))
-
 #
 # wait_iris_server:
 #
 # this function supports two modes:
 #
 # Mode 1: waiting for FVP IRIS server to be ready to receive connections.
-# This mode is selected by setting wait_reason to 0
+# This mode is selected by setting wait_reason to 0. Readiness is checked by
+# connecting to the IRIS server port. If the FVP process exits while waiting,
+# the function returns immediately.
 #
 # Mode 2: waiting for FVP IRIS server to terminate. This mode is selected by setting wait_reason to a non null value
+# Termination is checked on the FVP process itself (fvp_process is the Popen
+# object of the FVP).
 #
-# The function checks every second if the IRIS server port is open until max_wait_time delay expires
+# The checks are repeated with an exponential backoff, from g_wait_poll_min to
+# g_wait_poll_max seconds, until max_wait_time delay expires
 #
 def wait_iris_server(fvp_process, iris_port, max_wait_time,wait_reason=0):
 
-    check_netstat_cmd = ["sh", "-c", 'which netstat | wc -l']
-    ret = check_output(check_netstat_cmd)
-    if int(ret) == 0:
-        raise Exception("netstat command not installed, please install it")
-
-    pid = get_pid(fvp_process)
-    netstat_cmd = ["sh", "-c", 'netstat -tpnl 2>/dev/null | egrep -i ":{0}.+{1}" | wc -l'.format(iris_port, pid)]
-
-    i = 0
+    deadline = time.time() + max_wait_time
+    delay = g_wait_poll_min
 
     while 1:
 
-        i += 1
-
-        ret = check_output(netstat_cmd)
-
-        if int(ret) != 0: #found
-            if wait_reason == 0: #waiting for connection
+        if wait_reason == 0: #waiting for connection
+            if fvp_process.poll() is not None:
+                print("FVP exited with code {0}".format(fvp_process.returncode))
+                return False
+            try:
+                sock = socket.create_connection((g_model_hostname, iris_port),
+                                                timeout=g_wait_poll_max)
+                sock.close()
                 return True
-        else:
-            if wait_reason != 0: #waiting for termination
+            except socket.error:
+                pass
+        else: #waiting for termination
+            if fvp_process.poll() is not None:
                 return True
 
-        if i == max_wait_time:
+        if time.time() >= deadline:
             return False
 
-        sleep(1)
+        sleep(delay)
+        delay = min(delay * 2, g_wait_poll_max)
 
 class TelnetWatcher:
     """ Class for hooking into an ARM telnet session exposed by an FVP. """
@@ -117,9 +158,12 @@ class TelnetWatcher:
                 fvp_uart = None,
                 port = None,
                 host='localhost',
+                fvp_port_param = None,
+                fail_strs = [],
                 ):
         # Watcher configuration
         self.name = name + "_watcher"       # Watcher name
+        self.terminal = name                # Terminal name, ie. for naming logs
 
         ''' self.termfile:
             - A text file containing UART logs output in the terminal
@@ -131,14 +175,88 @@ class TelnetWatcher:
         self.stop_str = stop_str            # Test-specific stop string
         self.sys_stop_str = sys_stop_str    # Generic FVP stop string
         self.fvp_uart = fvp_uart            # FVP UART parameter associated with the watcher
+        self.fvp_port_param = fvp_port_param # FVP telnet terminal start port parameter
 
         # String which much be present in the UART log after execution
         self.verification_strs = verification_strs
 
+        # Strings which fail the test as soon as they are received (ie. a
+        # kernel panic): the failure strings of the platform, and those of the
+        # test (see setTestStrings)
+        self.platform_fail_strs = list(fail_strs)
+        self.fail_strs = list(fail_strs)
+
         # Watcher Telnet configuration
         self.host = host
         self.port = port
         self.commandqueue = []
+        self.command = None     # Command currently awaited by the watcher
+        self.commands_run = 0   # Number of commands popped off the queue
+
+        # Streaming matcher for all the strings of the watcher, and the
+        # (stream offset, time) at which each verification string was first
+        # seen since start_time (the connection, or the start of a batch
+        # segment)
+        self.matcher = None
+        self.found = {}
+        self.start_time = None
+
+        # Log of the output received during a batch segment, see beginSegment
+        self.slicepath = None
+        self.slicefile = None
+
+        # Prompt of the shell the test commands are written to (by default
+        # the last string read by the boot sequence). Each batch segment
+        # following the first waits for it before writing its commands, so
+        # that they are not typed while the previous test is still running,
+        # unless the prompt was received since the last command was written
+        # (at_prompt)
+        self.prompt = None
+        self.at_prompt = False
+
+        # Predicate (event, string) telling whether an event ends the current
+        # batch segment, set by the FVPWrapper for batches. The output
+        # received after such an event is kept in carry until the next
+        # segment begins, see match() and resumeCarry()
+        self.ends_segment = None
+        self.carry = u''
+
+        # Bounded history of the received bytes, and the decoder of the
+        # stream. The decoder keeps incomplete UTF-8 sequences split across
+        # reads, and replaces invalid bytes (ie. binary noise)
+        self.history = RingBuffer(g_watcher_history_size)
+        self.decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+        # The boot sequence is the leading part of the command queue which
+        # brings the system to a state where test commands can be entered
+        # (ie. logging in). It is skipped when the model is restored from a
+        # checkpoint, and the watcher may be held at the end of it while a
+        # checkpoint is saved.
+        self.boot_commands = 0
+        self.hold_after_boot = False
+        self.boot_complete = False
+
+        # Timeline of the test run, recording the time of each command step
+        # (set by the FVPWrapper)
+        self.timeline = None
+
+        # Trace recording the received data and written commands of the
+        # session (see uarttrace.py), set by the FVPWrapper
+        self.trace = None
+
+        # Injector writing the files of the 'i' commands to the memory of the
+        # model (see inject.py), set by the FVPWrapper
+        self.injector = None
+        # Strings printed by the guest when the copy of an injected file is
+        # corrupted, failing the test (see buildMatcher), and errors of the
+        # commands reported as failures by consume()
+        self.command_fail_strs = []
+        self.command_errors = []
+
+        self.tn = None
+        # Time at which data was last received (or the session was opened),
+        # for detecting a model which stopped making progress
+        self.last_receive = None
 
         # Clear file if it is present
         self.clearFile()
@@ -188,38 +306,353 @@ of a test execution.
             self.termfilePipe.close()
             os.remove(self.termfilePipe.name)
 
-    def verify(self):
-        """ Verifies whether all verification strings are found in the
-            watcher log file
+    def verify(self, output=print):
+        """ Verifies whether all verification strings were found.
+            Strings are matched as the telnet session is received. Only if
+            some strings were not seen before the watcher stopped, the watcher
+            log file (which also holds the output written after the end of
+            the test) is searched for them, block by block. For a batch
+            segment, the log of the segment is searched instead.
+            The result of each verification is passed to output as a line.
         """
         success = True
 
         if  len(self.verification_strs) != 0:
 
-            with open(self.termfile, "r") as logFile:
-                logFile.flush()
-                log = logFile.read()
-                for string in self.verification_strs:
-                    print("{0}: verifying '{1}'... ".format(self.name, string), end='')
-                    if string not in log:
-                        print("\n{0}: FAIL; '{1}' not found in log".format(self.name, string))
-                        success = False
-                    else:
-                        print("Found!")
+            in_log = set()
+            if not self.verified():
+                in_log = find_strings(self.slicepath or self.termfile,
+                                      [string for string in self.verification_strs
+                                       if string not in self.found])
+
+            for string in self.verification_strs:
+                verifying = "{0}: verifying '{1}'... ".format(self.name, string)
+                if string in self.found:
+                    offset, found_time = self.found[string]
+                    output(verifying + "Found! (offset {0}, after {1:.3f}s)".format(
+                        offset, found_time - self.start_time))
+                elif string in in_log:
+                    output(verifying + "Found!")
+                else:
+                    output(verifying)
+                    output("{0}: FAIL; '{1}' not found in log".format(self.name, string))
+                    success = False
 
         return success
 
-    def addCommand(self, cmdtype, string):
-        if cmdtype not in ['r', 'w']:
+    def lastLines(self, count):
+        """ Returns the last lines received by the watcher """
+        return [line.decode('utf-8', 'replace')
+                for line in self.history.lines(count)]
+
+    def verified(self):
+        """ True once all verification strings have been received """
+        return all(string in self.found for string in self.verification_strs)
+
+    def addCommand(self, cmdtype, string, boot=False):
+        """ Commands are either:
+            - ('r', string): wait for string to be received
+            - ('w', string): write string as a line
+            - ('i', '<host path>:<guest path>'): inject the host file into the
+              guest through the memory of the model, and wait for the guest to
+              have copied it to the guest path (see inject.py) """
+        if cmdtype not in ['r', 'w', 'i']:
             print("Unknown command type '{0}'".format(cmdtype))
-            print("Commands must be specified as either a read or write command")
+            print("Commands must be specified as either a read, write or inject command")
             sys.exit(1)
+        if boot:
+            if len(self.commandqueue) != self.boot_commands:
+                print("Boot commands must be added before any other command")
+                sys.exit(1)
+            self.boot_commands += 1
+            if cmdtype == 'r':
+                self.prompt = string
         self.commandqueue.insert(0, (cmdtype, string))
 
+    def setPrompt(self, prompt):
+        """ Set the shell prompt awaited between batch segments, when it
+            differs from the last string read by the boot sequence """
+        self.prompt = prompt
+
+    def setTestStrings(self, stop_str, verification_strs, fail_strs=[]):
+        """ Set the strings of a test, taking effect once the matcher is
+            built (see connect() and beginSegment()). The failure strings of
+            the test are added to those of the platform """
+        self.stop_str = stop_str
+        self.verification_strs = verification_strs
+        self.fail_strs = self.platform_fail_strs + [string for string in fail_strs
+                                                    if string not in self.platform_fail_strs]
+
+    def beginSegment(self, slicepath):
+        """ Start a segment of a batch: the test strings and commands set
+            since the previous segment are matched and executed from now on,
+            and the received output is written to slicepath. A segment
+            started on a session where the boot sequence is complete first
+            waits for the shell prompt """
+        self.slicepath = slicepath
+        self.slicefile = open(slicepath, "wb")
+        self.start_time = time.time()
+        # The boot sequence is complete unless its last read is pending
+        booted = self.commands_run > self.boot_commands or \
+                 (self.commands_run == self.boot_commands and self.command is None)
+        if self.tn is not None and self.prompt is not None and booted and \
+           not self.boot_complete and not self.at_prompt:
+            self.commandqueue.append(('r', self.prompt))
+        self.buildMatcher()
+        if self.trace is not None:
+            self.trace.config(watcher_config(self))
+        if self.tn is not None and self.command is None and not self.boot_complete:
+            # The session was started by a previous segment
+            self.runCommands()
+
+    def endSegment(self):
+        """ End a segment of a batch, dropping the test commands which were
+            not executed. The boot commands still pending are kept """
+        if self.slicefile is not None:
+            self.slicefile.close()
+            self.slicefile = None
+        pending_boot = max(0, self.boot_commands - self.commands_run)
+        self.commandqueue = self.commandqueue[len(self.commandqueue) - pending_boot:]
+        if self.commands_run > self.boot_commands:
+            self.command = None
+
+    def skipBootCommands(self):
+        """ Remove the boot sequence from the command queue, for a model
+            restored from a checkpoint taken after the boot sequence """
+        del self.commandqueue[len(self.commandqueue) - self.boot_commands:]
+        self.boot_commands = 0
+
+    def connect(self):
+        """ Open the telnet session and execute the leading write commands """
+        self.tn = telnetlib.Telnet(host=self.host, port=self.port,
+                                   timeout=g_watcher_connect_timeout)
+        self.startSession()
+
+    def startSession(self):
+        """ Reset the watcher for a new session on self.tn, and execute the
+            leading write commands """
+        self.start_time = time.time()
+        self.last_receive = self.start_time
+        self.history = RingBuffer(g_watcher_history_size)
+        self.decoder.reset()
+        self.command = None
+        self.at_prompt = False
+        self.buildMatcher()
+        if self.trace is not None:
+            self.trace.config(watcher_config(self))
+        self.runCommands()
+
+    def buildMatcher(self):
+        """ Create the matcher for the stop, verification, failure and read
+            command strings of the watcher, and its prompt """
+        patterns = [self.stop_str, self.sys_stop_str] + list(self.verification_strs)
+        patterns += self.fail_strs
+        patterns += [string for cmdtype, string in reversed(self.commandqueue)
+                     if cmdtype == 'r']
+        patterns.append(self.prompt)
+        injected = [injection_strings(parse_injection(string)[1])
+                    for cmdtype, string in reversed(self.commandqueue) if cmdtype == 'i']
+        self.command_fail_strs = [failed for _, failed in injected]
+        patterns += [string for strings in injected for string in strings]
+        self.matcher = StreamMatcher(patterns)
+        self.found = {}
+
+    def recordStep(self, steptype, string):
+        if self.timeline is not None:
+            self.timeline.step(self.name, self.commands_run, steptype, string)
+
+    def fileno(self):
+        """ Socket descriptor of the telnet session, allowing the watcher to be
+            passed directly to select() """
+        return self.tn.fileno()
+
+    def close(self):
+        if self.tn is not None:
+            self.tn.close()
+        if self.slicefile is not None:
+            self.slicefile.close()
+            self.slicefile = None
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def runCommands(self):
+        """ Pop commands off of the command stack, executing all write commands
+            which are in sequence until a read command is reached """
+        while True:
+            if self.hold_after_boot and self.commands_run == self.boot_commands:
+                # Hold the watcher until released by resumeAfterBoot()
+                self.command = None
+                self.boot_complete = True
+                return
+            try:
+                command = self.commandqueue.pop()
+                self.commands_run += 1
+            except IndexError:
+                command = None
+            if command and command[0] == 'w':
+                data = (command[1] + '\n').encode('utf-8')
+                self.tn.write(data)
+                self.at_prompt = False
+                if self.trace is not None:
+                    self.trace.record(TRACE_WRITTEN, data)
+                self.recordStep('w', command[1])
+            elif command and command[0] == 'i':
+                source, dest = parse_injection(command[1])
+                self.recordStep('i', command[1])
+                try:
+                    if self.injector is None:
+                        # ie. a replayed session, without model memory
+                        raise Exception("Cannot inject {0}: no model to inject into".format(source))
+                    data = (self.injector.inject(source, dest) + '\n').encode('utf-8')
+                except Exception as e:
+                    # Reported as a failure, see commandFailures()
+                    self.command = None
+                    self.command_errors.append(str(e))
+                    return
+                self.tn.write(data)
+                self.at_prompt = False
+                if self.trace is not None:
+                    self.trace.record(TRACE_WRITTEN, data)
+                # Wait for the guest to have checked its copy
+                self.command = ('r', injection_strings(dest)[0])
+                return
+            else:
+                self.command = command
+                return
+
+    def resumeAfterBoot(self):
+        self.hold_after_boot = False
+        self.boot_complete = False
+        self.runCommands()
+
+    def readMatched(self, pattern):
+        """ True if the pattern is the string of the pending 'read' command """
+        return (self.command is not None and self.command[0] == 'r' and
+                self.command[1] == pattern)
+
+    def readChunk(self):
+        """ Read up to g_watcher_read_size bytes from the telnet session.
+            Telnet.read_very_eager() reads 50 bytes per call, processes them
+            one character at a time and concatenates its result until the
+            socket is drained, which is quadratic in the size of a burst.
+            Data without any telnet command sequence is therefore only
+            filtered the way telnetlib does (dropping NUL and XON characters),
+            and is otherwise handed over to telnetlib for processing.
+        """
+        tn = self.tn
+        data = tn.sock.recv(g_watcher_read_size)
+        if not data:
+            raise EOFError("telnet connection closed")
+        if telnetlib.IAC not in data and not tn.iacseq and not tn.rawq:
+            return data.replace(telnetlib.theNULL, b'').replace(b'\x11', b'')
+        tn.rawq = tn.rawq[tn.irawq:] + data
+        tn.irawq = 0
+        tn.process_rawq()
+        data, tn.cookedq = tn.cookedq, b''
+        return data
+
+    def receive(self):
+        """ Consume the data available on the telnet session and advance the
+            command sequence.
+            Returns a list of (event, string) tuples, event being one of:
+            - 'verified': a verification string was seen for the first time
+            - 'boot_complete': the boot sequence is complete, and the watcher
+              is held (see hold_after_boot)
+            - 'stop': the test-specific stop string was found
+            - 'sys_stop': the generic FVP stop string was found
+            - 'fail': a failure string was found, or a command failed
+            Raises EOFError if the session was closed by the FVP.
+        """
+        return self.consume(self.readChunk())
+
+    def consume(self, raw):
+        """ Process data received on the session, see receive() """
+        self.last_receive = time.time()
+        if self.trace is not None and raw:
+            self.trace.record(TRACE_RECEIVED, raw)
+        self.history.write(raw)
+        data = self.decoder.decode(raw)
+
+        if self.termProcess is not None:
+            # Pipe terminal contents to user-visible terminal if available
+            self.termfilePipe.write(data)
+            self.termfilePipe.flush()
+
+        return self.match(data)
+
+    def resumeCarry(self):
+        """ Match the output carried over from the previous batch segment
+            against the strings of the current segment, see receive() """
+        data, self.carry = self.carry, u''
+        return self.match(data)
+
+    def match(self, data):
+        """ Match decoded output against the strings of the watcher, advance
+            the command sequence and return the events, see receive().
+            Matching stops at an event ending the current batch segment (see
+            ends_segment): the rest of the output belongs to the next segment
+            and is kept in carry """
+        events = []
+        now = time.time()
+        start = self.matcher.offset
+        for pattern, offset in self.matcher.feed(data):
+            first = len(events)
+            if pattern == self.prompt:
+                self.at_prompt = True
+            if pattern in self.verification_strs and pattern not in self.found:
+                self.found[pattern] = (offset, now)
+                events.append(('verified', pattern))
+
+            # Process a 'read' command
+            if self.readMatched(pattern):
+                self.recordStep('r', pattern)
+                self.runCommands()
+                if self.boot_complete:
+                    events.append(('boot_complete', pattern))
+
+            if pattern == self.stop_str:
+                self.recordStep('stop', pattern)
+                events.append(('stop', pattern))
+            if pattern == self.sys_stop_str:
+                self.recordStep('sys_stop', pattern)
+                events.append(('sys_stop', pattern))
+            if pattern in self.fail_strs or pattern in self.command_fail_strs:
+                self.recordStep('fail', pattern)
+                events.append(('fail', pattern))
+
+            if self.ends_segment is not None and \
+               any(self.ends_segment(*event) for event in events[first:]):
+                self.carry = data[offset - start:]
+                data = data[:offset - start]
+                break
+
+        if self.slicefile is not None:
+            self.slicefile.write(data.encode('utf-8'))
+            self.slicefile.flush()
+
+        return events + self.commandFailures()
+
+    def commandFailures(self):
+        """ Returns the 'fail' events of the commands which could not be
+            executed (ie. an injection of a missing file). Commands executed
+            outside of receive() (see startSession, beginSegment and
+            resumeAfterBoot) leave them pending until this is called """
+        events = []
+        for error in self.command_errors:
+            self.recordStep('fail', error)
+            events.append(('fail', error))
+        self.command_errors = []
+        return events
+
     def getParameters(self):
+        params = {}
         if self.fvp_uart is not None:
-            return {self.fvp_uart : self.termfile}
-        return {}
+            params[self.fvp_uart] = self.termfile
+        if self.fvp_port_param is not None and self.port is not None:
+            # Make the FVP listen on the port the watcher connects to
+            params[self.fvp_port_param] = str(self.port)
+        return params
 
     def clearFile(self):
         if os.path.isfile(self.termfile):
@@ -243,15 +676,107 @@ class FVPWrapper(object):
                 testname,
                 fvp_timeout,
                 stdin = None,
-                usermode = False
+                usermode = False,
+                log_subdir = None,
+                iris_port = None,
+                checkpoint_dir = None,
+                result_cache = None,
+                record_traces = False,
+                archive_logs = False,
+                hang_window = None,
+                mips_interval = None,
+                profile_interval = None,
+                profile_elfs = [],
+                inject_window = None,
+                inject_cpu = None
                 ):
 
         # Configuration
         self.fvp_path = str(fvp_path)
+        self.testname = testname
         self.work_dir = os.path.abspath(work_dir)
         self.log_dir = os.path.join(self.work_dir, "logs")
+        if log_subdir is not None:
+            # Tests executed in parallel each log to their own directory
+            self.log_dir = os.path.join(self.log_dir, log_subdir)
+        # Iris server port requested from the FVP. If None, a free port is
+        # leased when the model is loaded
+        self.iris_port = iris_port
+        self.port_leases = []
+        self.fvp_process = None
+        # Drains the model's stdout/stderr into <testname>_fvp.txt for the
+        # whole run, so that the model never blocks on a full pipe
+        self.fvp_output = None
+
+        # If a checkpoint directory is given, the model is restored from a
+        # checkpoint taken at the end of the watchers' boot sequences. If no
+        # checkpoint exists for the current images and model parameters, it
+        # is saved once the model has booted. Tests verifying the boot
+        # ('clean_boot') always boot the model (see useCheckpoint).
+        self.checkpoints = None
+        self.checkpoint_key = None
+        if checkpoint_dir is not None:
+            self.checkpoints = CheckpointStore(checkpoint_dir)
+
+        # If a result cache directory is given, a test whose inputs (FVP
+        # binary, images, model parameters and test specification) did not
+        # change since it last passed is not executed, its logs are restored
+        # from the cache instead
+        self.results = None
+        self.result_key = None
+        self.cached = False     # Set once the result was taken from the cache
+        if result_cache is not None:
+            self.results = ResultCache(result_cache)
         self.fvp_timeout = fvp_timeout
         self.fvp_name = fvp_name
+
+        # If set, the session of each watcher is recorded to
+        # <testname>_<terminal>.trace, for replaying it with uarttrace.py
+        self.record_traces = record_traces
+
+        # If set, the terminal logs are replaced by compressed log stores
+        # (<log>.lzs, see logstore.py) once the test is finished
+        self.archive_logs = archive_logs
+
+        # If a hang window is given (in seconds), the test is aborted as soon
+        # as no terminal received output and no CPU of the model progressed
+        # for that long, rather than when the timeout expires. A test
+        # specification may set its own 'hang_window'
+        self.hang_window = hang_window
+        self.watchdog = None
+        self.hang = False
+
+        # CPUs of the model, and the lock serializing the Iris requests of the
+        # watcher thread (checkpoints) and of the main thread (watchdog)
+        self.cpus = []
+        self.iris_lock = Lock()
+
+        # If a sampling interval is given (in seconds), the instructions
+        # executed per wall second by each CPU are sampled during the run,
+        # summarized per cluster in the test report and written to
+        # <testname>_mips.json
+        self.mips_interval = mips_interval
+        self.throughput = None
+
+        # If a profiling interval is given (in seconds), the PC of each CPU is
+        # sampled during the run and symbolized against the ELF files given
+        # as (cpu name pattern, ELF path). The profile is written to
+        # <testname>_profile.folded/.txt
+        self.profile_interval = profile_interval
+        self.profile_elfs = list(profile_elfs)
+        self.profiler = None
+
+        # Files are injected by the 'i' watcher commands into the window of
+        # guest physical memory given as (address, size), written through the
+        # first CPU whose name contains inject_cpu (see inject.py). A platform
+        # specific subclass may set the window of its guest
+        self.inject_window = inject_window
+        self.inject_cpu = inject_cpu
+        self.injector = None
+
+        # Start and end of each phase of the run, and time of each watcher
+        # command step, written to <testname>_timeline.json/.prom
+        self.timeline = Timeline(testname)
         self.watchers = []  # Inheriting class must initialize watchers
         self.testspec = {}  # Inheriting class mus define a test spec
 
@@ -269,11 +794,25 @@ class FVPWrapper(object):
         # Asserted only after a complete test run,including end string matching
         self.test_complete = False
         self.test_report = None
+        # (watcher name, string) of the failure string which aborted the test
+        self.failure = None
 
-        self.monitor_q = multiprocessing.Queue()
+        # Messages from the watcher thread to be printed by the main thread.
+        # A None entry only wakes up the main thread (see stop())
+        self.monitor_q = Queue.Queue()
         self.stop_all = False
+        self.stop_event = Event()
         self.threads = []
 
+        # Test specifications of a batch (see executeBatch), the index of the
+        # segment being executed and the (testname, exitcode, duration) of
+        # each finished segment
+        self.segments = []
+        self.segment_index = None
+        self.segment_start = None
+        self.segment_results = []
+        self.segment_report = None
+
         # If userMode is true, the test will display xterm instances for all
         # terminals of the FVP, which will mirror the contents of the terminal
         # log files within the xterm instance.
@@ -301,11 +840,37 @@ class FVPWrapper(object):
     def getModelData(self):
         raise Exception("Model-specific class must implement getModeldata")
 
+    def getTestParameters(self):
+        """ The platform specific subclass may implement this function for the
+        model parameters of files created for each test run (ie. flash images
+        written by the model). Like the watcher parameters, they differ between
+        tests and are not part of the checkpoint key """
+        return {}
+
+    def leasePorts(self, count, first_port=g_telnet_port_base):
+        """ Reserve a range of 'count' free ports for the FVP, which stays
+        reserved until the test has finished. Used by the platform specific
+        subclass for the telnet ports of its watchers """
+        lease = PortLease(count, first_port)
+        self.port_leases.append(lease)
+        return lease.ports
+
+    def releasePorts(self):
+        for lease in self.port_leases:
+            lease.release()
+        self.port_leases = []
+
     def load_fvp(self):
         try:
             # Get model specific parameters specified by inheriting class
             self.fvp_params.update(self.getModelParameters())
             self.fvp_data.update(self.getModelData())
+            if self.useCheckpoint():
+                # Test and watcher parameters (log files, telnet ports) differ
+                # between tests and are not part of the checkpoint key
+                self.checkpoint_key = self.checkpoints.key(self.fvp_path,
+                                                           self.fvp_params, self.fvp_data)
+            self.fvp_params.update(self.getTestParameters())
             # Get watcher specific model parameters from each watcher
             for watcher in self.watchers:
                 self.fvp_params.update(watcher.getParameters())
@@ -316,31 +881,47 @@ class FVPWrapper(object):
             print("FVP data:")
             print(self.fvp_data)
 
-            g_fvp_cmd[0] = self.fvp_path
+            # The command line is built from a copy of g_fvp_cmd, as several
+            # models may be loaded by one process (ie. the unit tests)
+            fvp_cmd = list(g_fvp_cmd)
+            fvp_cmd[0] = self.fvp_path
+
+            if self.iris_port is None:
+                self.iris_port = self.leasePorts(1, g_iris_port_base)[0]
+            fvp_cmd.append("--iris-port")
+            fvp_cmd.append(str(self.iris_port))
 
             for param,param_val in self.fvp_params.items() :
-                g_fvp_cmd.append("-C")
-                g_fvp_cmd.append(param+"="+param_val)
+                fvp_cmd.append("-C")
+                fvp_cmd.append(param+"="+param_val)
 
             for param,param_val in self.fvp_data.items() :
-                g_fvp_cmd.append("--data")
-                g_fvp_cmd.append(param+"="+param_val)
+                fvp_cmd.append("--data")
+                fvp_cmd.append(param+"="+param_val)
 
             print("FVP commandline:")
-            print(g_fvp_cmd)
-
-            fvp_process = Popen(g_fvp_cmd,stdout=PIPE) #running the FVP with pyIRIS server enabled
-
-            fvp_stdout = fvp_process.stdout.readline()
-
-            if re.match("Iris server started listening to port \d",fvp_stdout):
-                g_model_port=int(fvp_stdout.rpartition(' ')[-1])
-                print("Iris server port detected: " + str(g_model_port))
+            print(fvp_cmd)
+
+            #running the FVP with pyIRIS server enabled
+            with self.timeline.phase("spawn"):
+                self.fvp_process = Popen(fvp_cmd, stdout=PIPE, stderr=PIPE)
+                self.fvp_output = OutputDrain(self.fvp_process,
+                    os.path.join(self.log_dir, self.testname + "_fvp.txt"))
+
+            with self.timeline.phase("iris_port"):
+                iris_port = self.fvp_output.wait_iris_port(g_wait_fvp_ready)
+            if iris_port is not None:
+                self.iris_port = iris_port
+                print("Iris server port detected: " + str(self.iris_port))
             else:
+                print("FVP output:")
+                for line in self.fvp_output.tail(g_fvp_output_tail):
+                    print(line)
                 raise Exception("Failure to detect Iris server port")
 
-            fvp_ready = wait_iris_server(fvp_process=self.fvp_path,
-                                         iris_port=g_model_port,max_wait_time=g_wait_fvp_ready,wait_reason=0)
+            with self.timeline.phase("iris_ready"):
+                fvp_ready = wait_iris_server(fvp_process=self.fvp_process,
+                                             iris_port=self.iris_port,max_wait_time=g_wait_fvp_ready,wait_reason=0)
 
             if fvp_ready == False:
                 raise Exception("FVP not ready to connect")
@@ -349,9 +930,13 @@ class FVPWrapper(object):
 
             # Using pyIRIS network model to connect to the FVP
 
-            self.fvp = NetworkModel(g_model_hostname, g_model_port)
+            with self.timeline.phase("iris_connect"):
+                # iris.debug is only imported once a model is loaded, keeping
+                # the import of the wrapper cheap (ie. for --list)
+                from iris.debug import NetworkModel
+                self.fvp = NetworkModel(g_model_hostname, self.iris_port)
 
-            cpu = self.fvp.get_cpus()[0]
+                self.cpus = self.fvp.get_cpus()
 
         except Exception as e:
 
@@ -360,120 +945,323 @@ class FVPWrapper(object):
 
         # Model is now loaded and telnet sessions have been started
 
-    def run_watcher(self, watcher):
-        """ Run parallel threaded proccesses that monitors a telnet session
-        of the FVP and stops it when the a user specified string is found.
-        It returns the pid of the proccess for housekeeping """
-
-        def watcher_loop(queue, watcher):
-
-            # Start telnet session
-            tn = telnetlib.Telnet(host=watcher.host, port=watcher.port)
-
-            # Poll the telnet session, reading until a line is received
-            getNextCmd = True
-            while(True):
-                # Attempt to pop a command off of the command stack
-                while getNextCmd:
-                    try:
-                        command = watcher.commandqueue.pop()
-                    except IndexError:
-                        command = None
-                    # Execute all write commands which are in sequence
-                    if command and command[0] == 'w':
-                        tn.write((command[1] + '\n').encode('utf-8'))
-                        getNextCmd = True
-                    else:
-                        getNextCmd = False
-
-                # Read until a full line has been received or the watcher is
-                # signalled to stop
-                line = ""
-                while(# Stop if a newline character is seen
-                    '\n' not in line and
-                    # Stop if the global stop signal has been asserted
-                    not self.stop_all and
-                    # Stop if the string of a 'read' command is found
-                    (command[1] not in line if command and command[0] == 'r' else True)):
-                    line += tn.read_very_eager().decode('utf-8')
-
-                if watcher.termProcess is not None:
-                    # Pipe terminal contents to user-visible terminal if available
-                    watcher.termfilePipe.write(line)
-                    watcher.termfilePipe.flush()
-
-                if self.stop_all:
-                    return
-
-                # Process a 'read' command
-                if command and command[0] == 'r' and command[1] in line:
-                    getNextCmd = True
-
-                if(watcher.stop_str is not None and watcher.stop_str in line):
-                    queue.put("{0}: Found end string \"{1}\"".format(watcher.name, watcher.stop_str))
-                    queue.put("{0}: Stopping all other threads...".format(watcher.name))
-                    self.test_complete = True
-                    self.stop()
-                    return
-
-                # Check for the system stop string (ie. FVP stopped by itself)
-                if watcher.sys_stop_str in line:
-                    self.success = False
-                    queue.put("Simulation Ended: \"{0}\"".format(line))
-                    self.stop()
-                    return
+    def run_watchers(self, watchers):
+        """ Run a single thread monitoring the telnet sessions of all watchers.
+        The thread sleeps in select() until data arrives on one of the sessions,
+        executes the watchers' command sequences and stops the FVP when a user
+        specified string is found.
+        It returns the thread for housekeeping """
+
+        def watcher_loop(queue, watchers):
+
+            # Start telnet sessions
+            for watcher in watchers:
+                watcher.connect()
+
+            active = list(watchers)
+            try:
+                while active and not self.stop_all:
+                    # Commands which failed outside of receive() are reported
+                    # at once, rather than with the next output of the model
+                    failed = [watcher for watcher in watchers if watcher.command_errors]
+                    readable, _, _ = select.select(active, [], [],
+                                                   0 if failed else g_watcher_poll_interval)
+
+                    if self.segments and time.time() - self.segment_start > \
+                       self.testTimeout(self.segments[self.segment_index]):
+                        queue.put("ERROR: Timeout reached for test '{0}'! ({1} seconds)".format(
+                            self.segments[self.segment_index]['name'],
+                            self.testTimeout(self.segments[self.segment_index])))
+                        if not self.nextSegment(queue, watchers, False):
+                            return
+
+                    ready = [(watcher, watcher.commandFailures) for watcher in failed]
+                    ready += [(watcher, watcher.receive) for watcher in readable]
+                    for watcher, receive in ready:
+                        try:
+                            events = receive()
+                        except EOFError:
+                            queue.put("{0}: Telnet session closed".format(watcher.name))
+                            active.remove(watcher)
+                            continue
+
+                        if self.stop_all:
+                            return
+
+                        while True:
+                            for event, string in events:
+                                if event == 'boot_complete':
+                                    self.checkpointBootedModel(queue, watchers)
+
+                                elif event == 'stop':
+                                    queue.put("{0}: Found end string \"{1}\"".format(watcher.name, string))
+                                    if self.segments:
+                                        if not self.nextSegment(queue, watchers, True):
+                                            return
+                                        # The output following the stop string
+                                        # is carried over to the new segment
+                                        break
+                                    queue.put("{0}: Stopping all other threads...".format(watcher.name))
+                                    self.test_complete = True
+                                    self.stop()
+                                    return
+
+                                # A failure string aborts the test (and the
+                                # remaining tests of a batch) at once
+                                elif event == 'fail':
+                                    self.success = False
+                                    self.failure = (watcher.name, string)
+                                    queue.put("{0}: Found failure string \"{1}\", last lines:".format(
+                                        watcher.name, string))
+                                    for line in watcher.lastLines(g_fail_context_lines):
+                                        queue.put("    " + line)
+                                    if self.segments:
+                                        self.segmentFinished(queue, watchers, False)
+                                    queue.put("Stopping all threads...")
+                                    self.stop()
+                                    return
+
+                                # Check for the system stop string (ie. FVP stopped by itself)
+                                elif event == 'sys_stop':
+                                    self.success = False
+                                    queue.put("Simulation Ended: \"{0}\"".format(string))
+                                    if self.segments:
+                                        self.segmentFinished(queue, watchers, False)
+                                    self.stop()
+                                    return
+
+                                elif event == 'verified' and self.verificationSettled():
+                                    if self.segments:
+                                        queue.put("All verification strings found")
+                                        if not self.nextSegment(queue, watchers, True):
+                                            return
+                                        break
+                                    queue.put("All verification strings found, stopping all threads...")
+                                    self.test_complete = True
+                                    self.stop()
+                                    return
+                            if not watcher.carry:
+                                break
+                            # Output received after the end of the previous
+                            # segment, matched against the new segment
+                            events = watcher.resumeCarry()
+            finally:
+                for watcher in watchers:
+                    watcher.close()
+                # Wake up blocking_wait, which notices the finished thread
+                queue.put(None)
 
-                # Yield
-                sleep(0)
+        if self.userMode:
+            for watcher in watchers:
+                watcher.startTerminalPipe(self.fvp_name)
 
-        # Run the watcher as a separate thread
+        # Run the watchers as a separate thread
         watcher_thread = Thread(target=watcher_loop,
-                                args=(self.monitor_q, watcher))
-        watcher_thread.setName(watcher.name)
+                                args=(self.monitor_q, watchers))
+        watcher_thread.setName("telnet_watchers")
+        # A thread which cannot be joined (ie. stuck in a telnet connect) must
+        # not prevent the test process from exiting
+        watcher_thread.setDaemon(True)
         watcher_thread.start()
 
-        if self.userMode:
-            watcher.startTerminalPipe(self.fvp_name)
-
         return watcher_thread
 
-    def monitor_consume(self):
-        """ Read the ouptut of the monitor thread and print the queue entries
-        one entry at the time (One line per call) """
+    def verificationSettled(self):
+        """ A test without stop strings is complete as soon as all of its
+        verification strings have been received, rather than when the
+        timeout expires """
+        if any(watcher.stop_str is not None for watcher in self.watchers):
+            return False
+        return all(watcher.verified() for watcher in self.watchers)
+
+    def segmentEnded(self, event, string):
+        """ True if an event of a watcher ends the current segment of a batch
+        (see run_watchers) """
+        return event == 'stop' or (event == 'verified' and self.verificationSettled())
+
+    def useCheckpoint(self):
+        """ A test starts from a checkpoint of the booted model, unless it
+        verifies the boot itself ('clean_boot') or has no boot sequence for a
+        checkpoint to skip """
+        if self.checkpoints is None or self.testspec.get('clean_boot', False):
+            return False
+        return any(watcher.boot_commands != 0 for watcher in self.watchers)
+
+    def restoreCheckpoint(self):
+        """ Restore the model from the checkpoint matching its images and
+        parameters, or prepare the watchers for saving one """
+        if self.checkpoints.exists(self.checkpoint_key):
+            path = self.checkpoints.path(self.checkpoint_key)
+            print("Restoring checkpoint: " + path)
+            self.fvp.restore_checkpoint(path)
+            for watcher in self.watchers:
+                watcher.skipBootCommands()
+        else:
+            print("No checkpoint found, saving one once the model has booted")
+            for watcher in self.watchers:
+                if watcher.boot_commands != 0:
+                    watcher.hold_after_boot = True
+
+    def checkpointBootedModel(self, queue, watchers):
+        """ Called by the watcher thread when a watcher reached the end of its
+        boot sequence. Once all watchers have, the model is stopped, a
+        checkpoint is saved and the watchers resume with the test commands """
+        held = [watcher for watcher in watchers if watcher.hold_after_boot]
+        if not all(watcher.boot_complete for watcher in held):
+            return
+
+        tmpdir = self.checkpoints.begin(self.checkpoint_key)
+        self.timeline.begin("checkpoint_save")
+        with self.iris_lock:
+            try:
+                self.fvp.stop()
+                self.fvp.save_checkpoint(tmpdir)
+                self.checkpoints.commit(self.checkpoint_key, tmpdir,
+                    {'fvp_path': self.fvp_path, 'fvp_params': self.fvp_params,
+                     'fvp_data': self.fvp_data, 'testname': self.testspec['name']})
+                queue.put("Checkpoint saved: {0}".format(
+                    self.checkpoints.path(self.checkpoint_key)))
+            except Exception as e:
+                self.checkpoints.discard(tmpdir)
+                queue.put("Failed to save checkpoint: {0}".format(e))
+            finally:
+                self.fvp.run(blocking=False)
+                self.timeline.end("checkpoint_save")
+
+        for watcher in held:
+            watcher.resumeAfterBoot()
+
+    def applyTestspec(self, testspec):
+        """ The platform specific subclass should implement this function for
+        batched execution: it sets the stop and verification strings of the
+        watchers and adds the commands of the test specification, without the
+        boot commands """
+        raise Exception("Model-specific class must implement applyTestspec for batched execution")
+
+    def beginSegment(self, index):
+        """ Start the segment of a batch executing the test specification at
+        the given index """
+        testspec = self.segments[index]
+        self.segment_index = index
+        self.applyTestspec(testspec)
+        self.segment_start = time.time()
+        self.timeline.begin("segment " + testspec['name'])
+        for watcher in self.watchers:
+            watcher.beginSegment(os.path.join(self.log_dir,
+                "{0}_{1}.txt".format(testspec['name'], watcher.terminal)))
+        self.monitor_q.put("Test '{0}' ({1}/{2}) started".format(
+            testspec['name'], index + 1, len(self.segments)))
+
+    def segmentFinished(self, queue, watchers, completed):
+        """ Record the verdict of the current segment. completed is False if
+        the segment ended without its stop condition (timeout, model stopped)"""
+        testname = self.segments[self.segment_index]['name']
+        success = completed
+        for watcher in watchers:
+            success &= watcher.verify(output=queue.put)
+        for watcher in self.watchers:
+            watcher.endSegment()
+        duration = time.time() - self.segment_start
+        self.timeline.end("segment " + testname)
+        self.segment_results.append((testname, 0 if success else 1, duration))
+        if self.segment_report is not None:
+            self.segment_report(testname, 0 if success else 1, duration)
+        queue.put("Test '{0}': {1} ({2:.1f}s)".format(testname,
+            "PASS" if success else "FAIL", duration))
+
+    def nextSegment(self, queue, watchers, completed):
+        """ Called by the watcher thread when the current segment of a batch
+        ended: records its verdict and starts the next segment on the same
+        session. Returns False, after stopping all threads, once all segments
+        were executed """
+        self.segmentFinished(queue, watchers, completed)
+        if self.segment_index + 1 == len(self.segments):
+            queue.put("All tests of the batch executed, stopping all threads...")
+            self.test_complete = True
+            self.stop()
+            return False
+        self.beginSegment(self.segment_index + 1)
+        return True
+
+    def monitor_consume(self, timeout=0):
+        """ Wait up to timeout seconds for output of the monitor thread, then
+        print all the queue entries """
         try:
-            line = self.monitor_q.get_nowait()
+            line = self.monitor_q.get(timeout=timeout) if timeout > 0 else \
+                   self.monitor_q.get_nowait()
+            while True:
+                if line is not None:
+                    print(line.rstrip())
+                line = self.monitor_q.get_nowait()
         except Queue.Empty:
             return
-        else:
-            print(line.rstrip())
-            self.monitor_consume()
 
     def has_stopped(self):
         """Return status of stop flag. True indicated stopped state """
-        return self.stop_all
+        return self.stop_event.is_set()
 
     def start(self):
         # Load the FVP, exposing the Telnet sessions
         self.load_fvp()
 
-        # Start telnet watchers
+        if self.useCheckpoint():
+            with self.timeline.phase("checkpoint_restore"):
+                self.restoreCheckpoint()
+
+        self.injector = Injector(self.cpus, self.inject_window, self.inject_cpu,
+                                 self.iris_lock, output=self.monitor_q.put)
+
         for watcher in self.watchers:
-            if watcher.port != None:
-                self.threads.append(self.run_watcher(watcher))
+            watcher.timeline = self.timeline
+            watcher.injector = self.injector
+            if self.record_traces and watcher.port is not None:
+                watcher.trace = TraceWriter(os.path.join(self.log_dir,
+                    "{0}_{1}.trace".format(self.testname, watcher.terminal)))
+
+        # Start telnet watchers
+        self.threads.append(self.run_watchers(
+            [watcher for watcher in self.watchers if watcher.port != None]))
 
         # With all watchers hooked into their telnet sessions, the test may
         # commence.
         # To log the FVP output, the fvp is executed in a separate process,
         # assigning stdout for the process to the FVP log file
 
-        self.fvp.run(blocking=False)
+        with self.timeline.phase("run"):
+            self.fvp.run(blocking=False)
 
         # Start test timer
         self.startTime = time.time()
+        self.startCpuTimes = os.times()
+        self.timeline.begin("execution")
+
+        hang_window = self.testspec.get('hang_window', self.hang_window)
+        if hang_window and not self.userMode:
+            self.watchdog = HangWatchdog(self.cpus, hang_window)
+
+        if self.mips_interval:
+            self.throughput = ThroughputSampler(self.cpus, self.mips_interval,
+                                                self.iris_lock)
+            self.throughput.start()
+
+        if self.profile_interval:
+            try:
+                self.profiler = PCProfiler(self.cpus, self.profile_interval,
+                                           self.profile_elfs, self.iris_lock)
+                self.profiler.start()
+            except Exception as e:
+                print("WARNING: profiling disabled: {0}".format(e))
+
+    def testTimeout(self, testspec):
+        """ Timeout of a test in seconds: the 'timeout' of its test
+            specification, or the timeout given to the wrapper """
+        return testspec.get('timeout') or self.fvp_timeout
 
     def stop(self):
         """ Send stop signal to all threads """
         self.stop_all = True
+        self.stop_event.set()
+        self.monitor_q.put(None)
 
     def test(self):
         """ Compare each watcher log file with its corresponding verification
@@ -485,23 +1273,39 @@ class FVPWrapper(object):
 
     def blocking_wait(self):
         """ Block execution flow and wait for one of the watchers to complete """
+        # Each segment of a batch is given its test timeout
+        if self.segments:
+            timeout = sum(self.testTimeout(testspec) for testspec in self.segments)
+        else:
+            timeout = self.testTimeout(self.testspec)
+        deadline = self.startTime + timeout
         try:
-            while True:
+            while not self.has_stopped():
+                # Check for timeout
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    print("ERROR: Timeout reached! ({0} seconds)".format(timeout))
+                    self.stop()
+                    break
+
+                # Sleep until a thread posts a message, stops the test or
+                # finishes, or until the timeout expires (waking up for the
+                # watchdog)
+                if self.watchdog is not None:
+                    remaining = min(remaining, g_watchdog_interval)
+                self.monitor_consume(timeout=remaining)
+
+                if self.watchdog is not None and not self.has_stopped() and \
+                   self.checkHang():
+                    self.stop()
+                    break
+
                 for thread in self.threads:
-                    self.monitor_consume()
                     if not thread.isAlive():
                         print(("Thread '{0}' finished," +
                         "sending stop signal to all threads...").format(thread.getName()))
                         self.stop()
                         break
-                if self.has_stopped():
-                    break
-                # Check for timeout
-                if (time.time() - self.startTime) > self.fvp_timeout:
-                    print("ERROR: Timeout reached! ({0} seconds)".format(self.fvp_timeout))
-                    self.stop()
-                    break
-
 
         except KeyboardInterrupt:
             print("User initiated interrupt")
@@ -511,8 +1315,94 @@ class FVPWrapper(object):
         print("Awaiting all threads to finish...")
         for thread in self.threads:
             print("Joining with thread: " + thread.getName())
-            thread.join()
+            thread.join(g_wait_thread_join)
+            if thread.isAlive():
+                print("WARNING: thread '{0}' did not finish within {1} seconds".format(
+                    thread.getName(), g_wait_thread_join))
+        self.monitor_consume()
         print("All threads finished")
+        self.timeline.end("execution")
+        if self.throughput is not None:
+            self.throughput.stop(g_wait_thread_join)
+        if self.profiler is not None:
+            self.profiler.stop(g_wait_thread_join)
+        if self.hang:
+            self.printHangReport()
+        self.printHostUsage()
+        if self.throughput is not None:
+            self.printThroughput()
+        if self.profiler is not None:
+            self.writeProfile()
+
+    def lastOutputTime(self):
+        """ Time at which any terminal last received output """
+        times = [watcher.last_receive for watcher in self.watchers
+                 if watcher.last_receive is not None]
+        return max(times) if times else self.startTime
+
+    def checkHang(self):
+        """ Sample the CPUs of the model and return True, after failing the
+            test, if neither the terminals nor the CPUs progressed for the
+            hang window """
+        now = time.time()
+        with self.iris_lock:
+            if self.stop_all:
+                return False
+            hung = self.watchdog.hung(now, self.lastOutputTime())
+        if not hung:
+            return False
+        self.success = False
+        self.hang = True
+        self.timeline.step("watchdog", 0, 'hang', "")
+        print("ERROR: Model hang detected! (no output nor CPU progress for {0} seconds)".format(
+            self.watchdog.window))
+        return True
+
+    def printHangReport(self):
+        print("CPU samples:")
+        for line in self.watchdog.report():
+            print("    " + line)
+        for watcher in self.watchers:
+            idle = time.time() - watcher.last_receive \
+                   if watcher.last_receive is not None else None
+            print("{0}: {1}, last lines:".format(watcher.name,
+                "not connected" if idle is None else "idle for {0:.1f}s".format(idle)))
+            for line in watcher.lastLines(g_hang_context_lines):
+                print("    " + line)
+
+    def printHostUsage(self):
+        """ Print the host CPU time spent by the wrapper process (watchers and
+            supervision) while the model was running, next to the wall time of
+            the simulation itself """
+        cpu_times = os.times()
+        user = cpu_times[0] - self.startCpuTimes[0]
+        system = cpu_times[1] - self.startCpuTimes[1]
+        wall = time.time() - self.startTime
+        print("Host CPU time: {0:.2f}s user, {1:.2f}s system over {2:.2f}s of simulation".format(
+            user, system, wall))
+
+    def printThroughput(self):
+        """ Print the simulation throughput of each cluster and write the
+            samples to <testname>_mips.json """
+        print("Simulation throughput:")
+        for line in self.throughput.report():
+            print("    " + line)
+        path = os.path.join(self.log_dir, self.testname + "_mips.json")
+        try:
+            self.throughput.write(path)
+        except (IOError, OSError) as e:
+            print("Failed to write the throughput samples: {0}".format(e))
+            return
+        print("Throughput samples: " + path)
+
+    def writeProfile(self):
+        try:
+            path = self.profiler.write(os.path.join(self.log_dir,
+                                                    self.testname + "_profile"))
+        except (IOError, OSError) as e:
+            print("Failed to write the profile: {0}".format(e))
+            return
+        print("Profile ({0} samples): {1}".format(self.profiler.samples, path))
 
     def verifyInitialization(self):
         """ Various sanity checks to verify that an inheriting class has
@@ -528,6 +1418,11 @@ class FVPWrapper(object):
 
             printHeader0("FVP Test: {0}".format(self.testspec['name']))
 
+            if self.results is not None and self.cachedResult():
+                printHeader1("FVP Test successfull (cached): {0}".format(self.testspec['name']))
+                print('='*80 + "\n\n")
+                return 0
+
             # Start the wrapper
             print()
             printHeader1("FVP Execution")
@@ -537,17 +1432,7 @@ class FVPWrapper(object):
             self.blocking_wait()
 
             print("Test execution finished, shutting down model...")
-
-            #terminates the model and allows the FVP to release the TXT log files
-            self.fvp.release(True)
-
-            fvp_terminated = wait_iris_server(fvp_process=self.fvp_path,
-                                         iris_port=g_model_port, max_wait_time=g_wait_fvp_finish, wait_reason=1)
-
-            if fvp_terminated == False:
-                raise Exception("FVP failed to shutdown")
-
-            print("FVP shutdown successfully")
+            self.shutdownModel()
 
             if self.success:
                 print()
@@ -563,6 +1448,17 @@ class FVPWrapper(object):
                 for watcher in self.watchers:
                     watcher.stopTerminalPipe()
 
+            if self.success and self.results is not None:
+                self.storeResult()
+
+            if self.archive_logs:
+                self.archiveLogs([watcher.termfile for watcher in self.watchers])
+
+            if self.failure is not None:
+                print("Test aborted: {0} found failure string \"{1}\"".format(*self.failure))
+            if self.hang:
+                print("Test aborted: model hang")
+
             print("\n")
             if self.success:
                 printHeader1("FVP Test successfull: {0}".format(self.testspec['name']))
@@ -578,3 +1474,147 @@ class FVPWrapper(object):
 
             show_exception_details(e, self.fvp_path, self.fvp_params)
             sys.exit(1)
+
+        finally:
+            # Also written when the model failed to start, where the timeline
+            # shows the phase which did not complete
+            self.writeTimeline()
+
+    def shutdownModel(self):
+        #terminates the model and allows the FVP to release the TXT log files
+        with self.timeline.phase("release"):
+            self.fvp.release(True)
+
+        with self.timeline.phase("shutdown"):
+            fvp_terminated = wait_iris_server(fvp_process=self.fvp_process,
+                                              iris_port=self.iris_port, max_wait_time=g_wait_fvp_finish, wait_reason=1)
+
+        if fvp_terminated == False:
+            self.fvp_process.kill()
+            self.fvp_output.close(g_wait_thread_join)
+            raise Exception("FVP failed to shutdown")
+
+        print("FVP shutdown successfully")
+        self.fvp_output.close(g_wait_thread_join)
+        print("FVP output: " + self.fvp_output.summary())
+        self.releasePorts()
+
+    def executeBatch(self, testspecs, report=None):
+        """ Execute several test specifications in a single model session.
+        The model is booted once, then the test specifications are executed
+        one after another as segments of the session: each segment applies the
+        stop strings, verification strings and commands of its test
+        specification (see applyTestspec), logs the output of each terminal to
+        <test>_<terminal>.txt, and ends with the verdict of the test.
+        Returns the (testname, exitcode, duration) of each test. If given,
+        report(testname, exitcode, duration) is called as soon as the verdict
+        of a test is known """
+        try:
+            self.success = True
+            self.verifyInitialization()
+            self.segments = list(testspecs)
+            self.segment_report = report
+            for watcher in self.watchers:
+                watcher.ends_segment = self.segmentEnded
+
+            printHeader0("FVP Test batch: {0}".format(
+                ", ".join(testspec['name'] for testspec in self.segments)))
+
+            print()
+            printHeader1("FVP Execution")
+            self.beginSegment(0)
+            self.start()
+
+            # Wait for all segments to complete
+            self.blocking_wait()
+
+            print("Batch execution finished, shutting down model...")
+            self.shutdownModel()
+
+            # Tests which were not completed when the batch was interrupted
+            # (ie. by the model stopping) fail
+            results = list(self.segment_results)
+            for testspec in self.segments[len(results):]:
+                results.append((testspec['name'], 1, 0.0))
+                if report is not None:
+                    report(testspec['name'], 1, 0.0)
+
+            if self.archive_logs:
+                self.archiveLogs([watcher.termfile for watcher in self.watchers] +
+                                 [os.path.join(self.log_dir, "{0}_{1}.txt".format(
+                                      testspec['name'], watcher.terminal))
+                                  for testspec in self.segments for watcher in self.watchers])
+
+            print()
+            printHeader1("FVP Test batch results")
+            for testname, exitcode, duration in results:
+                print("{0}: {1} ({2:.1f}s)".format(testname,
+                    "PASS" if exitcode == 0 else "FAIL", duration))
+            print('='*80 + "\n\n")
+            return results
+
+        except Exception as e:
+
+            show_exception_details(e, self.fvp_path, self.fvp_params)
+            sys.exit(1)
+
+        finally:
+            self.writeTimeline()
+
+    def cachedResult(self):
+        """ Look the test up in the result cache. Returns True if the test
+            passed with the same inputs, after restoring its logs """
+        try:
+            self.result_key = result_key(type(self).__name__, self.fvp_path,
+                                         self.getModelParameters(), self.getModelData(),
+                                         self.testspec, self.results.hashes)
+            self.results.hashes.save()
+            meta = self.results.restore(self.result_key, self.log_dir)
+        except (IOError, OSError) as e:
+            print("WARNING: result cache unavailable: {0}".format(e))
+            self.results = None
+            return False
+        if meta is None:
+            print("No cached result: " + self.result_key)
+            return False
+        print("Cached pass: {0} (stored {1})".format(self.results.path(self.result_key),
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(meta['created']))))
+        print("Logs restored to " + self.log_dir)
+        self.cached = True
+        return True
+
+    def storeResult(self):
+        """ Store the logs of a passing test in the result cache """
+        log_files = [watcher.termfile for watcher in self.watchers
+                     if os.path.isfile(watcher.termfile)]
+        log_files.append(self.fvp_output.logpath)
+        try:
+            self.results.store(self.result_key, log_files,
+                               {'testname': self.testname, 'exitcode': 0,
+                                'fvp_path': self.fvp_path})
+        except (IOError, OSError) as e:
+            print("WARNING: failed to store the test result: {0}".format(e))
+
+    def archiveLogs(self, paths):
+        """ Replace the given logs by compressed log stores """
+        for path in paths:
+            if not os.path.isfile(path) or os.path.getsize(path) == 0:
+                continue
+            size = os.path.getsize(path)
+            try:
+                store = archive(path)
+            except (IOError, OSError) as e:
+                print("WARNING: failed to archive {0}: {1}".format(path, e))
+                continue
+            print("Archived {0} ({1} -> {2} bytes)".format(store, size,
+                                                          os.path.getsize(store)))
+
+    def writeTimeline(self):
+        try:
+            path = self.timeline.write(self.log_dir)
+        except (IOError, OSError) as e:
+            print("Failed to write the test timeline: {0}".format(e))
+            return
+        print("Timeline: " + path)
+        for line in self.timeline.summary():
+            print("    " + line)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" inject.py:
+Transfer of host files to the guest through the memory of the model.
+A file is written through Iris into a window of guest physical memory, then
+copied to the guest filesystem by a single console command: the window is
+read from /dev/mem, truncated to the length of the file and checked against
+its md5 checksum, the guest printing '<destination>: OK' (or FAILED).
+The window must not be used by the guest (ie. reserved with memmap= or a
+no-map reserved-memory region) and be readable through /dev/mem. It is reused
+by each transfer, the next transfer only starting once the guest has copied
+the previous one.
+Injections are given to the watchers as ('i', '<host path>:<guest path>')
+commands, see TelnetWatcher.runCommands.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+import time
+
+from watchdog import cpu_name
+
+# Memory space of the CPU through which the window is written: the physical
+# address space, as the window is given by its physical address
+g_inject_memory_space = "Physical Memory (Non Secure)"
+
+# Bytes written per Iris request, bounding the size of a request
+g_inject_chunk_size = 64 * 1024
+
+# Page size of the guest reader (dd block size), the window must be aligned to it
+g_guest_page_size = 4096
+
+g_word = struct.Struct("<Q")
+
+
+def parse_window(value):
+    """ Parse an '<address>,<size>' window (decimal or 0x prefixed), returning
+        (address, size) or None """
+    address, sep, size = value.partition(',')
+    try:
+        address, size = int(address, 0), int(size, 0)
+    except ValueError:
+        return None
+    if not sep or size <= 0 or address < 0 or address % g_guest_page_size:
+        return None
+    return address, size
+
+
+def parse_injection(value):
+    """ Parse a '<host path>:<guest path>' injection, returning (source,
+        destination) """
+    source, _, dest = value.partition(':')
+    return source, dest
+
+
+def injection_strings(dest):
+    """ Lines printed by the guest once the copy of dest is checked, on
+        success and on a checksum mismatch """
+    return "{0}: OK".format(dest), "{0}: FAILED".format(dest)
+
+
+def reader_command(address, length, checksum, dest, executable=False):
+    """ Console command copying length bytes of the window at address to dest
+        in the guest and checking the copy """
+    pages = (length + g_guest_page_size - 1) // g_guest_page_size
+    command = "dd if=/dev/mem bs={0} skip={1} count={2} 2>/dev/null | head -c {3} > {4}".format(
+        g_guest_page_size, address // g_guest_page_size, pages, length, dest)
+    if executable:
+        command += " && chmod 755 {0}".format(dest)
+    return command + " && echo '{0}  {1}' | md5sum -c".format(checksum, dest)
+
+
+def write_payload(cpu, address, payload, memory_space=g_inject_memory_space):
+    """ Write payload to the memory of the model at address, in 64 bit words """
+    if len(payload) % g_word.size:
+        payload += b"\0" * (g_word.size - len(payload) % g_word.size)
+    for offset in range(0, len(payload), g_inject_chunk_size):
+        chunk = payload[offset:offset + g_inject_chunk_size]
+        words = list(struct.unpack("<{0}Q".format(len(chunk) // g_word.size), chunk))
+        cpu.write_memory(address + offset, words, memory_space=memory_space,
+                         size=g_word.size, count=len(words))
+
+
+class Injector(object):
+    def __init__(self, cpus, window, cpu_pattern=None, lock=None,
+                 memory_space=g_inject_memory_space, output=None):
+        """ window is the (address, size) of the guest memory receiving the
+            files, written through the first CPU whose name contains
+            cpu_pattern (or the first CPU) """
+        self.window = window
+        self.cpu = None
+        for i, cpu in enumerate(cpus):
+            if cpu_pattern is None or cpu_pattern in cpu_name(cpu, i):
+                self.cpu = cpu
+                break
+        self.cpu_pattern = cpu_pattern
+        self.memory_space = memory_space
+        # Serializes the Iris requests with those of other threads
+        self.lock = lock if lock is not None else threading.Lock()
+        self.output = output
+
+    def inject(self, source, dest):
+        """ Write the file source to the window, returning the console command
+            copying it to dest in the guest """
+        if self.window is None:
+            raise Exception("Cannot inject {0}: no injection window given".format(source))
+        if self.cpu is None:
+            raise Exception("Cannot inject {0}: no CPU matches '{1}'".format(source,
+                                                                            self.cpu_pattern))
+        try:
+            with open(source, "rb") as f:
+                payload = f.read()
+        except (IOError, OSError) as e:
+            raise Exception("Cannot inject {0}: {1}".format(source, e.strerror))
+        address, size = self.window
+        if len(payload) > size:
+            raise Exception("Cannot inject {0}: {1} bytes do not fit the window of {2} "
+                            "bytes".format(source, len(payload), size))
+
+        start = time.time()
+        with self.lock:
+            write_payload(self.cpu, address, payload, self.memory_space)
+        elapsed = time.time() - start
+        checksum = hashlib.md5(payload).hexdigest()
+        if self.output is not None:
+            self.output("Injected {0} to {1}: {2} bytes in {3:.3f}s ({4:.2f} MB/s), "
+                        "md5 {5}".format(source, dest, len(payload), elapsed,
+                                         len(payload) / max(elapsed, 1e-6) / 1e6, checksum))
+        return reader_command(address, len(payload), checksum, dest,
+                              os.access(source, os.X_OK))
@@ -0,0 +1,479 @@
+#!/usr/bin/env python2.7
+
+from __future__ import print_function
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" logstore.py:
+Compressed and indexed store of UART logs.
+A log is stored as a sequence of independently compressed chunks (zlib) of
+about g_chunk_size bytes, cut at line boundaries. Each chunk is preceded by a
+header giving its size, the number of the first line it holds, its number of
+lines and, when known, the time range over which its data was received. The
+headers are gathered into an index at the end of the store, which is read
+through mmap: queries on a range of lines or time only decompress the chunks
+of the range, one at a time, so that memory use is bounded by the chunk size
+whatever the size of the log. A store whose index was not written (ie. the
+writer was killed) is indexed by scanning the chunk headers.
+Times are only known for logs packed from a watcher trace (see uarttrace.py),
+and are resolved to the chunk: a time range query returns the whole chunks
+received within the range.
+
+Usage:
+python logstore.py pack <log or trace> [-o store] [--remove]
+python logstore.py info <store>
+python logstore.py cat <store>
+python logstore.py lines <store> <first> <last>
+python logstore.py tail <store> [-n count]
+python logstore.py grep <store> <regex> [--lines first:last] [--since s] [--until s]
+Line numbers are 1-based, as printed by grep -n.
+"""
+
+import argparse
+import bisect
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+
+g_store_magic = b"LOGSTOR1"
+g_index_magic = b"LOGSTEND"
+g_store_extension = ".lzs"
+
+# Uncompressed size at which a chunk is cut at the last line boundary, and
+# multiple of it at which it is cut regardless (ie. output without newlines)
+g_chunk_size = 256 * 1024
+g_chunk_max_factor = 4
+g_compression_level = 6
+
+# Size of the blocks read from plain log files while searching them
+g_read_block_size = 1024 * 1024
+
+# Chunk header: compressed size, uncompressed size, first line (0-based number
+# of the line the chunk starts in), number of newlines, first and last
+# receive time (NaN if unknown), flags
+g_chunk_header = struct.Struct("<IIQIddB")
+# Index entry: offset of the chunk header in the store, then the header
+g_index_entry = struct.Struct("<Q")
+# Footer: offset of the index, number of chunks
+g_footer = struct.Struct("<QI8s")
+
+# The chunk starts in the middle of a line (the previous chunk was cut
+# without a line boundary)
+CHUNK_CONTINUED = 1
+
+
+def is_store(path):
+    with open(path, "rb") as f:
+        return f.read(len(g_store_magic)) == g_store_magic
+
+
+def to_bytes(string):
+    return string.encode('utf-8') if not isinstance(string, bytes) else string
+
+
+class Chunk(object):
+    __slots__ = ['offset', 'clen', 'ulen', 'first_line', 'nlines',
+                 't_first', 't_last', 'flags']
+
+    def __init__(self, offset, header):
+        self.offset = offset
+        (self.clen, self.ulen, self.first_line, self.nlines,
+         self.t_first, self.t_last, self.flags) = header
+
+    def header(self):
+        return g_chunk_header.pack(self.clen, self.ulen, self.first_line, self.nlines,
+                                   self.t_first, self.t_last, self.flags)
+
+
+class LogStoreWriter(object):
+    def __init__(self, path, chunk_size=g_chunk_size):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.max_size = g_chunk_max_factor * chunk_size
+        self.file = open(path, "wb")
+        self.file.write(g_store_magic)
+        self.offset = len(g_store_magic)
+        self.chunks = []
+        self.buffer = b''
+        self.times = [float('nan'), float('nan')]
+        self.lines = 0          # Newlines written to the chunks so far
+        self.continued = False  # The next chunk starts in the middle of a line
+
+    def write(self, data, timestamp=None):
+        """ Append data to the log, received at the given time (in seconds) """
+        if not data:
+            return
+        if timestamp is not None:
+            if math.isnan(self.times[0]):
+                self.times[0] = timestamp
+            self.times[1] = timestamp
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            # Cut after the last line ending within the chunk size, or else
+            # after the first one within the maximum size
+            cut = self.buffer.rfind(b'\n', 0, self.chunk_size) + 1
+            if cut == 0:
+                cut = self.buffer.find(b'\n', self.chunk_size, self.max_size) + 1
+            if cut == 0:
+                if len(self.buffer) < self.max_size:
+                    return
+                cut = self.max_size
+            self.flushChunk(cut)
+
+    def flushChunk(self, size):
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        compressed = zlib.compress(data, g_compression_level)
+        chunk = Chunk(self.offset, (len(compressed), len(data), self.lines, data.count(b'\n'),
+                                    self.times[0], self.times[1],
+                                    CHUNK_CONTINUED if self.continued else 0))
+        self.file.write(chunk.header() + compressed)
+        self.file.flush()
+        self.offset += g_chunk_header.size + len(compressed)
+        self.chunks.append(chunk)
+        self.lines += chunk.nlines
+        self.continued = not data.endswith(b'\n')
+        # The data left in the buffer was received at the last time
+        self.times = [self.times[1]] * 2 if self.buffer else [float('nan')] * 2
+
+    def close(self):
+        if self.buffer:
+            self.flushChunk(len(self.buffer))
+        index = b''.join(g_index_entry.pack(chunk.offset) + chunk.header()
+                         for chunk in self.chunks)
+        self.file.write(index + g_footer.pack(self.offset, len(self.chunks), g_index_magic))
+        self.file.close()
+
+
+class LogStore(object):
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if self.map[:len(g_store_magic)] != g_store_magic:
+            self.close()
+            raise ValueError("{0} is not a log store".format(path))
+        self.chunks = self.readIndex(size)
+        self.first_lines = [chunk.first_line for chunk in self.chunks]
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def readIndex(self, size):
+        if size >= len(g_store_magic) + g_footer.size:
+            offset, count, magic = g_footer.unpack_from(self.map, size - g_footer.size)
+            entry_size = g_index_entry.size + g_chunk_header.size
+            if magic == g_index_magic and offset + count * entry_size + g_footer.size == size:
+                chunks = []
+                for i in range(count):
+                    position = offset + i * entry_size
+                    chunks.append(Chunk(g_index_entry.unpack_from(self.map, position)[0],
+                        g_chunk_header.unpack_from(self.map, position + g_index_entry.size)))
+                return chunks
+        return self.scanChunks(size)
+
+    def scanChunks(self, size):
+        """ Index a store without index, up to its last complete chunk """
+        chunks = []
+        offset = len(g_store_magic)
+        lines = 0
+        while offset + g_chunk_header.size <= size:
+            chunk = Chunk(offset, g_chunk_header.unpack_from(self.map, offset))
+            end = offset + g_chunk_header.size + chunk.clen
+            # The data following the last chunk may be a partly written index
+            if end > size or chunk.first_line != lines or chunk.flags & ~CHUNK_CONTINUED or \
+               chunk.ulen == 0:
+                break
+            chunks.append(chunk)
+            lines += chunk.nlines
+            offset = end
+        return chunks
+
+    def data(self, chunk):
+        start = chunk.offset + g_chunk_header.size
+        return zlib.decompress(self.map[start:start + chunk.clen])
+
+    def lineCount(self):
+        if not self.chunks:
+            return 0
+        last = self.chunks[-1]
+        # A last line without newline is a line too
+        tail = self.data(last)
+        return last.first_line + last.nlines + (0 if tail.endswith(b'\n') else 1)
+
+    def size(self):
+        return sum(chunk.ulen for chunk in self.chunks)
+
+    def iterLines(self, chunks=None, first=0):
+        """ Yields the (0-based line number, line) of the lines starting in
+            the given chunks (all chunks by default) from line first on.
+            Lines are yielded without their newline """
+        if chunks is None:
+            chunks = range(len(self.chunks))
+        chunks = list(chunks)
+        if not chunks:
+            return
+        index = chunks[0]
+        # A line continued from previous chunks is read from its start
+        while index > 0 and self.chunks[index].flags & CHUNK_CONTINUED:
+            index -= 1
+        pending = b''
+        line_no = self.chunks[index].first_line
+        last_chunk = chunks[-1]
+        while index < len(self.chunks):
+            chunk = self.chunks[index]
+            if index > last_chunk:
+                # Only complete the last line started in the given chunks
+                if not pending or not chunk.flags & CHUNK_CONTINUED:
+                    break
+                data = self.data(chunk)
+                end = data.find(b'\n')
+                if end < 0:
+                    pending += data
+                    index += 1
+                    continue
+                pending += data[:end]
+                break
+            lines = (pending + self.data(chunk)).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                if line_no >= first:
+                    yield line_no, line
+                line_no += 1
+            index += 1
+        if pending and line_no >= first:
+            yield line_no, pending
+
+    def chunksForLines(self, first, last):
+        """ Indices of the chunks holding lines first..last (0-based) """
+        start = max(0, bisect.bisect_right(self.first_lines, first) - 1)
+        end = max(start, bisect.bisect_right(self.first_lines, last) - 1)
+        return range(start, end + 1)
+
+    def chunksForTime(self, since=None, until=None):
+        """ Indices of the chunks received (at least partly) within the time
+            range. Chunks of unknown time are included """
+        selected = []
+        for index, chunk in enumerate(self.chunks):
+            if math.isnan(chunk.t_first):
+                selected.append(index)
+            elif (since is None or chunk.t_last >= since) and \
+                 (until is None or chunk.t_first <= until):
+                selected.append(index)
+        return selected
+
+    def lines(self, first, last):
+        """ Yields the (line number, line) of lines first..last (0-based) """
+        for line_no, line in self.iterLines(self.chunksForLines(first, last), first):
+            if line_no > last:
+                return
+            yield line_no, line
+
+    def tail(self, count):
+        """ Returns the last count (line number, line) of the log """
+        if not self.chunks:
+            return []
+        total = self.lineCount()
+        index = len(self.chunks) - 1
+        # Go back until the chunks hold enough lines
+        while index > 0 and total - self.chunks[index].first_line < count:
+            index -= 1
+        return list(self.iterLines(range(index, len(self.chunks)), max(0, total - count)))
+
+    def grep(self, pattern, first=None, last=None, since=None, until=None):
+        """ Yields the (line number, line) of the lines matching a regular
+            expression, within a range of lines and/or time """
+        regex = re.compile(to_bytes(pattern))
+        indices = set(range(len(self.chunks)))
+        if first is not None or last is not None:
+            indices &= set(self.chunksForLines(first or 0, last if last is not None
+                                               else sys.maxsize))
+        if since is not None or until is not None:
+            indices &= set(self.chunksForTime(since, until))
+        # Chunks are decompressed per run of consecutive selected chunks
+        for run in consecutive_runs(sorted(indices)):
+            for line_no, line in self.iterLines(run, first or 0):
+                if last is not None and line_no > last:
+                    break
+                if regex.search(line):
+                    yield line_no, line
+
+    def blocks(self):
+        for chunk in self.chunks:
+            yield self.data(chunk)
+
+
+def consecutive_runs(indices):
+    run = []
+    for index in indices:
+        if run and index != run[-1] + 1:
+            yield run
+            run = []
+        run.append(index)
+    if run:
+        yield run
+
+
+def file_blocks(path):
+    """ Yields the contents of a plain log or a log store, block by block """
+    if is_store(path):
+        with LogStore(path) as store:
+            for block in store.blocks():
+                yield block
+        return
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(g_read_block_size)
+            if not block:
+                return
+            yield block
+
+
+def find_strings(path, strings):
+    """ Returns the subset of strings found in a plain log or a log store,
+        reading it block by block: memory use does not depend on the size
+        of the log """
+    remaining = dict((to_bytes(string), string) for string in strings)
+    found = set()
+    if not remaining:
+        return found
+    overlap = max(len(string) for string in remaining) - 1
+    carry = b''
+    for block in file_blocks(path):
+        data = carry + block
+        for string in list(remaining):
+            if string in data:
+                found.add(remaining.pop(string))
+        if not remaining:
+            break
+        carry = data[len(data) - overlap:] if overlap else b''
+    return found
+
+
+def pack(path, output, chunk_size=g_chunk_size):
+    """ Pack a plain log, or the received data of a watcher trace (keeping
+        the time at which it was received), into a log store """
+    from uarttrace import g_trace_magic, read_trace, TRACE_RECEIVED
+    writer = LogStoreWriter(output, chunk_size)
+    try:
+        with open(path, "rb") as f:
+            is_trace = f.read(len(g_trace_magic)) == g_trace_magic
+        if is_trace:
+            for rectype, timestamp, data in read_trace(path):
+                if rectype == TRACE_RECEIVED:
+                    writer.write(data, timestamp)
+        else:
+            for block in file_blocks(path):
+                writer.write(block)
+    finally:
+        writer.close()
+    return output
+
+
+def archive(path, chunk_size=g_chunk_size):
+    """ Replace a plain log by a log store (<path>.lzs), returning the path
+        of the store """
+    output = pack(path, path + g_store_extension, chunk_size)
+    os.remove(path)
+    return output
+
+
+def print_lines(lines, numbered=True):
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    for line_no, line in lines:
+        if numbered:
+            out.write("{0}:".format(line_no + 1).encode('utf-8'))
+        out.write(line + b'\n')
+
+
+def parse_range(value):
+    first, _, last = value.partition(':')
+    return (int(first) - 1 if first else None, int(last) - 1 if last else None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressed and indexed UART log store")
+    subparsers = parser.add_subparsers(dest='command')
+
+    pack_parser = subparsers.add_parser("pack", help="Pack a log or a watcher trace")
+    pack_parser.add_argument("log")
+    pack_parser.add_argument("-o", "--output", default=None,
+        help="Path of the store (default: <log>" + g_store_extension + ")")
+    pack_parser.add_argument("--remove", action='store_true', default=False,
+        help="Remove the log once packed")
+    pack_parser.add_argument("--chunk-size", type=int, default=g_chunk_size,
+        help="Uncompressed size of the chunks in bytes (default: %(default)s)")
+
+    info_parser = subparsers.add_parser("info", help="Print the size and index of a store")
+    info_parser.add_argument("store")
+
+    cat_parser = subparsers.add_parser("cat", help="Print a store")
+    cat_parser.add_argument("store")
+
+    lines_parser = subparsers.add_parser("lines", help="Print a range of lines")
+    lines_parser.add_argument("store")
+    lines_parser.add_argument("first", type=int)
+    lines_parser.add_argument("last", type=int)
+
+    tail_parser = subparsers.add_parser("tail", help="Print the last lines")
+    tail_parser.add_argument("store")
+    tail_parser.add_argument("-n", dest='count', type=int, default=10)
+
+    grep_parser = subparsers.add_parser("grep", help="Print the lines matching a regex")
+    grep_parser.add_argument("store")
+    grep_parser.add_argument("pattern")
+    grep_parser.add_argument("--lines", type=parse_range, default=(None, None),
+        help="Range of lines searched, as first:last")
+    grep_parser.add_argument("--since", type=float, default=None,
+        help="Search the output received from this time on (in seconds)")
+    grep_parser.add_argument("--until", type=float, default=None,
+        help="Search the output received until this time (in seconds)")
+
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        output = pack(args.log, args.output or args.log + g_store_extension, args.chunk_size)
+        original = os.path.getsize(args.log)
+        packed = os.path.getsize(output)
+        print("{0}: {1} -> {2} bytes ({3:.1f}x)".format(output, original, packed,
+                                                       float(original) / max(packed, 1)))
+        if args.remove:
+            os.remove(args.log)
+        sys.exit(0)
+
+    with LogStore(args.store) as store:
+        if args.command == "info":
+            print("{0} chunks, {1} lines, {2} bytes ({3} compressed)".format(
+                len(store.chunks), store.lineCount(), store.size(),
+                os.path.getsize(args.store)))
+            for index, chunk in enumerate(store.chunks):
+                print("chunk {0}: lines {1}+{2}, {3} -> {4} bytes, time {5} - {6}".format(
+                    index, chunk.first_line + 1, chunk.nlines, chunk.ulen, chunk.clen,
+                    chunk.t_first, chunk.t_last))
+        elif args.command == "cat":
+            out = getattr(sys.stdout, 'buffer', sys.stdout)
+            for block in store.blocks():
+                out.write(block)
+        elif args.command == "lines":
+            print_lines(store.lines(args.first - 1, args.last - 1))
+        elif args.command == "tail":
+            print_lines(store.tail(args.count))
+        elif args.command == "grep":
+            first, last = args.lines
+            print_lines(store.grep(args.pattern, first, last, args.since, args.until))
@@ -0,0 +1,289 @@
+#!/usr/bin/env python2.7
+
+from __future__ import print_function
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" logwait.py:
+Wait for strings to appear in a log file written by another process (ie. the
+UART log of a model).
+The log is followed from a byte offset: every byte written is matched once,
+against all success and failure strings at the same time, so a string is found
+however much output follows it. Writes to the log are waited for with inotify
+on the directory of the log, which also reports the creation of the log, and
+by polling on hosts without inotify.
+
+Usage:
+python logwait.py <log> <string> [<string> ...] [--fail <string>]
+                  [--timeout <seconds>] [--pid <pid>] [--offset <bytes>]
+                  [--all] [-q]
+Exit codes:
+0: a success string was found (all of them with --all)
+1: a failure string was found
+2: invalid arguments
+3: timeout
+4: the process given with --pid exited without a match
+Strings are matched literally, within a line or across lines.
+"""
+
+import argparse
+import codecs
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from matcher import StreamMatcher
+
+EXIT_FOUND = 0
+EXIT_FAIL_FOUND = 1
+EXIT_TIMEOUT = 3
+EXIT_PROCESS_EXITED = 4
+
+# Polling interval without inotify, and interval of the liveness checks of the
+# --pid process
+g_poll_interval = 0.1
+g_pid_check_interval = 1
+
+g_read_size = 64 * 1024
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+g_inotify_event = struct.Struct("iIII")
+
+
+class Inotify(object):
+    """ Writes to the files of a directory, through inotify """
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        path = directory.encode(sys.getfilesystemencoding() or 'utf-8') \
+               if not isinstance(directory, bytes) else directory
+        if libc.inotify_add_watch(self.fd, path, IN_MODIFY | IN_CLOSE_WRITE |
+                                  IN_CREATE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, "inotify_add_watch failed on {0}".format(directory))
+
+    def wait(self, name, timeout):
+        """ Wait up to timeout seconds for an event on the file name. Returns
+            False on timeout """
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            if name in self.names():
+                return True
+
+    def names(self):
+        """ Names of the files of the pending events """
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return names
+                raise
+            offset = 0
+            while offset + g_inotify_event.size <= len(data):
+                _, _, _, length = g_inotify_event.unpack_from(data, offset)
+                offset += g_inotify_event.size
+                names.add(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Poller(object):
+    """ Stands for Inotify on hosts without inotify """
+    def wait(self, name, timeout):
+        time.sleep(min(timeout, g_poll_interval))
+        return True
+
+    def close(self):
+        pass
+
+
+class LogFollower(object):
+    """ Reads the data appended to a log file. The log may not exist yet, and
+        is read from the start again when it is truncated or replaced """
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset
+        self.file = None
+        directory, name = os.path.split(os.path.abspath(path))
+        self.name = name.encode(sys.getfilesystemencoding() or 'utf-8') \
+                    if not isinstance(name, bytes) else name
+        try:
+            self.notifier = Inotify(directory)
+        except (OSError, AttributeError):
+            # No inotify (or no directory yet)
+            self.notifier = Poller()
+
+    def open(self):
+        """ Returns True if the data read so far is to be discarded """
+        restart = False
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if self.file is not None and os.fstat(self.file.fileno()).st_ino != stat.st_ino:
+            # Replaced
+            self.file.close()
+            self.file = None
+            self.offset = 0
+            restart = True
+        if self.file is None:
+            try:
+                self.file = open(self.path, "rb")
+            except (IOError, OSError):
+                return restart
+        if os.fstat(self.file.fileno()).st_size < self.offset:
+            # Truncated
+            self.offset = 0
+            restart = True
+        return restart
+
+    def read(self):
+        """ Returns (restart, data appended since the last read) """
+        restart = self.open()
+        if self.file is None:
+            return restart, b""
+        self.file.seek(self.offset)
+        data = self.file.read(g_read_size)
+        self.offset += len(data)
+        return restart, data
+
+    def wait(self, timeout):
+        return self.notifier.wait(self.name, timeout)
+
+    def close(self):
+        self.notifier.close()
+        if self.file is not None:
+            self.file.close()
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        if e.errno != errno.EPERM:
+            return False
+    try:
+        with open("/proc/{0}/stat".format(pid)) as f:
+            # The state follows the command name, which may contain spaces
+            return f.read().rpartition(')')[2].split()[0] not in ("Z", "X")
+    except (IOError, OSError, IndexError):
+        return True
+
+
+def decode(string):
+    return string.decode('utf-8', 'replace') if isinstance(string, bytes) else string
+
+
+def wait_log(path, strings, fail_strs=[], timeout=None, pid=None, offset=0,
+             match_all=False):
+    """ Wait for the strings to be written to the log at path, from offset.
+        Returns (exit code, string found or None) """
+    strings = [decode(string) for string in strings]
+    fail_strs = [decode(string) for string in fail_strs]
+    matcher = StreamMatcher(strings + fail_strs)
+    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    follower = LogFollower(path, offset)
+    deadline = None if timeout is None else time.time() + timeout
+    next_pid_check = time.time()
+    found = set()
+    exited = False
+    try:
+        while True:
+            restart, data = follower.read()
+            if restart:
+                matcher.reset()
+                decoder.reset()
+                found.clear()
+            for string, _ in matcher.feed(decoder.decode(data)):
+                if string in fail_strs:
+                    return EXIT_FAIL_FOUND, string
+                found.add(string)
+                if not match_all or found.issuperset(strings):
+                    return EXIT_FOUND, string
+            if len(data) == g_read_size:
+                # More to read
+                continue
+            if exited:
+                # All the output of the process was read
+                return EXIT_PROCESS_EXITED, None
+
+            now = time.time()
+            if deadline is not None and now >= deadline:
+                return EXIT_TIMEOUT, None
+            if pid is not None and now >= next_pid_check:
+                # Read the log once more after the process exits
+                exited = not process_alive(pid)
+                next_pid_check = now + g_pid_check_interval
+                if exited:
+                    continue
+            wait = g_pid_check_interval if pid is not None else 3600
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            follower.wait(wait)
+    finally:
+        follower.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wait for strings in a log file")
+    parser.add_argument("log", help="Log file, which may not exist yet")
+    parser.add_argument("strings", nargs='+', metavar="string",
+        help="Success string, matched literally")
+    parser.add_argument("--fail", action='append', default=[], metavar="STRING",
+        help="Failure string, may be given several times")
+    parser.add_argument("--timeout", type=float, default=None,
+        help="Timeout in seconds (default: none)")
+    parser.add_argument("--pid", type=int, default=None,
+        help="Stop waiting when this process (ie. the model) exits")
+    parser.add_argument("--offset", type=int, default=0,
+        help="Byte offset of the log to start from (default: %(default)s)")
+    parser.add_argument("--all", action='store_true', default=False,
+        help="Wait for all the success strings instead of any of them")
+    parser.add_argument("-q", "--quiet", action='store_true', default=False,
+        help="Only report the result through the exit code")
+    args = parser.parse_args()
+
+    start = time.time()
+    code, string = wait_log(args.log, args.strings, args.fail, args.timeout,
+                            args.pid, args.offset, args.all)
+    if not args.quiet:
+        elapsed = time.time() - start
+        if code == EXIT_FOUND:
+            print("[INFO] Found '{0}' in {1} after {2:.1f}s".format(string, args.log, elapsed))
+        elif code == EXIT_FAIL_FOUND:
+            print("[ERROR] Found failure string '{0}' in {1} after {2:.1f}s".format(
+                string, args.log, elapsed))
+        elif code == EXIT_TIMEOUT:
+            print("[ERROR] Timed out after {0:.1f}s waiting for {1}".format(elapsed, args.log))
+        else:
+            print("[ERROR] Process {0} exited after {1:.1f}s without a match in {2}".format(
+                args.pid, elapsed, args.log))
+    sys.exit(code)
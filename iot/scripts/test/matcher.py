@@ -0,0 +1,93 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" matcher.py:
+Streaming multi-pattern string matching.
+StreamMatcher is an Aho-Corasick automaton built from a fixed set of patterns.
+Text is fed to it in arbitrary chunks as it is received; the state of partial
+matches is kept between calls, so a pattern split over several chunks is still
+found, and each character is examined once regardless of the number of
+patterns.
+"""
+
+
+class StreamMatcher(object):
+    def __init__(self, patterns):
+        # Duplicates and empty patterns are dropped, the order is kept
+        self.patterns = []
+        for pattern in patterns:
+            if pattern and pattern not in self.patterns:
+                self.patterns.append(pattern)
+
+        # Automaton: per state, the transitions, the failure link and the
+        # indices of the patterns ending in that state
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for index, pattern in enumerate(self.patterns):
+            self._add(index, pattern)
+        self._link()
+
+        self.state = 0
+        self.offset = 0     # Number of characters consumed so far
+
+    def _add(self, index, pattern):
+        state = 0
+        for ch in pattern:
+            nextstate = self.goto[state].get(ch)
+            if nextstate is None:
+                nextstate = len(self.goto)
+                self.goto[state][ch] = nextstate
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nextstate
+        self.out[state].append(index)
+
+    def _link(self):
+        """ Compute the failure links breadth-first. The output of a state
+            includes the output of its failure state, so that patterns which
+            are suffixes of other patterns are reported as well. """
+        queue = list(self.goto[0].values())
+        while queue:
+            state = queue.pop(0)
+            for ch, nextstate in self.goto[state].items():
+                queue.append(nextstate)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nextstate] = self.goto[fallback].get(ch, 0)
+                self.out[nextstate] += self.out[self.fail[nextstate]]
+
+    def feed(self, text):
+        """ Consume a chunk of text. Returns a list of (pattern, offset) tuples
+            for the patterns ending within the chunk, in the order they were
+            found. offset is the position in the stream of the first character
+            following the match. """
+        matches = []
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        root = goto[0]
+        state = self.state
+        offset = self.offset
+        for ch in text:
+            offset += 1
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0) if state else root.get(ch, 0)
+            if out[state]:
+                for index in out[state]:
+                    matches.append((self.patterns[index], offset))
+        self.state = state
+        self.offset = offset
+        return matches
+
+    def reset(self):
+        self.state = 0
+        self.offset = 0
@@ -0,0 +1,159 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" outputdrain.py:
+Continuous draining of the output of the FVP process.
+An FVP started with its stdout/stderr connected to pipes blocks as soon as a
+pipe is full, ie. once 64 KiB of output is left unread, which stalls the
+simulation. OutputDrain reads both pipes from background threads for the
+whole lifetime of the model, copies the output to a log file, and detects the
+Iris server port announced by the model on stdout.
+"""
+
+import fcntl
+import os
+import re
+import struct
+import termios
+import threading
+import time
+
+g_drain_read_size = 64 * 1024
+
+# fcntl command returning the capacity of a pipe (Linux specific)
+F_GETPIPE_SZ = 1032
+g_default_pipe_size = 64 * 1024
+
+# The line must be complete, a read may end within the port number
+g_iris_port_regex = re.compile(br"Iris server started listening to port (\d+)\r?\n")
+
+
+def pipe_size(fd):
+    try:
+        return fcntl.fcntl(fd, F_GETPIPE_SZ)
+    except IOError:
+        return g_default_pipe_size
+
+
+def pending_bytes(fd):
+    """ Number of bytes waiting to be read from the pipe """
+    return struct.unpack('i', fcntl.ioctl(fd, termios.FIONREAD, b'\0' * 4))[0]
+
+
+class OutputDrain(object):
+    def __init__(self, process, logpath):
+        self.logfile = open(logpath, "wb")
+        self.logpath = logpath
+        self.lock = threading.Lock()
+
+        self.iris_port = None
+        self.port_found = threading.Event()
+
+        # Statistics
+        self.drained = {}       # stream name -> number of bytes read
+        self.stall_time = 0.0   # Time the model may have been blocked on a full pipe
+
+        streams = [(name, stream) for name, stream in
+                   [("stdout", process.stdout), ("stderr", process.stderr)]
+                   if stream is not None]
+        self.open_streams = len(streams)
+        self.threads = []
+        for name, stream in streams:
+            self.drained[name] = 0
+            thread = threading.Thread(target=self.drain, args=(name, stream))
+            thread.setName("fvp_" + name + "_drain")
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+    def drain(self, name, stream):
+        fd = stream.fileno()
+        capacity = pipe_size(fd)
+        line = b''
+        last_read = time.time()
+        while True:
+            # A pipe found full when woken up has been blocking the writer for
+            # (at most) the time since the previous read
+            try:
+                if pending_bytes(fd) >= capacity:
+                    with self.lock:
+                        self.stall_time += time.time() - last_read
+            except IOError:
+                pass
+
+            data = os.read(fd, g_drain_read_size)
+            last_read = time.time()
+            if not data:
+                if name == "stdout" and not self.port_found.is_set():
+                    # The last line of the model is complete
+                    self.findIrisPort(line + b'\n')
+                break
+
+            with self.lock:
+                self.logfile.write(data)
+                self.logfile.flush()
+                self.drained[name] += len(data)
+
+            if name == "stdout" and not self.port_found.is_set():
+                # The port line may come after any other output of the model.
+                # Only the last, partial line is kept for the next read, and
+                # at most g_drain_read_size of it: the port line is short
+                line += data
+                self.findIrisPort(line)
+                line = line[line.rfind(b'\n') + 1:][-g_drain_read_size:]
+
+        stream.close()
+        with self.lock:
+            self.open_streams -= 1
+            if self.open_streams == 0:
+                # The model has closed all of its output, no port will follow
+                self.port_found.set()
+
+    def findIrisPort(self, data):
+        match = g_iris_port_regex.search(data)
+        if match:
+            self.iris_port = int(match.group(1))
+            self.port_found.set()
+
+    def wait_iris_port(self, timeout):
+        """ Returns the Iris server port announced by the model, or None if
+            the model did not announce it within timeout seconds """
+        self.port_found.wait(timeout)
+        return self.iris_port
+
+    def tail(self, count):
+        """ Returns the last lines of model output """
+        with self.lock:
+            with open(self.logpath, "rb") as f:
+                # Read the log backwards until the first of the lines is
+                # complete, rather than the whole log
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+                data = b''
+                while end > 0 and data.count(b'\n') <= count:
+                    start = max(0, end - g_drain_read_size)
+                    f.seek(start)
+                    data = f.read(end - start) + data
+                    end = start
+        lines = data.splitlines()[-count:]
+        return [line.decode('utf-8', 'replace') for line in lines]
+
+    def close(self, timeout):
+        """ Wait for the model output to be closed (ie. once the model has
+            exited) and close the log file """
+        for thread in self.threads:
+            thread.join(timeout)
+        with self.lock:
+            self.logfile.close()
+
+    def summary(self):
+        with self.lock:
+            streams = ", ".join("{0} {1}".format(name, count)
+                                for name, count in sorted(self.drained.items()))
+            return "{0} bytes drained ({1}), stalled {2:.3f}s on a full pipe".format(
+                sum(self.drained.values()), streams, self.stall_time)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python2.7
+
+from __future__ import print_function
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" portlease.py:
+Allocation of TCP ports for FVPs sharing a host.
+A PortLease reserves a contiguous range of free ports. A port is considered
+free when its lock file can be locked and the port can be bound. The locks are
+held on open file descriptors through flock(), so they are shared between
+processes that cooperate through the same lock directory, and are dropped by
+the kernel if the process holding them dies.
+"""
+
+import errno
+import fcntl
+import os
+import socket
+import tempfile
+
+# Directory containing one lock file per leased port. Shared by all users of
+# the host, hence world-writable with the sticky bit set.
+g_port_lock_dir = os.path.join(tempfile.gettempdir(), "fvp_port_leases")
+
+g_last_port = 65535
+
+
+def probe_port(port, host=''):
+    """ Returns True if the port can be bound on the given host """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind((host, port))
+        return True
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+
+
+class PortLease(object):
+    """ A contiguous range of 'count' TCP ports, searched upwards from
+        first_port. The ports stay reserved until release() is called or the
+        process exits.
+    """
+    def __init__(self, count, first_port, last_port=g_last_port,
+                 lock_dir=g_port_lock_dir):
+        self.count = count
+        self.first_port = first_port
+        self.last_port = last_port
+        self.lock_dir = lock_dir
+        self.ports = []
+        self.lockfiles = []
+
+        self.acquire()
+
+    def _lock_dir(self):
+        try:
+            os.makedirs(self.lock_dir)
+            os.chmod(self.lock_dir, 0o1777)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def _lock_port(self, port):
+        """ Returns the locked file object for the port, or None if the port
+            is leased by somebody else or is in use """
+        path = os.path.join(self.lock_dir, "port-{0}.lock".format(port))
+        try:
+            lockfile = open(path, "a")
+        except IOError:
+            # Lock file owned by another user, which is using the port
+            return None
+        try:
+            fcntl.flock(lockfile.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            lockfile.close()
+            return None
+
+        if not probe_port(port):
+            # Port is used by a process not taking part in the leasing
+            fcntl.flock(lockfile.fileno(), fcntl.LOCK_UN)
+            lockfile.close()
+            return None
+        return lockfile
+
+    def acquire(self):
+        self._lock_dir()
+
+        base = self.first_port
+        while base + self.count - 1 <= self.last_port:
+            lockfiles = []
+            for port in range(base, base + self.count):
+                lockfile = self._lock_port(port)
+                if lockfile is None:
+                    break
+                lockfiles.append(lockfile)
+
+            if len(lockfiles) == self.count:
+                self.lockfiles = lockfiles
+                self.ports = list(range(base, base + self.count))
+                return self.ports
+
+            # Drop the partial range and continue the search after the port
+            # which was not available
+            for lockfile in lockfiles:
+                fcntl.flock(lockfile.fileno(), fcntl.LOCK_UN)
+                lockfile.close()
+            base += len(lockfiles) + 1
+
+        raise Exception("No range of {0} free ports found in {1}-{2}".format(
+            self.count, self.first_port, self.last_port))
+
+    def release(self):
+        for lockfile in self.lockfiles:
+            fcntl.flock(lockfile.fileno(), fcntl.LOCK_UN)
+            lockfile.close()
+        self.lockfiles = []
+        self.ports = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" profiler.py:
+Sampling profiler of the software running on the model.
+A PCProfiler thread periodically reads the PC of each CPU through Iris. Each
+sample is symbolized against the ELF files given for the CPU (ie. the SE ROM,
+the ES RTX image or vmlinux), using the symbol table listed by nm. The
+profile is written in the collapsed stack format ('cpu;image;function count'
+lines) read by flamegraph.pl, speedscope and similar tools, along with a
+plain text summary of the most sampled functions.
+Only the PC is sampled, so a stack is made of the CPU, the image and the
+function, without the callers of the function.
+"""
+
+import bisect
+import distutils.spawn
+import os
+import threading
+from subprocess import Popen, PIPE
+
+from watchdog import cpu_name
+
+# nm executable, which may be overridden by the NM environment variable (ie.
+# with the nm of a cross toolchain)
+g_nm = os.environ.get("NM", "nm")
+
+# Symbol types of nm listing code
+g_code_symbol_types = "tTwWi"
+
+# Granularity of the addresses of unsymbolized samples
+g_unknown_granule = 0x1000
+
+# Number of functions listed in the summary of the profile
+g_profile_summary_size = 30
+
+
+class Symbolizer(object):
+    """ Function lookup by address in the symbol table of an ELF file """
+    def __init__(self, elf_path):
+        self.elf_path = elf_path
+        self.image = os.path.basename(elf_path)
+        self.starts = []
+        self.symbols = []   # (start, end, name), sorted by start
+        nm = distutils.spawn.find_executable(g_nm)
+        if nm is None:
+            raise Exception("'{0}' not found in path, cannot symbolize profile".format(g_nm))
+        process = Popen([nm, "-n", "-S", "-C", "--defined-only", elf_path],
+                        stdout=PIPE, stderr=PIPE)
+        out, err = process.communicate()
+        if process.returncode != 0:
+            raise Exception("{0} failed on {1}: {2}".format(g_nm, elf_path,
+                                                            err.decode('utf-8', 'replace').strip()))
+        self.parse(out.decode('utf-8', 'replace'))
+
+    def parse(self, listing):
+        """ Parse 'address [size] type name' lines of nm -n -S """
+        symbols = []
+        for line in listing.splitlines():
+            fields = line.split(None, 3)
+            if len(fields) == 4:
+                address, size, symtype, name = fields
+            elif len(fields) == 3:
+                (address, symtype, name), size = fields, None
+            else:
+                continue
+            if symtype not in g_code_symbol_types:
+                continue
+            try:
+                # Clear the Thumb bit of function addresses
+                start = int(address, 16) & ~1
+                size = int(size, 16) if size is not None else None
+            except ValueError:
+                continue
+            symbols.append([start, None if size is None else start + size, name])
+
+        symbols.sort()
+        for i, symbol in enumerate(symbols):
+            if symbol[1] is None:
+                # Without a size, a function ends where the next one starts
+                symbol[1] = symbols[i + 1][0] if i + 1 < len(symbols) else symbol[0] + 4
+        self.symbols = [tuple(symbol) for symbol in symbols]
+        self.starts = [symbol[0] for symbol in self.symbols]
+
+    def lookup(self, address):
+        """ Returns the name of the function holding address, or None """
+        index = bisect.bisect_right(self.starts, address) - 1
+        if index < 0:
+            return None
+        start, end, name = self.symbols[index]
+        return name if address < end else None
+
+
+def parse_elf_option(value):
+    """ Parse a '<cpu>=<elf>' profiling option, returning (cpu, elf) or None.
+        <cpu> is matched against the name of the CPUs of the model """
+    cpu, sep, elf = value.partition('=')
+    if not sep or not cpu or not elf:
+        return None
+    return cpu, elf
+
+
+class PCProfiler(object):
+    def __init__(self, cpus, interval, elfs, lock=None):
+        """ elfs is a list of (cpu pattern, ELF path); the ELF files of a CPU
+            are those whose pattern is part of its name, searched in order """
+        self.cpus = cpus
+        self.names = [cpu_name(cpu, i) for i, cpu in enumerate(cpus)]
+        self.interval = interval
+        # Serializes the Iris requests with those of other threads
+        self.lock = lock if lock is not None else threading.Lock()
+
+        symbolizers = {}
+        for _, path in elfs:
+            if path not in symbolizers:
+                symbolizers[path] = Symbolizer(path)
+        self.symbolizers = [[symbolizers[path] for pattern, path in elfs if pattern in name]
+                            for name in self.names]
+
+        self.counts = [{} for _ in cpus]    # per CPU: PC -> number of samples
+        self.samples = 0
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.setName("pc_profiler")
+        self.thread.setDaemon(True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self, timeout):
+        self.stop_event.set()
+        self.thread.join(timeout)
+
+    def sample(self):
+        with self.lock:
+            pcs = []
+            for cpu in self.cpus:
+                try:
+                    pcs.append(cpu.read_register("PC"))
+                except Exception:
+                    pcs.append(None)
+        for counts, pc in zip(self.counts, pcs):
+            if pc is not None:
+                counts[pc] = counts.get(pc, 0) + 1
+        self.samples += 1
+        return any(pc is not None for pc in pcs)
+
+    def run(self):
+        if not self.sample():
+            # No PC is readable through Iris
+            return
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def symbolize(self, index, pc):
+        """ Returns the (image, function) of a PC sampled on a CPU """
+        for symbolizer in self.symbolizers[index]:
+            function = symbolizer.lookup(pc)
+            if function is not None:
+                return symbolizer.image, function
+        return "[unknown]", "0x{0:x}".format(pc - pc % g_unknown_granule)
+
+    def stacks(self):
+        """ Returns a map of (cpu, image, function) -> number of samples """
+        stacks = {}
+        for index, counts in enumerate(self.counts):
+            for pc, count in counts.items():
+                stack = (self.names[index],) + self.symbolize(index, pc)
+                stacks[stack] = stacks.get(stack, 0) + count
+        return stacks
+
+    def write(self, base):
+        """ Write <base>.folded (collapsed stacks) and <base>.txt (most
+            sampled functions), returning the path of the collapsed stacks """
+        stacks = self.stacks()
+        with open(base + ".folded", "w") as f:
+            for stack, count in sorted(stacks.items()):
+                # Frames are separated by ';' in the collapsed format
+                f.write("{0} {1}\n".format(";".join(frame.replace(';', ':') for frame in stack),
+                                           count))
+
+        total = sum(stacks.values())
+        with open(base + ".txt", "w") as f:
+            f.write("{0} samples of {1} CPUs, every {2}s\n".format(
+                total, len(self.cpus), self.interval))
+            ranked = sorted(stacks.items(), key=lambda item: (-item[1], item[0]))
+            for (cpu, image, function), count in ranked[:g_profile_summary_size]:
+                f.write("{0:6.2f}% {1:8} {2} {3} {4}\n".format(
+                    100.0 * count / total, count, cpu, image, function))
+        return base + ".folded"
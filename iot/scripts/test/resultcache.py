@@ -0,0 +1,198 @@
+#!/usr/bin/env python2.7
+
+from __future__ import print_function
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" resultcache.py:
+Cache of passing test results, addressed by the contents of the test inputs:
+the FVP binary, the files referred to by the model parameters and data (ie.
+the images), the other parameter values and the test specification. A test
+whose inputs did not change since it last passed is not executed again; its
+stored logs are restored instead.
+Files are hashed through mmap, and the hash of a file is reused as long as its
+size, modification time and inode are unchanged.
+"""
+
+import errno
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import time
+
+g_result_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "fvp_results")
+g_result_cache_max_age = 7 * 24 * 3600     # in seconds
+g_result_cache_max_size = 1024 * 1024 * 1024   # in bytes
+
+g_hash_index = "hashes.json"
+
+
+def hash_file_mmap(path):
+    """ Returns the sha1 of a file, hashed in place through a memory mapping
+        (without copying the file into python strings) """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                digest.update(mapping)
+            finally:
+                mapping.close()
+    return digest.hexdigest()
+
+
+class FileHashes(object):
+    """ Hashes of files, persisted in an index. A file is hashed again only
+        if its size, modification time or inode changed """
+    def __init__(self, index_path):
+        self.index_path = index_path
+        try:
+            with open(index_path) as f:
+                self.index = json.load(f)
+        except (IOError, ValueError):
+            self.index = {}
+        self.modified = False
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        signature = [st.st_size, st.st_mtime, st.st_ino]
+        entry = self.index.get(path)
+        if entry is not None and entry['signature'] == signature:
+            return entry['sha1']
+        sha1 = hash_file_mmap(path)
+        self.index[path] = {'signature': signature, 'sha1': sha1}
+        self.modified = True
+        return sha1
+
+    def save(self):
+        if not self.modified:
+            return
+        tmp = "{0}.tmp.{1}".format(self.index_path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.rename(tmp, self.index_path)
+        self.modified = False
+
+
+def input_value(value, hashes):
+    """ Parameter values referring to files are replaced by the file hash.
+        Data arguments are formatted as <file>@<address> """
+    value = str(value)
+    path, _, address = value.rpartition('@')
+    if path and os.path.isfile(path):
+        return "sha1:{0}@{1}".format(hashes.get(path), address)
+    if os.path.isfile(value):
+        return "sha1:" + hashes.get(value)
+    return value
+
+
+def result_key(platform, fvp_path, fvp_params, fvp_data, testspec, hashes):
+    """ Returns the key of the result of a test, given its inputs (without the
+        watcher specific parameters, which differ between runs) """
+    inputs = {
+        'platform': platform,
+        'fvp': hashes.get(fvp_path),
+        'fvp_params': dict((param, input_value(value, hashes))
+                           for param, value in fvp_params.items()),
+        'fvp_data': dict((param, input_value(value, hashes))
+                         for param, value in fvp_data.items()),
+        'testspec': testspec,
+    }
+    digest = hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    """ Directory of results, one subdirectory per result key holding the
+        logs of the test and a meta.json file. Results are written to a
+        temporary directory and renamed into place once complete. """
+    def __init__(self, root, max_age=g_result_cache_max_age,
+                 max_size=g_result_cache_max_size):
+        self.root = os.path.abspath(root)
+        self.max_age = max_age
+        self.max_size = max_size
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+        self.hashes = FileHashes(os.path.join(self.root, g_hash_index))
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def lookup(self, key):
+        """ Returns the meta data of the stored result, or None """
+        meta_path = os.path.join(self.path(key), "meta.json")
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            return None
+        # Entries are evicted by their last use
+        os.utime(meta_path, None)
+        return meta
+
+    def restore(self, key, log_dir):
+        """ Copy the logs of a stored result to log_dir. Returns the meta
+            data of the result, or None if no result is stored """
+        meta = self.lookup(key)
+        if meta is None:
+            return None
+        for name in meta['logs']:
+            shutil.copy2(os.path.join(self.path(key), name), os.path.join(log_dir, name))
+        return meta
+
+    def store(self, key, log_files, meta):
+        tmpdir = "{0}.tmp.{1}".format(self.path(key), os.getpid())
+        if os.path.exists(tmpdir):
+            shutil.rmtree(tmpdir)
+        os.makedirs(tmpdir)
+        try:
+            for path in log_files:
+                shutil.copy2(path, tmpdir)
+            with open(os.path.join(tmpdir, "meta.json"), "w") as f:
+                json.dump(dict(meta, key=key, created=time.time(),
+                               logs=[os.path.basename(path) for path in log_files]),
+                          f, indent=4, default=str)
+            if os.path.exists(self.path(key)):
+                # A stale entry (ie. stored before a failed run) is replaced
+                shutil.rmtree(self.path(key), ignore_errors=True)
+            os.rename(tmpdir, self.path(key))
+        except OSError as e:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+            # Another test stored the same result first
+
+    def entries(self):
+        """ Returns (last use, size, path) of each stored result """
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            meta_path = os.path.join(path, "meta.json")
+            if not os.path.isfile(meta_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(meta_path), size, path))
+        return entries
+
+    def evict(self):
+        """ Remove the results unused for more than max_age seconds, then the
+            least recently used results until the cache fits in max_size
+            bytes. Returns the number of removed results """
+        entries = sorted(self.entries())
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for last_use, size, path in entries:
+            if now - last_use <= self.max_age and total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,63 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" ringbuffer.py:
+Fixed-capacity byte history of a stream.
+RingBuffer keeps the last 'capacity' bytes written to it in a preallocated
+bytearray, so the memory used by a watcher does not depend on how much output
+the FVP produces, or on whether that output contains any newline.
+Offsets are absolute positions in the stream, ie. the number of bytes written
+before a given byte.
+"""
+
+
+class RingBuffer(object):
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = bytearray(capacity)
+        self.end = 0    # Total number of bytes written
+
+    def __len__(self):
+        return min(self.end, self.capacity)
+
+    def start(self):
+        """ Stream offset of the oldest byte held by the buffer """
+        return self.end - len(self)
+
+    def write(self, data):
+        data = memoryview(data)
+        size = len(data)
+        if size >= self.capacity:
+            # Only the last 'capacity' bytes are kept
+            self.end += size - self.capacity
+            data = data[size - self.capacity:]
+            size = self.capacity
+
+        pos = self.end % self.capacity
+        first = min(size, self.capacity - pos)
+        self.buf[pos:pos + first] = data[:first]
+        if first < size:
+            self.buf[0:size - first] = data[first:]
+        self.end += size
+
+    def tail(self, size):
+        """ Returns the last 'size' bytes held by the buffer, as a bytearray """
+        size = min(size, len(self))
+        pos = self.end % self.capacity
+        if size <= pos:
+            return self.buf[pos - size:pos]
+        return self.buf[self.capacity - (size - pos):] + self.buf[:pos]
+
+    def lines(self, count):
+        """ Returns up to 'count' last lines held by the buffer, the last one
+            possibly not terminated by a newline. The oldest line may be
+            truncated if it started before the beginning of the buffer. """
+        data = self.tail(len(self))
+        if data.endswith(b'\n'):
+            data = data[:-1]
+        return [bytes(line) for line in data.split(b'\n')[-count:]] if data else []
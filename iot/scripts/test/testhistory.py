@@ -0,0 +1,120 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" testhistory.py:
+History of the wall time and outcome of each test run, per platform, kept in
+a local SQLite database. It is used by the TestRunner to order the tests of a
+run and to split a run into shards of about the same duration, for running
+them on several machines.
+Shards are computed from the history, so all machines running the shards of
+a regression must use the same history database (ie. a copy of the database
+of the previous regression).
+"""
+
+import os
+import sqlite3
+
+g_history_db = os.path.join(os.path.expanduser("~"), ".fvp_test_history.db")
+
+# Number of most recent runs of a test used for its estimates
+g_history_window = 10
+
+# Test ordering policies: name of the policy -> description
+g_order_policies = {
+    "name": "alphabetical order",
+    "slowest": "slowest tests first",
+    "failing": "tests most likely to fail first, then slowest first",
+}
+
+
+class TestHistory(object):
+    def __init__(self, path=g_history_db):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # Several runners may share the database, wait for each other's writes
+        self.db = sqlite3.connect(path, timeout=30)
+        with self.db:
+            self.db.execute("""CREATE TABLE IF NOT EXISTS runs (
+                                   platform TEXT NOT NULL,
+                                   test TEXT NOT NULL,
+                                   started REAL NOT NULL,
+                                   duration REAL NOT NULL,
+                                   exitcode INTEGER NOT NULL)""")
+            self.db.execute("""CREATE INDEX IF NOT EXISTS runs_test
+                               ON runs (platform, test, started)""")
+
+    def close(self):
+        self.db.close()
+
+    def record(self, platform, test, started, duration, exitcode):
+        with self.db:
+            self.db.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+                            (platform, test, started, duration, exitcode))
+
+    def recentRuns(self, platform, test):
+        """ Returns the (duration, exitcode) of the most recent runs of a test """
+        return self.db.execute("""SELECT duration, exitcode FROM runs
+                                  WHERE platform = ? AND test = ?
+                                  ORDER BY started DESC LIMIT ?""",
+                               (platform, test, g_history_window)).fetchall()
+
+    def statistics(self, platform, tests):
+        """ Returns a map of test -> (estimated duration, failure rate).
+            Tests without history are estimated at the mean duration of the
+            other tests, and a failure rate of 0 """
+        stats = {}
+        for test in tests:
+            runs = self.recentRuns(platform, test)
+            if runs:
+                stats[test] = (sum(duration for duration, _ in runs) / len(runs),
+                               sum(1 for _, exitcode in runs if exitcode != 0) / float(len(runs)))
+
+        known = [duration for duration, _ in stats.values()]
+        default = sum(known) / len(known) if known else 1.0
+        for test in tests:
+            stats.setdefault(test, (default, 0.0))
+        return stats
+
+
+def order_tests(tests, stats, policy):
+    """ Sort test names according to an ordering policy (see g_order_policies) """
+    if policy == "slowest":
+        key = lambda test: (-stats[test][0], test)
+    elif policy == "failing":
+        key = lambda test: (-stats[test][1], -stats[test][0], test)
+    else:
+        key = lambda test: test
+    return sorted(tests, key=key)
+
+
+def shard_tests(tests, stats, count):
+    """ Split the tests into count shards of about the same estimated duration,
+        using the longest-processing-time-first heuristic: the slowest
+        remaining test is assigned to the shard with the lowest load.
+        The assignment only depends on the tests and their statistics.
+        Returns a list of (estimated duration, tests) per shard """
+    shards = [[0.0, []] for _ in range(count)]
+    for test in order_tests(tests, stats, "slowest"):
+        shard = min(shards, key=lambda shard: shard[0])
+        shard[0] += stats[test][0]
+        shard[1].append(test)
+    return [(load, tests) for load, tests in shards]
+
+
+def parse_shard(value):
+    """ Parse a 'i/N' shard specification, i being 1-based.
+        Returns (i, N) or None if invalid """
+    try:
+        index, count = [int(part) for part in value.split('/')]
+    except ValueError:
+        return None
+    if count < 1 or index < 1 or index > count:
+        return None
+    return index, count
@@ -7,12 +7,23 @@ Copyright (c) 2019-2020, Arm Limited and Contributors. All rights reserved.
 SPDX-License-Identifier: BSD-3-Clause
 """
 
-from multiprocessing import Process
+from multiprocessing import Process, Queue as ProcessQueue
+import Queue
 import os
 import argparse
 import functools
 import sys
 import json
+import sqlite3
+import time
+
+from testhistory import TestHistory, g_history_db, g_order_policies, \
+                        order_tests, shard_tests, parse_shard
+from resultcache import ResultCache, g_result_cache_dir, \
+                        g_result_cache_max_age, g_result_cache_max_size
+from profiler import parse_elf_option
+from inject import parse_window
+from workerpool import WorkerPool, g_prewarm_modules
 
 """ class TestRunner
 Base class for running tests on an FVP wrapper derived class.
@@ -29,11 +40,28 @@ Default arguments required by TestRunner, shared by all FVP Wrappers:
 - --list
 - --runTest
 - --runAll
+- --jobs
+- --history-db
+- --shard
+- --order
+- --result-cache
+- --no-cache
+- --cache-max-age
+- --cache-max-size
+- --batch
 
 requirements on a test-specification from a TestRunner's point of view:
 test must contain:
 - "name" field
 - "description" field
+test may contain:
+- "clean_boot" field: if True, the test is not batched with other tests
+  (--batch) nor started from a checkpoint (--checkpoint-dir), ie. because it
+  verifies the boot of the model
+- "timeout" field: timeout of the test in seconds, replacing --timeout (ie.
+  for long running suites)
+- "hang_window" field: hang detection window of the test in seconds,
+  replacing --hang-window (0 disables hang detection for the test)
 """
 
 class TestRunner:
@@ -57,7 +85,8 @@ class TestRunner:
              " provided by the user (default: %(default)s)")
 
         self.parser.add_argument("--timeout", dest='timeout', type=int,
-        help="FVP Execution timeout in seconds (default: %(default)s)", default=60)
+        help="FVP Execution timeout in seconds, for the tests which do not "
+             "set their own 'timeout' (default: %(default)s)", default=60)
 
         self.parser.add_argument("--fvp", type=str,
             help="Absolute path to the FVP .so file")
@@ -78,6 +107,127 @@ class TestRunner:
         self.parser.add_argument("--runAll", dest='runAll', default=False,
             help="Run all registered tests", required = False, action='store_true')
 
+        self.parser.add_argument("--checkpoint-dir", dest='checkpoint_dir', type=str,
+            help="Directory of model checkpoints. Tests are started from a "
+                 "checkpoint of the booted model matching the images and model "
+                 "parameters, which is saved by the first test if not present. "
+                 "Tests with 'clean_boot' set always boot the model",
+            default=None)
+
+        self.parser.add_argument("--jobs", dest='jobs', type=int, default=1,
+            help="Number of tests executed in parallel by --runAll. Each test "
+                 "runs in its own process with its own log directory, telnet "
+                 "ports and Iris port (default: %(default)s)")
+
+        self.parser.add_argument("--history-db", dest='history_db', type=str,
+            default=g_history_db,
+            help="SQLite database of the wall time and outcome of previous "
+                 "test runs, used by --shard and --order. Each test run is "
+                 "recorded (default: %(default)s)")
+
+        self.parser.add_argument("--shard", dest='shard', type=str, default=None,
+            help="Run the i-th of N shards of --runAll, given as 'i/N'. Tests "
+                 "are assigned to shards of about the same duration based on "
+                 "the history database, which must be the same for all shards")
+
+        self.parser.add_argument("--order", dest='order', default="name",
+            choices=sorted(g_order_policies.keys()),
+            help="Order in which --runAll starts the tests: " +
+                 ", ".join("'{0}': {1}".format(policy, description)
+                           for policy, description in sorted(g_order_policies.items())) +
+                 " (default: %(default)s)")
+
+        self.parser.add_argument("--result-cache", dest='result_cache', type=str,
+            nargs='?', const=g_result_cache_dir, default=None,
+            help="Enable the result cache, in the given directory (default "
+                 "directory: %(const)s). A test which passed with the same FVP "
+                 "binary, images, model parameters and test specification is "
+                 "not executed again, its logs are restored from the cache and "
+                 "it is reported as cached. Cached results are not recorded "
+                 "in the history database. Tests executed in a batch (--batch) "
+                 "do not use the cache (default: disabled)")
+
+        self.parser.add_argument("--no-cache", dest='no_cache', action='store_true',
+            help="Execute all tests, without looking up nor storing results "
+                 "in the result cache, overriding --result-cache", default=False)
+
+        self.parser.add_argument("--cache-max-age", dest='cache_max_age', type=float,
+            default=g_result_cache_max_age / (24 * 3600.0),
+            help="Cached results unused for longer than this number of days "
+                 "are evicted (default: %(default)s)")
+
+        self.parser.add_argument("--cache-max-size", dest='cache_max_size', type=float,
+            default=g_result_cache_max_size / (1024.0 * 1024.0),
+            help="Size of the result cache in MB, beyond which the least "
+                 "recently used results are evicted (default: %(default)s)")
+
+        self.parser.add_argument("--batch", dest='batch', action='store_true',
+            help="Let --runAll execute the tests in batches: the model is "
+                 "booted once per batch, and the tests of the batch are "
+                 "executed one after another in the booted model. One batch is "
+                 "formed per job (--jobs). Tests with 'clean_boot' set are "
+                 "executed on their own. The tests of a batch are always "
+                 "executed, the result cache (--result-cache) is neither "
+                 "looked up nor updated by batches (default: %(default)s)",
+            default=False)
+
+        self.parser.add_argument("--record-traces", dest='record_traces', action='store_true',
+            help="Record the data received and the commands written by each "
+                 "watcher, with their timing, to <test>_<terminal>.trace. A "
+                 "trace is replayed without a model by uarttrace.py "
+                 "(default: %(default)s)", default=False)
+
+        self.parser.add_argument("--archive-logs", dest='archive_logs', action='store_true',
+            help="Replace the terminal logs of each test by compressed, "
+                 "indexed log stores (<log>.lzs) once the test is finished. "
+                 "Stores are queried with logstore.py (default: %(default)s)",
+            default=False)
+
+        self.parser.add_argument("--hang-window", dest='hang_window', type=int,
+            default=0,
+            help="Abort a test once no terminal received output and no CPU of "
+                 "the model executed an instruction for this number of "
+                 "seconds, printing the last PCs of the CPUs and the last "
+                 "lines of each terminal. Quiet phases of a healthy model (ie. "
+                 "a guest idling in WFI while waiting for a timer) must be "
+                 "shorter than the window. Tests setting their own "
+                 "'hang_window' use it instead. 0 disables hang detection "
+                 "(default: %(default)s)")
+
+        self.parser.add_argument("--mips-interval", dest='mips_interval', type=float,
+            default=0,
+            help="Sample the instruction counter of each CPU of the model "
+                 "every this number of seconds, reporting the mean, 5th and "
+                 "95th percentile MIPS of each cluster with the test results. "
+                 "0 disables sampling (default: %(default)s)")
+
+        self.parser.add_argument("--profile-interval", dest='profile_interval', type=float,
+            default=0,
+            help="Sample the PC of each CPU of the model every this number of "
+                 "seconds, writing a profile of the test as collapsed stacks "
+                 "(<test>_profile.folded, ie. for flamegraph.pl) and a "
+                 "summary (<test>_profile.txt). 0 disables profiling "
+                 "(default: %(default)s)")
+
+        self.parser.add_argument("--profile-elf", dest='profile_elfs', action='append',
+            default=[], metavar="CPU=ELF",
+            help="ELF file symbolizing the PC samples of the CPUs whose name "
+                 "contains CPU (ie. 'se=se_rom.elf'). May be given several "
+                 "times, the ELF files of a CPU being searched in order. The "
+                 "nm executable may be set by the NM environment variable")
+
+        self.parser.add_argument("--inject-window", dest='inject_window', type=str,
+            default=None, metavar="ADDRESS,SIZE",
+            help="Page aligned window of guest physical memory receiving the "
+                 "host files injected by the 'i' commands of the tests, which "
+                 "the guest must not use and read through /dev/mem (ie. "
+                 "'0xff000000,0x1000000')")
+
+        self.parser.add_argument("--inject-cpu", dest='inject_cpu', type=str,
+            default=None, metavar="CPU",
+            help="Write injected files through the first CPU of the model "
+                 "whose name contains CPU (default: the first CPU)")
+
         # Set Specialization-specific arguments
         self.parser.add_argument_group('FVP specific arguments')
         self.setSpecializationArguments()
@@ -106,46 +256,271 @@ class TestRunner:
         elif self.runAll:
             self.runAllTests()
 
+    def openHistory(self):
+        """ Returns the test history database, or None if it cannot be opened
+            (the tests are then run without history) """
+        try:
+            return TestHistory(self.history_db)
+        except (sqlite3.Error, OSError) as e:
+            print("WARNING: cannot open test history {0}: {1}".format(self.history_db, e))
+            return None
+
+    def recordRun(self, history, testname, started, exitcode, cached=False):
+        # The duration of a cached result is not the duration of the test,
+        # it would skew the estimates of --shard and --order
+        if history is None or cached:
+            return
+        try:
+            history.record(self.FVPType.__name__, testname, started,
+                           time.time() - started, exitcode)
+        except sqlite3.Error as e:
+            print("WARNING: cannot record run of '{0}': {1}".format(testname, e))
+
+    def scheduleTests(self, history):
+        """ Returns the tests to be run by --runAll, in the order they are
+            started, restricted to the requested shard """
+        tests = sorted(self.tests.keys())
+        stats = {}
+        if history is not None:
+            try:
+                stats = history.statistics(self.FVPType.__name__, tests)
+            except sqlite3.Error as e:
+                print("WARNING: cannot read test history: {0}".format(e))
+        if not stats:
+            stats = dict((test, (1.0, 0.0)) for test in tests)
+
+        if self.shard is not None:
+            index, count = self.shard
+            shards = shard_tests(tests, stats, count)
+            load, tests = shards[index - 1]
+            print("Shard {0}/{1}: {2} of {3} tests, estimated {4:.1f}s "
+                  "(shards: {5})".format(index, count, len(tests), len(self.tests), load,
+                  ", ".join("{0:.1f}s".format(shard_load) for shard_load, _ in shards)))
+
+        return order_tests(tests, stats, self.order)
+
+    def evictResults(self):
+        """ Remove the old results from the result cache before running tests """
+        result_cache = self.FVPWrapperArgs['result_cache']
+        if result_cache is None:
+            return
+        try:
+            removed = ResultCache(result_cache, self.cache_max_age,
+                                  self.cache_max_size).evict()
+        except (IOError, OSError) as e:
+            print("WARNING: cannot evict results from {0}: {1}".format(result_cache, e))
+            return
+        if removed:
+            print("Evicted {0} results from {1}".format(removed, result_cache))
+
     def runTest(self, testname):
+        # Start FVP execution in separate process and await test finished
+        self.evictResults()
+        history = self.openHistory()
+        started = time.time()
+        result_q = ProcessQueue()
+        p = self.startTest(testname, result_q=result_q)
+        p.join()
+        try:
+            _, _, _, cached = result_q.get(timeout=1)
+        except Queue.Empty:
+            # The test process crashed before posting its result
+            cached = False
+        if cached:
+            print("Test '{0}' was not executed, its result was taken from the "
+                  "result cache".format(testname))
+        self.recordRun(history, testname, started, p.exitcode, cached)
+
+        # Stop test execution if test failed
+        if p.exitcode != 0:
+            sys.exit(p.exitcode)
+
+    def runModel(self, testname, slot, batch, stdin, kwargs, result_q=None):
+        """ Execute a test (or a batch) in the current process, which exits
+            with the exit code of the test. See startTest """
+        exitcode = 1
+        cached = False
+        try:
+            fvp = self.FVPType(stdin=stdin, **kwargs)
+            if slot is not None:
+                # Keep the output of parallel tests apart
+                logpath = os.path.join(fvp.log_dir, testname + "_wrapper.txt")
+                sys.stdout = sys.stderr = open(logpath, "w", 1)
+            if batch is not None:
+                report = None
+                if result_q is not None:
+                    report = lambda *result: result_q.put(result + (False,))
+                results = fvp.executeBatch([self.tests[name] for name in batch], report)
+                exitcode = 0 if all(result[1] == 0 for result in results) else 1
+            else:
+                exitcode = fvp.executeTest()
+                cached = fvp.cached
+        except SystemExit as e:
+            exitcode = 0 if e.code is None else e.code
+        finally:
+            if result_q is not None:
+                result_q.put((testname, exitcode, None, cached))
+        sys.exit(exitcode)
+
+    def startTest(self, testname, slot=None, result_q=None, batch=None, pool=None,
+                  refill=True):
         """ fm.debug may throw a segmentation fault if a model is launched multiple
             times within the same process. This issue also presents itself if the
             model is run as a separate thread but within the same process.
             To ensure proper clean-up between test executions, execute the model
             in a separate process.
+            If a worker slot is given, the model is isolated from the models
+            of the other slots: it gets its own log directory and its output
+            is written to a log file. Telnet and Iris ports are leased by each
+            model, see portlease.py. The (testname, exitcode, None, cached)
+            of the test is posted to result_q once the test is finished,
+            cached being set if the result was taken from the result cache.
+            If batch is given, the tests it names are executed in a single
+            model session (see FVPWrapper.executeBatch), testname then names
+            the batch. The (testname, exitcode, duration, False) of each test
+            of the batch is posted to result_q, followed by the result of the
+            batch.
+            If a WorkerPool is given (whose workers post to result_q), the
+            test is executed by one of its prewarmed processes, which is
+            refilled if refill is set.
         """
-        def runModel(stdin, **kwargs):
-            sys.exit(self.FVPType(
-                stdin=stdin,
-                **kwargs).executeTest())
-
-        try:
-            testspec = self.tests[testname]
-        except KeyError:
-            print("Trying to execute unknown test '{0}', aborting...".format(testname))
-            sys.exit(1)
+        if batch is not None:
+            # The watchers of the batch session are set up without test
+            # strings and commands, these are applied per test of the batch
+            testspec = {'name': testname, 'commands': [],
+                        'description': "Batch of " + ", ".join(batch)}
+        else:
+            try:
+                testspec = self.tests[testname]
+            except KeyError:
+                print("Trying to execute unknown test '{0}', aborting...".format(testname))
+                sys.exit(1)
 
         # Generate argument dictionary for FVP executor
         # Note that these are >named< arguments, and expects the naming
         # to be consistent across FVP constructor argument names.
         kwargs = dict({"testspec": testspec}, **self.FVPWrapperArgs)
+        if slot is not None:
+            kwargs['log_subdir'] = testname
 
         # stdin of this process is passed to spawned processed, enabling stdin
         # in child processes, see:
         # https://stackoverflow.com/questions/7489967/python-using-stdin-in-child-process/15766145#15766145
         stdin = sys.stdin.fileno()
 
-        # Start FVP execution in separate process and await test finished
-        p = Process(target=runModel, args=[stdin], kwargs=kwargs)
-        p.start()
-        p.join()
+        if pool is not None:
+            return pool.submit((testname, slot, batch, stdin, kwargs), refill=refill)
 
-        # Stop test execution if test failed
-        if p.exitcode != 0:
-            sys.exit(p.exitcode)
+        p = Process(target=self.runModel,
+                    args=[testname, slot, batch, stdin, kwargs, result_q])
+        p.start()
+        return p
+
+    def scheduleJobs(self, tests):
+        """ Group the tests into jobs, each executed by one model process.
+            Returns a list of (job name, batch), batch being the tests executed
+            in a single session, or None for a job executing the test named
+            after the job """
+        if not self.batch:
+            return [(testname, None) for testname in tests]
+
+        batchable = [testname for testname in tests
+                     if not self.tests[testname].get('clean_boot', False)]
+        jobs = [(testname, None) for testname in tests
+                if testname not in batchable]
+        count = min(self.jobs, len(batchable))
+        for i in range(count):
+            # Tests are dealt to the batches in the order they are scheduled
+            batch = batchable[i::count]
+            if len(batch) == 1:
+                jobs.append((batch[0], None))
+            else:
+                jobs.append(("batch{0}".format(i), batch))
+        return jobs
 
     def runAllTests(self):
-        for testname, _ in self.tests.iteritems():
-            self.runTest(testname)
+        """ Run all registered tests, at most self.jobs at a time.
+            Results are collected as the tests finish; a failing test does not
+            stop the remaining ones.
+        """
+        self.evictResults()
+        history = self.openHistory()
+        scheduled = self.scheduleTests(history)
+        pending = self.scheduleJobs(scheduled)
+        total = len(scheduled)
+        running = {}    # job name -> (process, slot, start time, batch)
+        free_slots = list(range(self.jobs))
+        results = {}
+        cached_tests = set()
+        result_q = ProcessQueue()
+        # Each job runs in a process of its own, taken from processes which
+        # imported iris.debug ahead of time
+        pool = WorkerPool(functools.partial(self.runModel, result_q=result_q),
+                          min(self.jobs, len(pending)),
+                          g_prewarm_modules + [self.FVPType.__module__])
+
+        def report(testname, exitcode, started, cached=False):
+            results[testname] = exitcode
+            if cached:
+                cached_tests.add(testname)
+            self.recordRun(history, testname, started, exitcode, cached)
+            if exitcode != 0:
+                verdict = "FAIL ({0})".format(exitcode)
+            else:
+                verdict = "PASS (cached)" if cached else "PASS"
+            print("[{0}/{1}] {2}: {3}".format(len(results), total, testname, verdict))
+
+        def finish(jobname, exitcode, cached=False):
+            p, slot, started, batch = running.pop(jobname)
+            p.join()
+            free_slots.append(slot)
+            if batch is None:
+                report(jobname, exitcode, started, cached)
+                return
+            # Tests of a batch report their own result. Those which did not
+            # (ie. the process crashed) fail
+            for testname in batch:
+                if testname not in results:
+                    report(testname, exitcode or 1, started)
+
+        try:
+            while pending or running:
+                while pending and free_slots:
+                    jobname, batch = pending.pop(0)
+                    slot = free_slots.pop(0)
+                    started = time.time()
+                    if self.jobs > 1:
+                        print("Starting test '{0}' in slot {1}".format(jobname, slot))
+                        p = self.startTest(jobname, slot, result_q, batch, pool, bool(pending))
+                    else:
+                        p = self.startTest(jobname, result_q=result_q, batch=batch, pool=pool,
+                                           refill=bool(pending))
+                    running[jobname] = (p, slot, started, batch)
+
+                try:
+                    name, exitcode, duration, cached = result_q.get(timeout=1)
+                    if name in running:
+                        finish(name, exitcode, cached)
+                    else:
+                        # Result of a test of a batch
+                        report(name, exitcode, time.time() - duration)
+                except Queue.Empty:
+                    # A process which died without posting its result (ie. a
+                    # crash within the model library) is collected here
+                    for jobname, (p, _, _, _) in list(running.items()):
+                        if not p.is_alive() and result_q.empty():
+                            finish(jobname, p.exitcode)
+        finally:
+            # Stop the workers left waiting for a task
+            pool.close()
+
+        failed = [testname for testname, exitcode in results.items() if exitcode != 0]
+        print("{0} of {1} tests passed ({2} from the result cache)".format(
+            len(results) - len(failed), len(results), len(cached_tests)))
+        for testname in sorted(failed):
+            print("FAILED: {0}".format(testname))
+        if failed:
+            sys.exit(1)
 
     def registerTestSpecifications(self):
         print("Subclass did not implement test registration")
@@ -164,6 +539,30 @@ class TestRunner:
         self.FVPWrapperArgs['usermode'] = args.usermode
         self.FVPWrapperArgs['fvp_timeout'] = args.timeout
         self.FVPWrapperArgs['fvp_path'] = args.fvp
+        self.FVPWrapperArgs['checkpoint_dir'] = args.checkpoint_dir
+        self.FVPWrapperArgs['record_traces'] = args.record_traces
+        self.FVPWrapperArgs['archive_logs'] = args.archive_logs
+        self.FVPWrapperArgs['hang_window'] = args.hang_window
+        self.FVPWrapperArgs['mips_interval'] = args.mips_interval
+        self.FVPWrapperArgs['profile_interval'] = args.profile_interval
+        profile_elfs = [parse_elf_option(value) for value in args.profile_elfs]
+        if None in profile_elfs:
+            print("Invalid --profile-elf, expected CPU=ELF")
+            sys.exit(1)
+        self.FVPWrapperArgs['profile_elfs'] = profile_elfs
+        inject_window = None
+        if args.inject_window is not None:
+            inject_window = parse_window(args.inject_window)
+            if inject_window is None:
+                print("Invalid --inject-window, expected ADDRESS,SIZE with a page aligned address")
+                sys.exit(1)
+        self.FVPWrapperArgs['inject_window'] = inject_window
+        self.FVPWrapperArgs['inject_cpu'] = args.inject_cpu
+        # Results of tests inspected by the user are never taken from the cache
+        self.FVPWrapperArgs['result_cache'] = None if args.no_cache or args.usermode \
+                                              else args.result_cache
+        self.cache_max_age = args.cache_max_age * 24 * 3600
+        self.cache_max_size = args.cache_max_size * 1024 * 1024
 
         def booleanize(arg):
             return True if arg is not None else False
@@ -172,6 +571,23 @@ class TestRunner:
         self.list = args.list
         self.runAll = args.runAll
         self.runSingle = args.runTest
+        self.jobs = args.jobs
+        self.batch = args.batch
+        self.history_db = args.history_db
+        self.order = args.order
+        self.shard = None
+
+        if self.jobs < 1:
+            print('--jobs must be at least 1')
+            sys.exit(1)
+        if self.jobs > 1 and args.usermode:
+            print('--usermode requires user input and cannot be used with --jobs')
+            sys.exit(1)
+        if args.shard is not None:
+            self.shard = parse_shard(args.shard)
+            if self.shard is None:
+                print("--shard must be given as 'i/N', with 1 <= i <= N")
+                sys.exit(1)
 
         # Test runner execution mode is mutually exclusive
         if not reduce((lambda x,y: x ^ y), [args.list, args.runAll, booleanize(args.runTest)]) :
@@ -27,6 +27,7 @@ import json
 import re
 import subprocess
 import argparse
+import time
 
 from consolemenu import *
 from consolemenu.items import *
@@ -62,22 +63,67 @@ for platform, argstring in (vars(args)).iteritems():
 # which will be executed when the menu exits
 queuedTest = None
 
-testsForPlatforms = {}
-for platform in platforms:
+# The tests of each platform are listed by its testrunner (--list). Listings
+# are kept in a manifest, and a testrunner is only queried again once its file
+# was modified. Testrunners which must be queried are run in parallel.
+manifestpath = os.path.join(os.path.expanduser("~"), ".cache", "fvp_testselector_manifest.json")
+
+def loadManifest():
+    try:
+        with open(manifestpath) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+def saveManifest(manifest):
+    tmppath = "{0}.tmp.{1}".format(manifestpath, os.getpid())
     try:
+        if not os.path.exists(os.path.dirname(manifestpath)):
+            os.makedirs(os.path.dirname(manifestpath))
+        with open(tmppath, "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.rename(tmppath, manifestpath)
+    except (IOError, OSError) as e:
+        print("Could not write test manifest {0}: {1}".format(manifestpath, e))
+
+def discoverTests(platforms):
+    startTime = time.time()
+    manifest = loadManifest()
+    probes = {}
+    paths = {}
+    for platform in platforms:
         testrunnerpath = os.path.join(platforms_dir, platform,platform + "_testrunner.py")
         if not os.path.isfile(testrunnerpath):
             print("Testrunner file for platform '{0}' was not found".format(platform))
             print("Expected file: {0}".format(testrunnerpath))
             sys.exit(1)
 
-        jsonString = os.popen(
-            "python {0} --list".format(testrunnerpath)).read()
-        testmap = json.loads(jsonString)
-        testsForPlatforms[platform] = testmap
-    except:
-        print("Could not parse json string from testrunner")
-        sys.exit(1)
+        st = os.stat(testrunnerpath)
+        signature = [st.st_mtime, st.st_size]
+        # Entries are keyed by the testrunner path, as checkouts share the manifest
+        testrunnerpath = os.path.realpath(testrunnerpath)
+        paths[platform] = testrunnerpath
+        entry = manifest.get(testrunnerpath)
+        if entry is None or entry['signature'] != signature:
+            probes[platform] = (testrunnerpath, signature, subprocess.Popen(
+                ["python", testrunnerpath, "--list"], stdout=subprocess.PIPE))
+
+    for platform, (testrunnerpath, signature, probe) in probes.iteritems():
+        jsonString = probe.communicate()[0]
+        try:
+            testmap = json.loads(jsonString)
+        except ValueError:
+            print("Could not parse json string from testrunner of platform '{0}'".format(platform))
+            sys.exit(1)
+        manifest[testrunnerpath] = {'signature': signature, 'tests': testmap}
+
+    if probes:
+        saveManifest(manifest)
+        print("Listed the tests of {0} platform(s) in {1:.2f}s".format(
+            len(probes), time.time() - startTime))
+    return dict((platform, manifest[paths[platform]]['tests']) for platform in platforms)
+
+testsForPlatforms = discoverTests(platforms)
 
 # Create main menu object
 menu = ConsoleMenu(title="ARM FVP Unit Test Runner",
@@ -0,0 +1,133 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" throughput.py:
+Simulation throughput telemetry.
+A ThroughputSampler thread periodically reads the instruction counter of each
+CPU of the model through Iris, and records the number of instructions
+executed per wall second over each interval. Rates are summarized per cluster
+(the CPUs sharing the same parent component), as the mean, 5th and 95th
+percentile MIPS over the run, for comparing host types and FVP releases.
+Intervals during which the model was stopped (ie. to save a checkpoint) are
+part of the samples and lower the rates.
+"""
+
+import json
+import threading
+import time
+
+from timeline import monotonic
+from watchdog import cpu_name
+
+
+def cluster_name(name):
+    """ Cluster of a CPU, ie. 'component.host.cluster0.cpu1' -> 'host.cluster0' """
+    if name.startswith("component."):
+        name = name[len("component."):]
+    return name.rpartition('.')[0] or name
+
+
+def percentile(values, p):
+    """ Nearest-rank percentile of a list of values """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class ThroughputSampler(object):
+    def __init__(self, cpus, interval, lock=None):
+        self.cpus = cpus
+        self.names = [cpu_name(cpu, i) for i, cpu in enumerate(cpus)]
+        self.interval = interval
+        # Serializes the Iris requests with those of other threads
+        self.lock = lock if lock is not None else threading.Lock()
+
+        self.origin = monotonic()
+        self.wall_origin = time.time()
+        self.last = None        # (time, [instruction count])
+        self.samples = []       # (time, [MIPS of each CPU over the interval])
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.setName("throughput_sampler")
+        self.thread.setDaemon(True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self, timeout):
+        """ Stop the sampler, taking a last sample """
+        self.stop_event.set()
+        self.thread.join(timeout)
+
+    def counts(self):
+        counts = []
+        with self.lock:
+            for cpu in self.cpus:
+                try:
+                    counts.append(cpu.get_instruction_count())
+                except Exception:
+                    counts.append(None)
+        return monotonic() - self.origin, counts
+
+    def sample(self):
+        now, counts = self.counts()
+        if self.last is not None and now > self.last[0]:
+            elapsed = now - self.last[0]
+            self.samples.append((now, [
+                None if count is None or previous is None
+                else (count - previous) / elapsed / 1e6
+                for count, previous in zip(counts, self.last[1])]))
+        self.last = (now, counts)
+        return any(count is not None for count in counts)
+
+    def run(self):
+        if not self.sample():
+            # No instruction counter is readable through Iris
+            return
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+        self.sample()
+
+    def clusters(self):
+        """ Returns a map of cluster -> [MIPS of the cluster per interval] """
+        clusters = {}
+        for i, name in enumerate(self.names):
+            clusters.setdefault(cluster_name(name), []).append(i)
+        rates = {}
+        for cluster, indices in clusters.items():
+            rates[cluster] = [sum(mips[i] for i in indices) for _, mips in self.samples
+                              if all(mips[i] is not None for i in indices)]
+        return rates
+
+    def summary(self):
+        """ Returns a map of cluster -> {'mean', 'p5', 'p95', 'samples'} (MIPS) """
+        summary = {}
+        for cluster, rates in self.clusters().items():
+            if rates:
+                summary[cluster] = {'mean': sum(rates) / len(rates),
+                                    'p5': percentile(rates, 5),
+                                    'p95': percentile(rates, 95),
+                                    'samples': len(rates)}
+        return summary
+
+    def report(self):
+        """ Returns one line per cluster for the test report """
+        return ["{0:<30} mean {1:9.2f}  p5 {2:9.2f}  p95 {3:9.2f} MIPS ({4} samples)".format(
+                    cluster, stats['mean'], stats['p5'], stats['p95'], stats['samples'])
+                for cluster, stats in sorted(self.summary().items())]
+
+    def write(self, path):
+        """ Write the samples and their summary as JSON """
+        with open(path, "w") as f:
+            json.dump({'wall_start': self.wall_origin,
+                       'interval': self.interval,
+                       'cpus': self.names,
+                       'samples': [{'time': sampletime, 'mips': mips}
+                                   for sampletime, mips in self.samples],
+                       'summary': self.summary()}, f, indent=4)
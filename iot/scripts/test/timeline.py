@@ -0,0 +1,155 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" timeline.py:
+Latency instrumentation of an FVP test run.
+A Timeline records the start and end of each phase of the run (model spawn,
+Iris port detection, Iris server readiness, ...) and the time at which each
+watcher command step completes, on a monotonic clock. The timeline is written
+as JSON and as a Prometheus text exposition file, allowing regressions in
+model startup or guest boot to be tracked across FVP and image versions.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CLOCK_MONOTONIC = 1
+
+
+class timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+def _monotonic_clock():
+    """ time.monotonic() is not available with python 2.7, clock_gettime()
+        is called directly instead """
+    if hasattr(time, 'monotonic'):
+        return time.monotonic
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        clock_gettime = libc.clock_gettime
+        clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+    except (OSError, AttributeError):
+        return time.time
+
+    def monotonic():
+        ts = timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(ts)) != 0:
+            return time.time()
+        return ts.tv_sec + ts.tv_nsec * 1e-9
+    return monotonic
+
+monotonic = _monotonic_clock()
+
+
+def prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Timeline(object):
+    def __init__(self, testname):
+        self.testname = testname
+        self.lock = threading.Lock()
+        # All times are recorded in seconds from the creation of the timeline
+        self.origin = monotonic()
+        self.wall_origin = time.time()
+        self.phases = []    # [name, start, end]; end is None while running
+        self.steps = []     # (watcher, index, type, string, time)
+
+    def now(self):
+        return monotonic() - self.origin
+
+    def begin(self, name):
+        with self.lock:
+            self.phases.append([name, self.now(), None])
+
+    def end(self, name):
+        """ End the last started phase with the given name """
+        with self.lock:
+            for phase in reversed(self.phases):
+                if phase[0] == name and phase[2] is None:
+                    phase[2] = self.now()
+                    return
+
+    @contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def step(self, watcher, index, steptype, string):
+        """ Record a watcher step. steptype is a command type ('r' once the
+            string was read, 'w' once it was written) or a watcher event
+            (ie. 'stop') """
+        with self.lock:
+            self.steps.append((watcher, index, steptype, string, self.now()))
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'test': self.testname,
+                'wall_start': self.wall_origin,
+                'phases': [{'phase': name, 'start': start, 'end': end,
+                            'duration': None if end is None else end - start}
+                           for name, start, end in self.phases],
+                'steps': [{'watcher': watcher, 'step': index, 'type': steptype,
+                           'string': string, 'time': steptime}
+                          for watcher, index, steptype, string, steptime in self.steps],
+            }
+
+    def to_prometheus(self):
+        timeline = self.to_dict()
+        test = prometheus_label(self.testname)
+        lines = [
+            "# HELP fvp_test_phase_start_seconds Start of a phase of the FVP test run",
+            "# TYPE fvp_test_phase_start_seconds gauge",
+        ]
+        for phase in timeline['phases']:
+            lines.append('fvp_test_phase_start_seconds{{test="{0}",phase="{1}"}} {2:.6f}'.format(
+                test, prometheus_label(phase['phase']), phase['start']))
+        lines += [
+            "# HELP fvp_test_phase_duration_seconds Duration of a phase of the FVP test run",
+            "# TYPE fvp_test_phase_duration_seconds gauge",
+        ]
+        for phase in timeline['phases']:
+            if phase['duration'] is not None:
+                lines.append('fvp_test_phase_duration_seconds{{test="{0}",phase="{1}"}} {2:.6f}'.format(
+                    test, prometheus_label(phase['phase']), phase['duration']))
+        lines += [
+            "# HELP fvp_test_step_seconds Time of a watcher step from the start of the FVP test run",
+            "# TYPE fvp_test_step_seconds gauge",
+        ]
+        for step in timeline['steps']:
+            lines.append(('fvp_test_step_seconds{{test="{0}",watcher="{1}",step="{2}",'
+                          'type="{3}",string="{4}"}} {5:.6f}').format(
+                test, prometheus_label(step['watcher']), step['step'],
+                prometheus_label(step['type']), prometheus_label(step['string']),
+                step['time']))
+        return "\n".join(lines) + "\n"
+
+    def write(self, log_dir):
+        """ Write <test>_timeline.json and <test>_timeline.prom to log_dir,
+            returning the path of the JSON file """
+        base = os.path.join(log_dir, self.testname + "_timeline")
+        with open(base + ".json", "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+        with open(base + ".prom", "w") as f:
+            f.write(self.to_prometheus())
+        return base + ".json"
+
+    def summary(self):
+        """ Returns one line per phase for the test report """
+        return ["{0:<20} {1:9.3f}s".format(phase['phase'], phase['duration'])
+                for phase in self.to_dict()['phases'] if phase['duration'] is not None]
@@ -0,0 +1,280 @@
+#!/usr/bin/env python2.7
+
+from __future__ import print_function
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" uarttrace.py:
+Record and replay of the telnet sessions of TelnetWatchers.
+A trace holds the bytes received by a watcher and the commands it wrote, with
+the time of each on a monotonic clock. A trace starts with the magic string,
+followed by records made of a header (record type, nanoseconds since the
+start of the trace, length of the payload) and the payload:
+- a configuration record (JSON): the strings and commands of the watcher,
+  written when the session starts and at the start of each batch segment
+- a received record: a chunk of data as handed to the watcher
+- a written record: a command written to the session
+Traces are only appended to, and stay readable up to the last complete record
+when the recording process dies.
+
+The replay driver feeds a trace through the receive path of a watcher,
+without a model: the strings and commands of the recorded configuration, or
+those of an override file, are matched against the recorded output at the
+original pace or faster. The events of the watcher, the commands it would
+have written and its verification verdict are printed.
+
+Usage:
+python uarttrace.py dump <trace>
+python uarttrace.py replay <trace> [--speed X] [--override watcher.json]
+The override file holds any of the configuration keys (ie. "stop_str",
+"verification_strs", "fail_strs", "commands": [["r", "login:"], ...]).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+from timeline import monotonic
+
+g_trace_magic = b"UARTTRC1"
+
+# Record header: type, time in nanoseconds from the start of the trace,
+# payload length
+g_record_header = struct.Struct("<BQI")
+
+TRACE_CONFIG = 0
+TRACE_RECEIVED = 1
+TRACE_WRITTEN = 2
+
+g_record_names = {
+    TRACE_CONFIG: "config",
+    TRACE_RECEIVED: "received",
+    TRACE_WRITTEN: "written",
+}
+
+
+class TraceWriter(object):
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(g_trace_magic)
+        self.origin = monotonic()
+
+    def record(self, rectype, data):
+        timestamp = int((monotonic() - self.origin) * 1e9)
+        self.file.write(g_record_header.pack(rectype, timestamp, len(data)) + data)
+        self.file.flush()
+
+    def config(self, config):
+        self.record(TRACE_CONFIG, json.dumps(config).encode('utf-8'))
+
+    def close(self):
+        self.file.close()
+
+
+def read_trace(path):
+    """ Yields the (type, time in seconds, payload) of the records of a
+        trace. A truncated last record is ignored """
+    with open(path, "rb") as f:
+        if f.read(len(g_trace_magic)) != g_trace_magic:
+            raise ValueError("{0} is not a UART trace".format(path))
+        while True:
+            header = f.read(g_record_header.size)
+            if len(header) < g_record_header.size:
+                return
+            rectype, timestamp, length = g_record_header.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield rectype, timestamp / 1e9, data
+
+
+def watcher_config(watcher):
+    """ Configuration record of a watcher, see TelnetWatcher.startSession """
+    return {
+        'name': watcher.terminal,
+        'stop_str': watcher.stop_str,
+        'sys_stop_str': watcher.sys_stop_str,
+        'verification_strs': list(watcher.verification_strs),
+        'platform_fail_strs': watcher.platform_fail_strs,
+        'fail_strs': watcher.fail_strs,
+        # Pending commands, in execution order
+        'commands': [list(command) for command in reversed(watcher.commandqueue)],
+        'boot_commands': max(0, watcher.boot_commands - watcher.commands_run),
+    }
+
+
+class TraceSession(object):
+    """ Stands for the telnet session of a watcher during a replay, recording
+        the commands written by the watcher """
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+    def close(self):
+        pass
+
+
+def configure(watcher, config):
+    """ Apply a configuration record to a watcher """
+    watcher.platform_fail_strs = list(config.get('platform_fail_strs', []))
+    watcher.setTestStrings(config.get('stop_str'), config.get('verification_strs', []),
+                           config.get('fail_strs', []))
+    watcher.commandqueue = [tuple(command) for command in reversed(config.get('commands', []))]
+    watcher.boot_commands = config.get('boot_commands', 0)
+    watcher.commands_run = 0
+    watcher.command = None
+
+
+def replay(path, speed=0, override={}, output=print):
+    """ Replay a trace through a TelnetWatcher. speed is the replay speed
+        relative to the recording, 0 replaying as fast as possible. The keys
+        of override replace those of the configuration records.
+        Returns True if the replayed session passes: for the session, or each
+        batch segment, the stop string (if any) and all verification strings
+        were found, and no failure string """
+    from fvp_wrapper import TelnetWatcher
+
+    # As during the recording, the output following the stop string of a
+    # batch segment is matched against the next segment
+    batch = sum(1 for rectype, _, _ in read_trace(path) if rectype == TRACE_CONFIG) > 1
+    records = read_trace(path)
+    workdir = tempfile.mkdtemp()
+    watcher = None
+    session = TraceSession()
+    recorded = []
+    state = {'stopped': False, 'failed': False}
+    verdicts = []
+    segments = 0
+    start = time.time()
+
+    def verdict():
+        verified = watcher.verify(output=output)
+        verdicts.append(verified and not state['failed'] and
+                        (watcher.stop_str is None or state['stopped']))
+        output("Segment {0}: {1}".format(len(verdicts), "PASS" if verdicts[-1] else "FAIL"))
+        state.update(stopped=False, failed=False)
+
+    def feed(timestamp, match, *args):
+        """ Call a matching method of the watcher, printing its events and
+            the commands it wrote """
+        written = len(session.written)
+        for event, string in match(*args):
+            output("{0:10.6f} {1}: '{2}'".format(timestamp, event, string))
+            state['stopped'] |= event == 'stop'
+            state['failed'] |= event == 'fail'
+        for command in session.written[written:]:
+            output("{0:10.6f} write: '{1}'".format(
+                timestamp, command.decode('utf-8', 'replace').rstrip('\n')))
+
+    try:
+        for rectype, timestamp, data in records:
+            if speed > 0:
+                delay = start + timestamp / speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+            if rectype == TRACE_CONFIG:
+                config = dict(json.loads(data.decode('utf-8')), **override)
+                if watcher is None:
+                    watcher = TelnetWatcher(config['name'],
+                                            os.path.join(workdir, config['name'] + ".txt"),
+                                            config.get('stop_str'), config['sys_stop_str'])
+                    configure(watcher, config)
+                    if batch:
+                        watcher.ends_segment = lambda event, string: event == 'stop'
+                    watcher.tn = session
+                    watcher.startSession()
+                else:
+                    # Start of a batch segment
+                    verdict()
+                    watcher.endSegment()
+                    configure(watcher, config)
+                    segments += 1
+                    watcher.beginSegment(os.path.join(workdir,
+                                                      "segment{0}.txt".format(segments)))
+                output("{0:10.6f} configuration: stop '{1}', {2} verification strings, "
+                       "{3} commands".format(timestamp, config.get('stop_str'),
+                                             len(config.get('verification_strs', [])),
+                                             len(config.get('commands', []))))
+                # Commands executed by the configuration may have failed
+                feed(timestamp, watcher.commandFailures)
+                if watcher.carry:
+                    feed(timestamp, watcher.resumeCarry)
+
+            elif rectype == TRACE_WRITTEN:
+                recorded.append(data)
+
+            elif rectype == TRACE_RECEIVED and watcher is not None:
+                # The model writes the received output to the UART log file
+                with open(watcher.termfile, "ab") as termfile:
+                    termfile.write(data)
+                feed(timestamp, watcher.consume, data)
+
+        if watcher is None:
+            output("No configuration record in the trace")
+            return False
+
+        output("Replayed in {0:.3f}s".format(time.time() - start))
+        if session.written != recorded:
+            output("Commands written differ from the recording:")
+            output("    recorded: {0}".format([command.rstrip(b'\n') for command in recorded]))
+            output("    replayed: {0}".format([command.rstrip(b'\n') for command in session.written]))
+        if segments == 0:
+            verified = watcher.verify(output=output)
+            return verified and not state['failed'] and \
+                   (watcher.stop_str is None or state['stopped'])
+        verdict()
+        return all(verdicts)
+    finally:
+        if watcher is not None:
+            watcher.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def dump(path, output=print):
+    for rectype, timestamp, data in read_trace(path):
+        if rectype == TRACE_CONFIG:
+            payload = data.decode('utf-8')
+        else:
+            payload = repr(data)
+        output("{0:10.6f} {1:<8} {2:6} {3}".format(timestamp, g_record_names.get(rectype, rectype),
+                                                   len(data), payload))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TelnetWatcher trace tools")
+    subparsers = parser.add_subparsers(dest='command')
+    dump_parser = subparsers.add_parser("dump", help="Print the records of a trace")
+    dump_parser.add_argument("trace")
+    replay_parser = subparsers.add_parser("replay", help="Replay a trace through a watcher")
+    replay_parser.add_argument("trace")
+    replay_parser.add_argument("--speed", type=float, default=0,
+        help="Replay speed relative to the recording, 0 for as fast as "
+             "possible (default: %(default)s)")
+    replay_parser.add_argument("--override", type=str, default=None,
+        help="JSON file of watcher configuration keys replacing the recorded ones")
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        dump(args.trace)
+        sys.exit(0)
+
+    override = {}
+    if args.override is not None:
+        with open(args.override) as f:
+            override = json.load(f)
+    passed = replay(args.trace, args.speed, override)
+    print("PASS" if passed else "FAIL")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,27 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" conftest.py:
+Unit tests of the FVP wrapper modules, run with:
+python2.7 -m pytest iot/scripts/test/unittests
+The modules under test are imported from the parent directory. The tests
+running the wrapper against fake_fvp.py connect to it through iris.debug, or
+through the minimal client of fakeiris/ on hosts without the Iris python
+package.
+"""
+
+import os
+import sys
+
+g_unittest_dir = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.dirname(g_unittest_dir))
+sys.path.insert(0, g_unittest_dir)
+
+try:
+    import iris.debug
+except ImportError:
+    sys.path.append(os.path.join(g_unittest_dir, "fakeiris"))
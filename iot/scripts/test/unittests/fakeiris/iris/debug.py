@@ -0,0 +1,112 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" debug.py:
+Minimal stand-in for iris.debug, implementing the part of NetworkModel used
+by the FVP wrapper over the IrisJson protocol served by fake_fvp.py. Only
+meant for the unit tests: the fake model has a single memory space, which
+is used whatever memory space is requested.
+"""
+
+import json
+import socket
+import threading
+
+
+class IrisClient(object):
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port))
+        self.stream = self.sock.makefile("rb")
+        self.lock = threading.Lock()
+        self.request_id = 0
+        self.sock.sendall(b"CONNECT / HTTP/1.1\r\n"
+                          b"Upgrade: IrisRpc/1.0\r\n"
+                          b"Supported-Formats: IrisJson\r\n\r\n")
+        response = b''
+        while not response.endswith(b'\r\n\r\n'):
+            line = self.stream.readline()
+            if not line:
+                raise IOError("Iris handshake failed")
+            response += line
+
+    def receive(self):
+        header = b''
+        while header.count(b':') < 2:
+            ch = self.stream.read(1)
+            if not ch:
+                raise IOError("Iris connection closed")
+            header += ch
+        message = json.loads(self.stream.read(int(header.split(b':')[1])).decode('utf-8'))
+        self.stream.read(1)     # Trailing newline
+        return message
+
+    def call(self, method, **params):
+        with self.lock:
+            self.request_id += 1
+            data = json.dumps({"jsonrpc": "2.0", "method": method, "params": params,
+                               "id": self.request_id})
+            self.sock.sendall("IrisJson:{0}:{1}\n".format(len(data), data).encode('utf-8'))
+            while True:
+                message = self.receive()
+                # Events (ie. simulation time) are not subscribed to
+                if message.get("id") == self.request_id:
+                    return message.get("result")
+
+    def close(self):
+        self.sock.close()
+
+
+class Cpu(object):
+    def __init__(self, client, inst_id, instance_name):
+        self.client = client
+        self.inst_id = inst_id
+        self.instance_name = instance_name
+
+    def get_instruction_count(self):
+        return self.client.call("step_getStepCounterValue", instId=self.inst_id,
+                                unit="instruction")
+
+    def read_register(self, name):
+        return self.client.call("resource_read", instId=self.inst_id, rscIds=[0])["data"][0]
+
+    def read_memory(self, address, memory_space=None, size=1, count=1):
+        return self.client.call("memory_read", instId=self.inst_id, spaceId=0,
+                                address=address, byteWidth=size, count=count)["data"]
+
+    def write_memory(self, address, data, memory_space=None, size=1, count=1):
+        self.client.call("memory_write", instId=self.inst_id, spaceId=0,
+                         address=address, byteWidth=size, count=count, data=list(data))
+
+
+class NetworkModel(object):
+    def __init__(self, host, port):
+        self.client = IrisClient(host, port)
+        self.engine = self.client.call("instanceRegistry_getInstanceInfoByName",
+                                       instId=0, instName="framework.SimulationEngine")["instId"]
+
+    def get_cpus(self):
+        return [Cpu(self.client, instance["instId"], instance["instName"][len("component."):])
+                for instance in self.client.call("instanceRegistry_getList", instId=0,
+                                                 prefix="component.")
+                if self.client.call("instance_getProperty", instId=instance["instId"],
+                                    propName="executesSoftware")]
+
+    def run(self, blocking=True):
+        self.client.call("simulationTime_run", instId=self.engine)
+
+    def stop(self):
+        self.client.call("simulationTime_stop", instId=self.engine)
+
+    def save_checkpoint(self, path):
+        self.client.call("checkpoint_save", instId=self.engine, checkpointDir=path)
+
+    def restore_checkpoint(self, path):
+        self.client.call("checkpoint_restore", instId=self.engine, checkpointDir=path)
+
+    def release(self, shutdown=False):
+        if shutdown:
+            self.client.call("simulation_requestShutdown", instId=0)
+        self.client.close()
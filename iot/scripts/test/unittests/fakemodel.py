@@ -0,0 +1,108 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" fakemodel.py:
+Execution of the FVP wrapper against fake_fvp.py, with a single 'host'
+terminal replaying a script (see fake_fvp.py) and test specifications in the
+format of the platform testrunners:
+{
+    'name'          : "login",
+    'boot_commands' : [('r', "login: "), ('w', "root"), ('r', "# ")],
+    'commands'      : [('w', "./test-app 1")],
+    'host_stop_str' : "Test passed",
+    'host_ver_strs' : ["Test passed"],
+    'host_fail_strs': ["Kernel panic"],
+}
+"""
+
+import json
+import os
+
+from fvp_wrapper import FVPWrapper, TelnetWatcher
+
+g_fake_fvp = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "fake_fvp.py")
+
+g_sys_stop_str = "/OSCI/SystemC: Simulation stopped by user"
+
+g_boot_log = "Booting the fake model\n" + "[    0.000000] a line of boot log\n" * 20
+
+# Script of a system printing a boot log, then logging in and running the
+# commands written to it
+g_login_script = [
+    {"text": g_boot_log},
+    {"text": "fake login: "},
+    {"expect": "root"},
+    {"text": "root@fake:~# "},
+]
+
+# Boot commands matching g_login_script
+g_login_commands = [
+    ('r', "fake login: "),
+    ('w', "root"),
+    ('r', "root@fake:~# "),
+]
+
+
+def write_config(directory, script, rate=0, cpus=None, name="fake.json"):
+    """ Write the fake_fvp.py configuration of a model with a 'host' terminal
+        replaying script, returning its path """
+    config = {
+        "terminals": {
+            "host.telnetterminal0": {
+                "out_file": "host.uart0.out_file",
+                "rate": rate,
+                "echo": True,
+                "script": script,
+            }
+        },
+        "cpus": cpus or [{"name": "host.cluster0.cpu0", "mips": 100}],
+    }
+    path = os.path.join(str(directory), name)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=4)
+    return path
+
+
+class FakeFVP(FVPWrapper):
+    def __init__(self, testspec, config, work_dir, fvp_timeout=30, **kwargs):
+        FVPWrapper.__init__(self, g_fake_fvp, "Fake", str(work_dir), testspec['name'],
+                            fvp_timeout, **kwargs)
+        self.config = config
+        self.testspec = testspec
+        port = self.leasePorts(1)[0]
+        self.host_watcher = TelnetWatcher(
+            name="host",
+            termfile=os.path.join(self.log_dir, testspec['name'] + "_host.txt"),
+            stop_str=testspec.get('host_stop_str'),
+            sys_stop_str=g_sys_stop_str,
+            verification_strs=testspec.get('host_ver_strs', []),
+            fvp_uart="host.uart0.out_file",
+            port=port,
+            fvp_port_param="host.telnetterminal0.start_port",
+            fail_strs=testspec.get('host_fail_strs', []))
+        for commandtype, command in testspec.get('boot_commands', []):
+            self.host_watcher.addCommand(commandtype, command, boot=True)
+        for commandtype, command in testspec.get('commands', []):
+            self.host_watcher.addCommand(commandtype, command)
+        self.watchers = [self.host_watcher]
+
+    def getModelParameters(self):
+        return {"fake.config": self.config}
+
+    def getModelData(self):
+        return {}
+
+    def applyTestspec(self, testspec):
+        self.host_watcher.setTestStrings(testspec.get('host_stop_str'),
+                                         testspec.get('host_ver_strs', []),
+                                         testspec.get('host_fail_strs', []))
+        for commandtype, command in testspec.get('commands', []):
+            self.host_watcher.addCommand(commandtype, command)
+
+    def hostLog(self):
+        with open(self.host_watcher.termfile) as f:
+            return f.read()
@@ -0,0 +1,134 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import os
+
+import resultcache
+from checkpoint import CheckpointStore, checkpoint_key
+from resultcache import FileHashes
+from fakemodel import FakeFVP, write_config, g_login_script, g_login_commands
+
+g_test_script = g_login_script + [
+    {"expect": "./test-app"},
+    {"text": "Test passed\n"},
+]
+
+g_login_test = {
+    'name'          : "login_test",
+    'boot_commands' : g_login_commands,
+    'commands'      : [('w', "./test-app")],
+    'host_stop_str' : "Test passed",
+    'host_ver_strs' : ["Test passed"],
+}
+
+# Verifies the boot log, like the boot tests of the platforms
+g_boot_test = dict(g_login_test, name="boot_test", clean_boot=True,
+                   host_ver_strs=["Booting the fake model", "Test passed"])
+
+
+def run(testspec, config, tmpdir, checkpoint_dir, fvp_timeout=20):
+    fvp = FakeFVP(testspec, config, tmpdir.join(testspec['name']),
+                  fvp_timeout=fvp_timeout, checkpoint_dir=checkpoint_dir)
+    return fvp.executeTest(), fvp
+
+
+def checkpoints(checkpoint_dir):
+    return [name for name in os.listdir(checkpoint_dir)
+            if os.path.isfile(os.path.join(checkpoint_dir, name, "meta.json"))]
+
+
+def test_key_reuses_file_hashes(tmpdir, monkeypatch):
+    image = tmpdir.join("image.bin")
+    image.write("image")
+    hashes = FileHashes(str(tmpdir.join("hashes.json")))
+    key = checkpoint_key(str(image), {"image": str(image)}, {}, hashes)
+    hashes.save()
+
+    def hash_file_mmap(path):
+        raise AssertionError("{0} hashed again".format(path))
+    monkeypatch.setattr(resultcache, "hash_file_mmap", hash_file_mmap)
+    hashes = FileHashes(str(tmpdir.join("hashes.json")))
+    assert checkpoint_key(str(image), {"image": str(image)}, {}, hashes) == key
+
+
+def test_key_changes_with_image(tmpdir):
+    image = tmpdir.join("image.bin")
+    image.write("image")
+    store = CheckpointStore(str(tmpdir.join("checkpoints")))
+    key = store.key(str(image), {"image": str(image)}, {})
+    image.write("other image")
+    os.utime(str(image), (0, 0))
+    assert store.key(str(image), {"image": str(image)}, {}) != key
+
+
+def test_saved_then_restored(tmpdir):
+    config = write_config(tmpdir, g_test_script)
+    checkpoint_dir = str(tmpdir.join("checkpoints"))
+
+    exitcode, fvp = run(g_login_test, config, tmpdir, checkpoint_dir)
+    assert exitcode == 0
+    assert len(checkpoints(checkpoint_dir)) == 1
+    assert "Booting the fake model" in fvp.hostLog()
+
+    exitcode, fvp = run(dict(g_login_test, name="restored_test"), config, tmpdir,
+                        checkpoint_dir)
+    assert exitcode == 0
+    # The boot log preceded the checkpoint
+    assert "Booting the fake model" not in fvp.hostLog()
+    assert "Test passed" in fvp.hostLog()
+
+
+def test_clean_boot_after_restore(tmpdir):
+    config = write_config(tmpdir, g_test_script)
+    checkpoint_dir = str(tmpdir.join("checkpoints"))
+    assert run(g_login_test, config, tmpdir, checkpoint_dir)[0] == 0
+    assert len(checkpoints(checkpoint_dir)) == 1
+
+    exitcode, fvp = run(g_boot_test, config, tmpdir, checkpoint_dir)
+    assert exitcode == 0
+    assert "Booting the fake model" in fvp.hostLog()
+    assert len(checkpoints(checkpoint_dir)) == 1
+
+
+def test_no_boot_commands_after_restore(tmpdir):
+    config = write_config(tmpdir, g_test_script)
+    checkpoint_dir = str(tmpdir.join("checkpoints"))
+    assert run(g_login_test, config, tmpdir, checkpoint_dir)[0] == 0
+
+    # Waits for the login prompt, which a restored model never prints
+    testspec = {
+        'name'          : "prompt_test",
+        'host_stop_str' : "fake login: ",
+        'host_ver_strs' : ["Booting the fake model"],
+    }
+    exitcode, fvp = run(testspec, config, tmpdir, checkpoint_dir, fvp_timeout=10)
+    assert exitcode == 0
+    assert len(checkpoints(checkpoint_dir)) == 1
+
+
+class FlashFVP(FakeFVP):
+    """ A model writing a flash image of its own for each test """
+    def getTestParameters(self):
+        path = os.path.join(self.log_dir, self.testspec['name'] + "_flash.img")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 4096)
+        return {"fake.flash": path}
+
+
+def test_test_parameters_not_keyed(tmpdir):
+    config = write_config(tmpdir, g_test_script)
+    checkpoint_dir = str(tmpdir.join("checkpoints"))
+    fvps = []
+    for name in ["flash_test", "other_flash_test"]:
+        fvp = FlashFVP(dict(g_login_test, name=name), config, tmpdir.join(name),
+                       fvp_timeout=20, checkpoint_dir=checkpoint_dir)
+        assert fvp.executeTest() == 0
+        assert name + "_flash.img" in fvp.fvp_params["fake.flash"]
+        fvps.append(fvp)
+    # The second test restored the checkpoint saved by the first one
+    assert fvps[0].checkpoint_key == fvps[1].checkpoint_key
+    assert len(checkpoints(checkpoint_dir)) == 1
+    assert "Booting the fake model" not in fvps[1].hostLog()
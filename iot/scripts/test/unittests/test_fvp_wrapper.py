@@ -0,0 +1,138 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" End to end runs of the FVPWrapper against fake_fvp.py """
+
+import json
+import os
+import time
+
+from uarttrace import replay
+from fakemodel import FakeFVP, write_config, g_login_script, g_login_commands
+
+g_test_script = g_login_script + [
+    {"expect": "./test-app"},
+    {"text": "Running test\n"},
+    {"sleep": 0.2},
+    {"text": "Test passed\n"},
+]
+
+g_login_test = {
+    'name'          : "login_test",
+    'boot_commands' : g_login_commands,
+    'commands'      : [('w', "./test-app")],
+    'host_stop_str' : "Test passed",
+    'host_ver_strs' : ["Running test", "Test passed"],
+    'host_fail_strs': ["Kernel panic"],
+}
+
+
+def test_pass(tmpdir):
+    config = write_config(tmpdir, g_test_script, rate=100000)
+    fvp = FakeFVP(g_login_test, config, tmpdir)
+    assert fvp.executeTest() == 0
+    assert fvp.test_complete
+    assert "Test passed" in fvp.hostLog()
+    with open(os.path.join(fvp.log_dir, "login_test_timeline.json")) as f:
+        timeline = json.load(f)
+    assert timeline
+
+
+def test_missing_verification_string(tmpdir):
+    config = write_config(tmpdir, g_test_script)
+    fvp = FakeFVP(dict(g_login_test, host_ver_strs=["Test passed", "Not printed"]),
+                  config, tmpdir)
+    assert fvp.executeTest() == 1
+
+
+def test_failure_string_aborts(tmpdir):
+    script = g_login_script + [
+        {"expect": "./test-app"},
+        {"text": "Kernel panic - not syncing\n"},
+        {"sleep": 60},
+        {"text": "Test passed\n"},
+    ]
+    config = write_config(tmpdir, script)
+    fvp = FakeFVP(g_login_test, config, tmpdir, fvp_timeout=30)
+    start = time.time()
+    assert fvp.executeTest() == 1
+    assert time.time() - start < 10
+    assert fvp.failure == ("host_watcher", "Kernel panic")
+
+
+def test_timeout(tmpdir):
+    config = write_config(tmpdir, g_login_script)
+    fvp = FakeFVP(g_login_test, config, tmpdir, fvp_timeout=2)
+    start = time.time()
+    assert fvp.executeTest() == 1
+    assert time.time() - start < 10
+
+
+def test_recorded_trace_replays(tmpdir):
+    config = write_config(tmpdir, g_test_script)
+    fvp = FakeFVP(g_login_test, config, tmpdir, record_traces=True)
+    assert fvp.executeTest() == 0
+    trace = os.path.join(fvp.log_dir, "login_test_host.trace")
+    output = []
+    assert replay(trace, output=output.append)
+    assert not any("differ" in line for line in output)
+
+
+def test_cached_result(tmpdir):
+    config = write_config(tmpdir, g_test_script)
+    cache = str(tmpdir.join("cache"))
+    fvp = FakeFVP(g_login_test, config, tmpdir.join("run"), result_cache=cache)
+    assert fvp.executeTest() == 0
+    assert not fvp.cached
+
+    fvp = FakeFVP(g_login_test, config, tmpdir.join("rerun"), result_cache=cache)
+    assert fvp.executeTest() == 0
+    assert fvp.cached
+    # The logs of the first run are restored, the model is not started
+    assert "Test passed" in fvp.hostLog()
+    assert fvp.fvp_process is None
+
+
+def batch_test(number):
+    return {
+        'name'          : "test{0}".format(number),
+        'commands'      : [('w', "./test-app {0}".format(number))],
+        'host_stop_str' : "Test {0} passed".format(number),
+        'host_ver_strs' : ["Test {0} passed".format(number)],
+    }
+
+
+def test_batch_waits_for_prompt(tmpdir):
+    prompt = "root@fake:~# "
+    script = g_login_script + [
+        {"expect": "./test-app 1"},
+        {"text": "Test 1 passed\n"},
+        {"sleep": 0.5},
+        {"text": prompt},
+        {"expect": "./test-app 2"},
+        # The prompt is received with the stop string, and carried over to
+        # the next segment
+        {"text": "Test 2 passed\n" + prompt},
+        {"expect": "./test-app 3"},
+        {"text": "Test 3 passed\n" + prompt},
+    ]
+    config = write_config(tmpdir, script)
+    batch = {'name': "batch", 'boot_commands': g_login_commands, 'commands': []}
+    fvp = FakeFVP(batch, config, tmpdir, fvp_timeout=10, record_traces=True)
+    results = fvp.executeBatch([batch_test(number) for number in range(1, 4)])
+    assert [(name, exitcode) for name, exitcode, _ in results] == \
+           [("test1", 0), ("test2", 0), ("test3", 0)]
+
+    # The commands of the next test are written (and echoed) once the
+    # previous test returned to the prompt
+    for testname in ["test2", "test3"]:
+        with open(os.path.join(fvp.log_dir, testname + "_host.txt")) as f:
+            log = f.read()
+        assert log.lstrip().startswith(prompt + "./test-app")
+
+    output = []
+    assert replay(os.path.join(fvp.log_dir, "batch_host.trace"), output=output.append)
+    assert not any("differ" in line for line in output)
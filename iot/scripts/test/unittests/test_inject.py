@@ -0,0 +1,160 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import hashlib
+import struct
+import time
+
+import pytest
+
+import inject
+from inject import Injector, parse_window, reader_command, write_payload
+from fvp_wrapper import TelnetWatcher
+from uarttrace import TraceSession
+from fakemodel import FakeFVP, write_config
+
+g_window = (0xff000000, 0x10000)
+
+
+class StubCpu(object):
+    """ Stands for an Iris CPU, keeping the words written to its memory """
+    def __init__(self, name):
+        self.instance_name = name
+        self.writes = []
+
+    def write_memory(self, address, words, memory_space=None, size=None, count=None):
+        assert size == 8 and count == len(words)
+        self.writes.append((address, list(words), memory_space))
+
+    def memory(self, address):
+        """ Bytes written from address on, by consecutive writes """
+        data = b""
+        for start, words, _ in sorted(self.writes):
+            assert start == address + len(data)
+            data += struct.pack("<{0}Q".format(len(words)), *words)
+        return data
+
+
+def test_parse_window():
+    assert parse_window("0xff000000,0x1000000") == (0xff000000, 0x1000000)
+    assert parse_window("4096,8192") == (4096, 8192)
+    # Not page aligned, empty or incomplete windows are rejected
+    assert parse_window("0xff000100,0x1000") is None
+    assert parse_window("0xff000000,0") is None
+    assert parse_window("0xff000000") is None
+    assert parse_window("window,0x1000") is None
+
+
+def test_reader_command():
+    command = reader_command(0xff000000, 5000, "0123abcd", "/tmp/app")
+    assert command == ("dd if=/dev/mem bs=4096 skip={0} count=2 2>/dev/null | "
+                       "head -c 5000 > /tmp/app && echo '0123abcd  /tmp/app' | "
+                       "md5sum -c".format(0xff000000 // 4096))
+    command = reader_command(0xff000000, 4096, "0123abcd", "/tmp/app", executable=True)
+    assert "count=1 " in command
+    assert "> /tmp/app && chmod 755 /tmp/app && echo" in command
+
+
+def test_write_payload(monkeypatch):
+    monkeypatch.setattr(inject, "g_inject_chunk_size", 16)
+    cpu = StubCpu("cpu0")
+    payload = b"0123456789abcdefghijklmnopqrstuvwxyz"
+    write_payload(cpu, 0x1000, payload, "Secure Memory")
+    # Chunks of 16 bytes, the last word padded with zeros
+    assert [(address, len(words)) for address, words, _ in cpu.writes] == \
+           [(0x1000, 2), (0x1010, 2), (0x1020, 1)]
+    assert all(space == "Secure Memory" for _, _, space in cpu.writes)
+    assert cpu.memory(0x1000) == payload + b"\0" * 4
+
+
+def test_inject(tmpdir):
+    source = tmpdir.join("app")
+    source.write_binary(b"\x7fELF" + b"\x01" * 100)
+    cpus = [StubCpu("css.scp.cpu"), StubCpu("css.cluster0.cpu0")]
+    output = []
+    injector = Injector(cpus, g_window, "cluster0", output=output.append)
+    command = injector.inject(str(source), "/usr/bin/app")
+    assert cpus[0].writes == []
+    assert cpus[1].memory(g_window[0]).rstrip(b"\0") == source.read_binary()
+    checksum = hashlib.md5(source.read_binary()).hexdigest()
+    assert command == reader_command(g_window[0], 104, checksum, "/usr/bin/app")
+    assert "Injected {0} to /usr/bin/app: 104 bytes".format(source) in output[0]
+
+
+def test_inject_errors(tmpdir):
+    source = tmpdir.join("app")
+    source.write_binary(b"x" * 100)
+    cpus = [StubCpu("cpu0")]
+    with pytest.raises(Exception) as error:
+        Injector(cpus, None).inject(str(source), "/app")
+    assert "no injection window given" in str(error.value)
+    with pytest.raises(Exception) as error:
+        Injector(cpus, g_window, "cluster1").inject(str(source), "/app")
+    assert "no CPU matches 'cluster1'" in str(error.value)
+    with pytest.raises(Exception) as error:
+        Injector(cpus, (g_window[0], 64)).inject(str(source), "/app")
+    assert "100 bytes do not fit the window of 64 bytes" in str(error.value)
+    with pytest.raises(Exception) as error:
+        Injector(cpus, g_window).inject(str(tmpdir.join("missing")), "/app")
+    assert "Cannot inject" in str(error.value)
+    assert cpus[0].writes == []
+
+
+def watcher(tmpdir, injector, commands):
+    watcher = TelnetWatcher("host", str(tmpdir.join("host.txt")), "Test passed",
+                            "Simulation stopped")
+    for command in commands:
+        watcher.addCommand(*command)
+    watcher.injector = injector
+    watcher.tn = TraceSession()
+    return watcher
+
+
+def test_watcher_injects(tmpdir):
+    source = tmpdir.join("app")
+    source.write_binary(b"x" * 100)
+    host = watcher(tmpdir, Injector([StubCpu("cpu0")], g_window),
+                   [('i', "{0}:/app".format(source)), ('w', "/app")])
+    host.startSession()
+    assert host.commandFailures() == []
+    assert host.tn.written == [(reader_command(g_window[0], 100,
+        hashlib.md5(b"x" * 100).hexdigest(), "/app") + "\n").encode('utf-8')]
+    # The next command waits for the guest to have checked its copy
+    assert host.consume(b"/app: OK\n") == []
+    assert host.tn.written[-1] == b"/app\n"
+
+
+def test_watcher_injection_failures(tmpdir):
+    # Without an injector, the command fails instead of waiting for the guest
+    host = watcher(tmpdir, None, [('i', "app:/app"), ('w', "/app")])
+    host.startSession()
+    assert host.commandFailures() == [('fail', "Cannot inject app: no model to inject into")]
+    assert host.tn.written == []
+    assert host.commandFailures() == []
+
+    host = watcher(tmpdir, Injector([StubCpu("cpu0")], g_window),
+                   [('i', "{0}:/app".format(tmpdir.join("missing")))])
+    host.startSession()
+    events = host.consume(b"")
+    assert len(events) == 1 and events[0][0] == 'fail'
+
+
+def test_injection_failure_reported_at_once(tmpdir):
+    # A model which prints nothing: the failure of the first command must
+    # not wait for output (nor the timeout)
+    config = write_config(tmpdir, [{"sleep": 60}])
+    testspec = {
+        'name'          : "inject_test",
+        'commands'      : [('i', "{0}:/app".format(tmpdir.join("missing")))],
+        'host_stop_str' : "Test passed",
+    }
+    fvp = FakeFVP(testspec, config, tmpdir, fvp_timeout=30,
+                  inject_window=g_window)
+    start = time.time()
+    assert fvp.executeTest() == 1
+    assert time.time() - start < 10
+    assert fvp.failure[0] == "host_watcher"
+    assert "Cannot inject" in fvp.failure[1]
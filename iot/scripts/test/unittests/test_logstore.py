@@ -0,0 +1,130 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import os
+import subprocess
+import sys
+
+import logstore
+from logstore import LogStore, LogStoreWriter, pack, archive, find_strings, \
+                     g_index_entry, g_chunk_header, g_footer
+
+g_logstore = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "logstore.py")
+
+# Small chunks, so that a short log spans many chunks
+g_chunk_size = 64
+
+# Lines of various lengths, one of them longer than the maximum chunk size
+# (cut without a line boundary), and a last line without newline
+g_lines = [("line {0} ".format(i) + "x" * (i % 13)).encode('utf-8') for i in range(200)]
+g_lines[100] = b"y" * (5 * g_chunk_size)
+g_log = b"\n".join(g_lines)
+
+
+def packed(tmpdir, data=g_log):
+    log = tmpdir.join("uart.txt")
+    log.write_binary(data)
+    return pack(str(log), str(log) + ".lzs", g_chunk_size)
+
+
+def test_round_trip(tmpdir):
+    with LogStore(packed(tmpdir)) as store:
+        assert len(store.chunks) > 10
+        assert b"".join(store.blocks()) == g_log
+        assert store.lineCount() == len(g_lines)
+        assert store.size() == len(g_log)
+        for first, last in [(0, 0), (0, 9), (95, 105), (150, 199), (199, 250)]:
+            assert list(store.lines(first, last)) == \
+                   list(enumerate(g_lines))[first:last + 1]
+        assert store.tail(3) == list(enumerate(g_lines))[-3:]
+        assert store.tail(1000) == list(enumerate(g_lines))
+        assert list(store.grep(b"^y+$")) == [(100, g_lines[100])]
+        assert [line_no for line_no, _ in store.grep(b"line 1[0-9]5 ", 100, 130)] == [105, 115, 125]
+
+
+def test_empty_log(tmpdir):
+    with LogStore(packed(tmpdir, b"")) as store:
+        assert store.chunks == []
+        assert store.lineCount() == 0
+        assert store.tail(10) == []
+
+
+def test_command_line(tmpdir):
+    store = packed(tmpdir)
+    def run(*args):
+        return subprocess.check_output([sys.executable, g_logstore] + list(args))
+    assert run("cat", store) == g_log
+    # Line numbers are 1-based on the command line
+    assert run("lines", store, "2", "3") == b"2:" + g_lines[1] + b"\n3:" + g_lines[2] + b"\n"
+    assert run("tail", store, "-n", "1") == "{0}:".format(len(g_lines)).encode('utf-8') + \
+                                           g_lines[-1] + b"\n"
+
+
+def test_index_rebuilt_from_chunk_headers(tmpdir):
+    path = packed(tmpdir)
+    with LogStore(path) as store:
+        chunks = [chunk.header() for chunk in store.chunks]
+    with open(path, "rb") as f:
+        data = f.read()
+    index = g_footer.unpack_from(data, len(data) - g_footer.size)[0]
+
+    # A writer killed before writing the index, or while writing it
+    entry_size = g_index_entry.size + g_chunk_header.size
+    for size in [index, index + entry_size + 3, len(data) - 1]:
+        with open(path, "wb") as f:
+            f.write(data[:size])
+        with LogStore(path) as store:
+            assert [chunk.header() for chunk in store.chunks] == chunks
+            assert b"".join(store.blocks()) == g_log
+
+    # A writer killed within a chunk: the complete chunks are kept
+    with open(path, "wb") as f:
+        f.write(data[:index - 5])
+    with LogStore(path) as store:
+        assert [chunk.header() for chunk in store.chunks] == chunks[:-1]
+        assert g_log.startswith(b"".join(store.blocks()))
+
+
+def test_time_range(tmpdir):
+    path = str(tmpdir.join("timed.lzs"))
+    writer = LogStoreWriter(path, g_chunk_size)
+    for second in range(10):
+        writer.write("second {0}\n".format(second).encode('utf-8') * 10, float(second))
+    writer.close()
+    with LogStore(path) as store:
+        found = set(line for _, line in store.grep(b"second", since=4.0, until=5.0))
+        # Whole chunks are returned, at least those of the range
+        assert set([b"second 4", b"second 5"]) <= found
+        assert b"second 0" not in found and b"second 9" not in found
+
+
+def test_find_strings_across_chunks(tmpdir):
+    # The string is cut by the chunk boundary following the long line
+    strings = [g_lines[100][:10] + b"\nline 101", b"line 199 ", b"not in log"]
+    path = packed(tmpdir)
+    with LogStore(path) as store:
+        assert not any(strings[0] in block for block in store.blocks())
+    assert find_strings(path, strings) == set(strings[:2])
+
+
+def test_find_strings_across_blocks(tmpdir, monkeypatch):
+    monkeypatch.setattr(logstore, "g_read_block_size", 16)
+    log = tmpdir.join("uart.txt")
+    log.write_binary(g_log)
+    strings = [u"line 3 xxx\nline 4", u"line 199"]
+    assert find_strings(str(log), strings) == set(strings)
+
+
+def test_archive(tmpdir):
+    log = tmpdir.join("uart.txt")
+    log.write_binary(g_log)
+    store = archive(str(log), g_chunk_size)
+    assert store == str(log) + ".lzs"
+    assert not log.check()
+    with LogStore(store) as archived:
+        assert b"".join(archived.blocks()) == g_log
+    assert find_strings(store, [b"line 150"]) == set([b"line 150"])
@@ -0,0 +1,142 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import logwait
+from logwait import LogFollower, wait_log, EXIT_FOUND, EXIT_FAIL_FOUND, \
+                    EXIT_TIMEOUT, EXIT_PROCESS_EXITED
+
+g_logwait = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "logwait.py")
+
+
+def write_later(delay, function, *args):
+    thread = threading.Thread(target=lambda: (time.sleep(delay), function(*args)))
+    thread.start()
+    return thread
+
+
+def test_follower_appended_data(tmpdir):
+    log = tmpdir.join("uart.log")
+    follower = LogFollower(str(log))
+    try:
+        # The log does not exist yet
+        assert follower.read() == (False, b"")
+        log.write_binary(b"first\n")
+        assert follower.read() == (False, b"first\n")
+        assert follower.read() == (False, b"")
+        with open(str(log), "ab") as f:
+            f.write(b"second\n")
+        assert follower.read() == (False, b"second\n")
+    finally:
+        follower.close()
+
+
+def test_follower_truncated(tmpdir):
+    log = tmpdir.join("uart.log")
+    log.write_binary(b"output of the previous run\n")
+    follower = LogFollower(str(log))
+    try:
+        follower.read()
+        log.write_binary(b"new\n")
+        assert follower.read() == (True, b"new\n")
+        assert follower.read() == (False, b"")
+    finally:
+        follower.close()
+
+
+def test_follower_replaced(tmpdir):
+    log = tmpdir.join("uart.log")
+    log.write_binary(b"old log\n")
+    follower = LogFollower(str(log))
+    try:
+        follower.read()
+        # A longer log moved in place of the followed one
+        replacement = tmpdir.join("replacement")
+        replacement.write_binary(b"replacement of the old log\n")
+        os.rename(str(replacement), str(log))
+        assert follower.read() == (True, b"replacement of the old log\n")
+    finally:
+        follower.close()
+
+
+def test_wait_for_string(tmpdir):
+    log = tmpdir.join("uart.log")
+    thread = write_later(0.2, log.write_binary, b"booting\nlogin: ")
+    try:
+        assert wait_log(str(log), ["login: "], timeout=10) == (EXIT_FOUND, "login: ")
+    finally:
+        thread.join()
+
+
+def test_strings_matched_literally(tmpdir):
+    log = tmpdir.join("uart.log")
+    log.write_binary(b"/ # ls\nTest 1.0 [done]\n")
+    assert wait_log(str(log), ["Test 1.0 [done]"], timeout=1)[0] == EXIT_FOUND
+    assert wait_log(str(log), ["Test 1.. [done]"], timeout=0.5)[0] == EXIT_TIMEOUT
+
+
+def test_failure_string(tmpdir):
+    log = tmpdir.join("uart.log")
+    log.write_binary(b"Kernel panic - not syncing\n")
+    assert wait_log(str(log), ["login: "], ["Kernel panic"], timeout=10) == \
+           (EXIT_FAIL_FOUND, "Kernel panic")
+
+
+def test_truncated_log_searched_again(tmpdir):
+    log = tmpdir.join("uart.log")
+    log.write_binary(b"output of the previous run: Done\n")
+    # The output before the offset does not count
+    assert wait_log(str(log), ["Done"], timeout=0.5, offset=log.size())[0] == EXIT_TIMEOUT
+    # The next run of the model truncates the log
+    thread = write_later(0.2, log.write_binary, b"Done\n")
+    try:
+        assert wait_log(str(log), ["Done"], timeout=10, offset=log.size()) == \
+               (EXIT_FOUND, "Done")
+    finally:
+        thread.join()
+
+
+def test_process_exited(tmpdir, monkeypatch):
+    monkeypatch.setattr(logwait, "g_pid_check_interval", 0.1)
+    log = tmpdir.join("uart.log")
+    model = subprocess.Popen(["sh", "-c", "sleep 0.3; echo 'Simulation stopped' > {0}".format(log)])
+    start = time.time()
+    try:
+        assert wait_log(str(log), ["login: "], timeout=30, pid=model.pid) == \
+               (EXIT_PROCESS_EXITED, None)
+        assert time.time() - start < 5
+    finally:
+        model.wait()
+
+
+def test_output_written_before_exit_is_read(tmpdir, monkeypatch):
+    monkeypatch.setattr(logwait, "g_pid_check_interval", 0.1)
+    log = tmpdir.join("uart.log")
+    model = subprocess.Popen(["sh", "-c", "sleep 0.3; echo 'login: ' > {0}".format(log)])
+    try:
+        assert wait_log(str(log), ["login: "], timeout=30, pid=model.pid) == \
+               (EXIT_FOUND, "login: ")
+    finally:
+        model.wait()
+
+
+def test_command_line_exit_codes(tmpdir):
+    log = tmpdir.join("uart.log")
+    log.write_binary(b"Shell> ")
+    def run(*args):
+        return subprocess.call([sys.executable, g_logwait, "-q", str(log)] + list(args))
+    assert run("Shell> ", "--timeout", "5") == EXIT_FOUND
+    assert run("login: ", "--fail", "Shell>", "--timeout", "5") == EXIT_FAIL_FOUND
+    assert run("login: ", "--timeout", "0.2") == EXIT_TIMEOUT
+    exited = subprocess.Popen(["true"])
+    exited.wait()
+    assert run("login: ", "--pid", str(exited.pid), "--timeout", "30") == EXIT_PROCESS_EXITED
@@ -0,0 +1,76 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import random
+
+from matcher import StreamMatcher
+
+
+def naive_matches(patterns, text):
+    """ (pattern, offset) of every occurrence, in the order of StreamMatcher:
+        by end offset, then longest pattern first """
+    matches = []
+    for end in range(1, len(text) + 1):
+        found = [pattern for pattern in patterns if text[:end].endswith(pattern)]
+        found.sort(key=lambda pattern: -len(pattern))
+        matches += [(pattern, end) for pattern in found]
+    return matches
+
+
+def feed_chunks(matcher, text, size):
+    matches = []
+    for i in range(0, len(text), size):
+        matches += matcher.feed(text[i:i + size])
+    return matches
+
+
+def test_single_pattern():
+    matcher = StreamMatcher(["login:"])
+    assert matcher.feed("buildroot login: ") == [("login:", 16)]
+    assert matcher.feed("login") == []
+    assert matcher.feed(":") == [("login:", 23)]
+
+
+def test_pattern_split_at_every_position():
+    text = "Booting...\nRunning RTX RTOS\n"
+    for split in range(len(text) + 1):
+        matcher = StreamMatcher(["Running RTX RTOS"])
+        matches = matcher.feed(text[:split]) + matcher.feed(text[split:])
+        assert matches == [("Running RTX RTOS", 27)]
+
+
+def test_suffix_and_overlapping_patterns():
+    patterns = ["he", "she", "his", "hers"]
+    matcher = StreamMatcher(patterns)
+    text = "ushershishe"
+    assert sorted(matcher.feed(text)) == sorted(naive_matches(patterns, text))
+
+
+def test_duplicates_and_empty_patterns():
+    matcher = StreamMatcher(["ok", "", "ok", None, "fail"])
+    assert matcher.patterns == ["ok", "fail"]
+    assert matcher.feed("ok fail ok") == [("ok", 2), ("fail", 7), ("ok", 10)]
+
+
+def test_random_streams():
+    rnd = random.Random(0)
+    alphabet = "ab\n"
+    for _ in range(50):
+        patterns = ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 4)))
+                    for _ in range(rnd.randint(1, 5))]
+        text = "".join(rnd.choice(alphabet) for _ in range(200))
+        expected = naive_matches(list(StreamMatcher(patterns).patterns), text)
+        for size in (1, 3, 7, 200):
+            matcher = StreamMatcher(patterns)
+            assert sorted(feed_chunks(matcher, text, size)) == sorted(expected)
+
+
+def test_reset():
+    matcher = StreamMatcher(["abc"])
+    matcher.feed("ab")
+    matcher.reset()
+    assert matcher.feed("c") == []
+    assert matcher.feed("abc") == [("abc", 4)]
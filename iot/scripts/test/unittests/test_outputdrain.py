@@ -0,0 +1,84 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import os
+import time
+
+import outputdrain
+from outputdrain import OutputDrain
+
+
+class PipedProcess(object):
+    """ Stands for a Popen object whose stdout is written by the test """
+    def __init__(self):
+        read_fd, self.write_fd = os.pipe()
+        self.stdout = os.fdopen(read_fd, "rb")
+        self.stderr = None
+
+    def write(self, data):
+        os.write(self.write_fd, data)
+        # Let the drain thread read each write separately
+        time.sleep(0.1)
+
+    def exit(self):
+        os.close(self.write_fd)
+
+
+def test_port_line_split_across_reads(tmpdir):
+    process = PipedProcess()
+    drain = OutputDrain(process, str(tmpdir.join("fvp.txt")))
+    process.write(b"Model loading\nIris server started listening to port 74")
+    assert drain.wait_iris_port(0.2) is None
+    process.write(b"00\n")
+    assert drain.wait_iris_port(5) == 7400
+    process.exit()
+    drain.close(5)
+    assert tmpdir.join("fvp.txt").read() == \
+        "Model loading\nIris server started listening to port 7400\n"
+
+
+def test_port_line_without_newline_at_exit(tmpdir):
+    process = PipedProcess()
+    drain = OutputDrain(process, str(tmpdir.join("fvp.txt")))
+    process.write(b"Iris server started listening to port 7101")
+    assert drain.wait_iris_port(0.2) is None
+    process.exit()
+    assert drain.wait_iris_port(5) == 7101
+    drain.close(5)
+
+
+def test_no_port(tmpdir):
+    process = PipedProcess()
+    drain = OutputDrain(process, str(tmpdir.join("fvp.txt")))
+    process.write(b"Error: license not found\n")
+    process.exit()
+    assert drain.wait_iris_port(5) is None
+    drain.close(5)
+    assert drain.tail(1) == ["Error: license not found"]
+
+
+def test_long_output_without_newline(tmpdir, monkeypatch):
+    monkeypatch.setattr(outputdrain, "g_drain_read_size", 64)
+    process = PipedProcess()
+    drain = OutputDrain(process, str(tmpdir.join("fvp.txt")))
+    # Only the end of the partial line is kept, the port line is still found
+    process.write(b"x" * 1000)
+    process.write(b"Iris server started listening to port 7200\n")
+    assert drain.wait_iris_port(5) == 7200
+    process.exit()
+    drain.close(5)
+
+
+def test_tail_reads_back_from_end(tmpdir, monkeypatch):
+    monkeypatch.setattr(outputdrain, "g_drain_read_size", 16)
+    process = PipedProcess()
+    drain = OutputDrain(process, str(tmpdir.join("fvp.txt")))
+    lines = ["line {0} ".format(i) + "y" * (i % 7) for i in range(50)]
+    process.write("\n".join(lines).encode('utf-8'))
+    process.exit()
+    drain.close(5)
+    for count in [1, 3, 10, 50, 100]:
+        assert drain.tail(count) == lines[-count:]
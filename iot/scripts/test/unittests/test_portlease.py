@@ -0,0 +1,56 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import socket
+
+import pytest
+
+from portlease import PortLease
+
+g_first_port = 42000
+
+
+def test_leases_do_not_overlap(tmpdir):
+    lock_dir = str(tmpdir)
+    first = PortLease(3, g_first_port, lock_dir=lock_dir)
+    second = PortLease(3, g_first_port, lock_dir=lock_dir)
+    try:
+        assert len(first.ports) == 3
+        assert first.ports == list(range(first.ports[0], first.ports[0] + 3))
+        assert not set(first.ports) & set(second.ports)
+    finally:
+        first.release()
+        second.release()
+
+
+def test_release(tmpdir):
+    lock_dir = str(tmpdir)
+    with PortLease(2, g_first_port, lock_dir=lock_dir) as lease:
+        ports = lease.ports
+    assert lease.ports == []
+    with PortLease(2, g_first_port, lock_dir=lock_dir) as lease:
+        assert lease.ports == ports
+
+
+def test_skips_ports_in_use(tmpdir):
+    lock_dir = str(tmpdir)
+    with PortLease(1, g_first_port, lock_dir=lock_dir) as probe:
+        busy = probe.ports[0]
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('', busy))
+    try:
+        with PortLease(2, busy, lock_dir=lock_dir) as lease:
+            assert busy not in lease.ports
+            assert lease.ports[0] > busy
+    finally:
+        sock.close()
+
+
+def test_no_free_range(tmpdir):
+    lock_dir = str(tmpdir)
+    with PortLease(2, g_first_port, lock_dir=lock_dir) as lease:
+        with pytest.raises(Exception):
+            PortLease(2, lease.ports[0], last_port=lease.ports[1], lock_dir=lock_dir)
@@ -0,0 +1,106 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import hashlib
+import os
+import time
+
+import resultcache
+from resultcache import FileHashes, ResultCache, result_key, hash_file_mmap
+
+
+def key(tmpdir, hashes, testspec={'name': "test"}, **params):
+    return result_key("FakeFVP", str(tmpdir.join("fvp")), params, {}, testspec, hashes)
+
+
+def test_hash_file_mmap(tmpdir):
+    data = tmpdir.join("data")
+    data.write("contents")
+    assert hash_file_mmap(str(data)) == hashlib.sha1(b"contents").hexdigest()
+    data.write("")
+    assert hash_file_mmap(str(data)) == hashlib.sha1(b"").hexdigest()
+
+
+def test_hashes_reused_until_changed(tmpdir, monkeypatch):
+    image = tmpdir.join("image")
+    image.write("v1")
+    hashes = FileHashes(str(tmpdir.join("hashes.json")))
+    sha1 = hashes.get(str(image))
+    hashes.save()
+
+    hashed = []
+    def hash_file(path):
+        hashed.append(path)
+        return hash_file_mmap(path)
+    monkeypatch.setattr(resultcache, "hash_file_mmap", hash_file)
+    hashes = FileHashes(str(tmpdir.join("hashes.json")))
+    assert hashes.get(str(image)) == sha1
+    assert hashed == []
+
+    image.write("v2")
+    os.utime(str(image), (0, 0))
+    assert hashes.get(str(image)) != sha1
+    assert hashed == [str(image)]
+
+
+def test_result_key(tmpdir):
+    tmpdir.join("fvp").write("model")
+    image = tmpdir.join("image")
+    image.write("v1")
+    hashes = FileHashes(str(tmpdir.join("hashes.json")))
+    first = key(tmpdir, hashes, image=str(image), address="0x1000")
+    # Files are identified by their contents, not their path
+    copy = tmpdir.join("copy")
+    copy.write("v1")
+    assert key(tmpdir, hashes, image=str(copy), address="0x1000") == first
+    assert key(tmpdir, hashes, image=str(image), address="0x2000") != first
+    assert key(tmpdir, hashes, {'name': "other"}, image=str(image), address="0x1000") != first
+    image.write("v2")
+    os.utime(str(image), (0, 0))
+    assert key(tmpdir, hashes, image=str(image), address="0x1000") != first
+
+
+def test_data_argument(tmpdir):
+    image = tmpdir.join("image")
+    image.write("v1")
+    hashes = FileHashes(str(tmpdir.join("hashes.json")))
+    value = resultcache.input_value("{0}@0x80000000".format(image), hashes)
+    assert value == "sha1:{0}@0x80000000".format(hashlib.sha1(b"v1").hexdigest())
+    assert resultcache.input_value("not a file@0x0", hashes) == "not a file@0x0"
+
+
+def test_store_and_restore(tmpdir):
+    cache = ResultCache(str(tmpdir.join("cache")))
+    log = tmpdir.join("test_host.txt")
+    log.write("Test passed")
+    assert cache.lookup("key") is None
+    cache.store("key", [str(log)], {'testname': "test", 'exitcode': 0})
+
+    restored = tmpdir.mkdir("restored")
+    meta = cache.restore("key", str(restored))
+    assert meta['testname'] == "test"
+    assert meta['logs'] == ["test_host.txt"]
+    assert restored.join("test_host.txt").read() == "Test passed"
+    assert cache.restore("other", str(restored)) is None
+
+
+def test_evict(tmpdir):
+    cache = ResultCache(str(tmpdir.join("cache")), max_age=100)
+    log = tmpdir.join("log")
+    log.write("x" * 100)
+    now = time.time()
+    for name, age in [("old", 1000), ("lru", 50), ("recent", 10), ("latest", 0)]:
+        cache.store(name, [str(log)], {})
+        meta = os.path.join(cache.path(name), "meta.json")
+        os.utime(meta, (now - age, now - age))
+    # "old" expired, then "lru" is evicted for the cache to fit in the size
+    # of two entries
+    cache.max_size = 2 * max(size for _, size, _ in cache.entries())
+    assert cache.evict() == 2
+    assert cache.lookup("old") is None
+    assert cache.lookup("lru") is None
+    assert cache.lookup("recent") is not None
+    assert cache.lookup("latest") is not None
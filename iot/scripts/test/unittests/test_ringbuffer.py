@@ -0,0 +1,53 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import random
+
+from ringbuffer import RingBuffer
+
+
+def test_partial_fill():
+    buf = RingBuffer(16)
+    buf.write(b"hello")
+    assert len(buf) == 5
+    assert buf.start() == 0
+    assert bytes(buf.tail(3)) == b"llo"
+    assert bytes(buf.tail(100)) == b"hello"
+
+
+def test_wraps_around():
+    rnd = random.Random(0)
+    buf = RingBuffer(64)
+    stream = b""
+    for _ in range(200):
+        data = bytes(bytearray(rnd.randint(0, 255) for _ in range(rnd.randint(0, 100))))
+        buf.write(data)
+        stream += data
+        assert buf.end == len(stream)
+        assert len(buf) == min(len(stream), 64)
+        assert buf.start() == len(stream) - len(buf)
+        assert bytes(buf.tail(len(buf))) == stream[-64:]
+        assert bytes(buf.tail(10)) == stream[-10:]
+
+
+def test_write_larger_than_capacity():
+    buf = RingBuffer(8)
+    buf.write(b"abc")
+    buf.write(b"0123456789")
+    assert buf.end == 13
+    assert bytes(buf.tail(8)) == b"23456789"
+
+
+def test_lines():
+    buf = RingBuffer(32)
+    assert buf.lines(3) == []
+    buf.write(b"first line\nsecond\nthird\n")
+    assert buf.lines(2) == [b"second", b"third"]
+    buf.write(b"prompt# ")
+    assert buf.lines(2) == [b"third", b"prompt# "]
+    # The oldest line held is truncated
+    buf.write(b"x" * 20)
+    assert buf.lines(10) == [b"ird", b"prompt# " + b"x" * 20]
@@ -0,0 +1,89 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import testhistory
+from testhistory import order_tests, shard_tests, parse_shard
+import testrunner
+from fakemodel import FakeFVP
+
+g_stats = {
+    "boot": (7.0, 0.0),
+    "mhu": (6.0, 0.5),
+    "timer": (5.0, 0.0),
+    "uart": (4.0, 0.1),
+    "dma": (3.0, 0.0),
+    "gpio": (2.0, 0.0),
+    "rtc": (1.0, 0.0),
+}
+
+
+def test_statistics(tmpdir, monkeypatch):
+    monkeypatch.setattr(testhistory, "g_history_window", 3)
+    history = testhistory.TestHistory(str(tmpdir.join("history.db")))
+    for started, duration in enumerate([100.0, 10.0, 20.0, 30.0]):
+        history.record("fvp", "slow", started, duration, 1 if started == 3 else 0)
+    history.record("fvp", "fast", 0, 4.0, 0)
+    history.record("other", "slow", 0, 1000.0, 0)
+    stats = history.statistics("fvp", ["slow", "fast", "new"])
+    history.close()
+    # Only the 3 most recent runs of the platform count
+    assert stats["slow"] == (20.0, 1 / 3.0)
+    assert stats["fast"] == (4.0, 0.0)
+    # Tests without history are estimated at the mean of the others
+    assert stats["new"] == (12.0, 0.0)
+
+
+def test_order():
+    tests = sorted(g_stats)
+    assert order_tests(tests, g_stats, "name") == tests
+    assert order_tests(tests, g_stats, "slowest")[:3] == ["boot", "mhu", "timer"]
+    assert order_tests(tests, g_stats, "failing")[:3] == ["mhu", "uart", "boot"]
+
+
+def test_lpt_shards():
+    shards = shard_tests(sorted(g_stats), g_stats, 2)
+    assert [load for load, _ in shards] == [14.0, 14.0]
+    assert shards[0][1] == ["boot", "uart", "dma"]
+    assert shards[1][1] == ["mhu", "timer", "gpio", "rtc"]
+
+
+def test_shards_cover_all_tests():
+    tests = sorted(g_stats)
+    for count in range(1, 9):
+        shards = shard_tests(tests, g_stats, count)
+        assert len(shards) == count
+        assigned = [test for _, shard in shards for test in shard]
+        assert sorted(assigned) == tests
+        # The assignment only depends on the tests and their statistics
+        assert shard_tests(list(reversed(tests)), g_stats, count) == shards
+
+
+def test_lpt_bound():
+    # LPT is within 4/3 of the optimal makespan, itself at least the mean load
+    stats = dict(("test{0}".format(i), (float(i % 7 + 1), 0.0)) for i in range(40))
+    for count in (2, 3, 5):
+        loads = [load for load, _ in shard_tests(sorted(stats), stats, count)]
+        assert max(loads) <= 4 / 3.0 * sum(loads) / count + 7
+
+
+def test_parse_shard():
+    assert parse_shard("1/4") == (1, 4)
+    assert parse_shard("4/4") == (4, 4)
+    for value in ("0/4", "5/4", "1/0", "1", "a/b", "1/2/3"):
+        assert parse_shard(value) is None
+
+
+def test_cached_runs_not_recorded(tmpdir):
+    class Runner(testrunner.TestRunner):
+        def __init__(self):
+            self.FVPType = FakeFVP
+    history = testhistory.TestHistory(str(tmpdir.join("history.db")))
+    runner = Runner()
+    runner.recordRun(history, "cached", 0, 0, cached=True)
+    runner.recordRun(history, "executed", 0, 0)
+    assert history.recentRuns("FakeFVP", "cached") == []
+    assert len(history.recentRuns("FakeFVP", "executed")) == 1
+    history.close()
@@ -0,0 +1,86 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import json
+
+from uarttrace import TraceWriter, read_trace, replay, \
+                      TRACE_CONFIG, TRACE_RECEIVED, TRACE_WRITTEN
+
+g_config = {
+    'name': "host",
+    'stop_str': "Test passed",
+    'sys_stop_str': "/OSCI/SystemC: Simulation stopped by user",
+    'verification_strs': ["Test passed"],
+    'platform_fail_strs': ["Kernel panic"],
+    'fail_strs': ["Kernel panic"],
+    'commands': [["r", "login: "], ["w", "root"], ["r", "# "], ["w", "./test-app"]],
+    'boot_commands': 0,
+}
+
+
+def write_trace(path, records, config=g_config):
+    """ Write a trace of the records, given as received data or as
+        ('w', written data) """
+    trace = TraceWriter(path)
+    trace.config(config)
+    for record in records:
+        if isinstance(record, tuple):
+            trace.record(TRACE_WRITTEN, record[1])
+        else:
+            trace.record(TRACE_RECEIVED, record)
+    trace.close()
+
+
+g_session = [b"boot\r\nlog", b"in: ", ('w', b"root\n"), b"root\r\n# ",
+             ('w', b"./test-app\n"), b"Test pa", b"ssed\r\n"]
+
+
+def test_records(tmpdir):
+    path = str(tmpdir.join("host.trace"))
+    write_trace(path, g_session)
+    records = list(read_trace(path))
+    assert [rectype for rectype, _, _ in records] == \
+        [TRACE_CONFIG, TRACE_RECEIVED, TRACE_RECEIVED, TRACE_WRITTEN, TRACE_RECEIVED,
+         TRACE_WRITTEN, TRACE_RECEIVED, TRACE_RECEIVED]
+    assert json.loads(records[0][2].decode('utf-8')) == g_config
+    assert records[1][2] == b"boot\r\nlog"
+    times = [timestamp for _, timestamp, _ in records]
+    assert times == sorted(times)
+
+
+def test_truncated_record(tmpdir):
+    path = str(tmpdir.join("host.trace"))
+    write_trace(path, g_session)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-3])
+    assert len(list(read_trace(path))) == len(g_session)
+
+
+def test_replay_pass(tmpdir):
+    path = str(tmpdir.join("host.trace"))
+    write_trace(path, g_session)
+    output = []
+    assert replay(path, output=output.append)
+    assert not any("differ" in line for line in output)
+
+
+def test_replay_override(tmpdir):
+    path = str(tmpdir.join("host.trace"))
+    write_trace(path, g_session)
+    assert not replay(path, override={'verification_strs': ["Not printed"]},
+                      output=lambda line: None)
+    assert not replay(path, override={'fail_strs': ["boot"]}, output=lambda line: None)
+
+
+def test_replay_reports_different_commands(tmpdir):
+    path = str(tmpdir.join("host.trace"))
+    write_trace(path, [(record[0], b"admin\n") if record == ('w', b"root\n") else record
+                       for record in g_session])
+    output = []
+    replay(path, output=output.append)
+    assert "Commands written differ from the recording:" in output
@@ -0,0 +1,58 @@
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+import os
+import sys
+
+from workerpool import WorkerPool
+
+
+def task(path, exitcode=0):
+    # The worker imported its modules before receiving the task
+    with open(path, "w") as f:
+        f.write("{0} {1}".format(os.getpid(), "json" in sys.modules))
+    sys.exit(exitcode)
+
+
+def test_tasks_run_in_workers(tmpdir):
+    pool = WorkerPool(task, 2, modules=["json"])
+    try:
+        processes = [pool.submit((str(tmpdir.join("task{0}".format(i))),),
+                                 {'exitcode': i}) for i in range(4)]
+        for process in processes:
+            process.join()
+    finally:
+        pool.close()
+    assert [process.exitcode for process in processes] == [0, 1, 2, 3]
+    pids = set()
+    for i in range(4):
+        pid, imported = tmpdir.join("task{0}".format(i)).read().split()
+        assert imported == "True"
+        pids.add(pid)
+    # One worker per task
+    assert len(pids) == 4
+    assert str(os.getpid()) not in pids
+
+
+def test_close_discards_idle_workers():
+    pool = WorkerPool(task, 3, modules=[])
+    workers = list(pool.idle)
+    pool.close()
+    assert not pool.idle
+    for worker in workers:
+        assert not worker.process.is_alive()
+        assert worker.process.exitcode == 0
+
+
+def test_submit_without_refill(tmpdir):
+    pool = WorkerPool(task, 1, modules=[])
+    try:
+        process = pool.submit((str(tmpdir.join("task")),), refill=False)
+        assert not pool.idle
+        process.join()
+        assert process.exitcode == 0
+    finally:
+        pool.close()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" watchdog.py:
+Hang detection of a running model.
+The model is considered hung when none of its terminals produced output and
+none of its CPUs made progress (instruction counter and PC unchanged) for a
+given window. Output alone is not enough (a test may wait silently for an
+event), nor are the CPU counters alone (CPUs waiting for an interrupt do not
+execute instructions while a test runs on another subsystem).
+"""
+
+from collections import deque
+
+# Number of CPU samples kept for the hang report
+g_watchdog_history = 8
+
+
+def cpu_name(cpu, index):
+    return getattr(cpu, 'instance_name', None) or "cpu{0}".format(index)
+
+
+def sample_cpu(cpu):
+    """ Returns the (instruction count, PC) of a CPU of the model. A value
+        which cannot be read through Iris is None """
+    try:
+        count = cpu.get_instruction_count()
+    except Exception:
+        count = None
+    try:
+        pc = cpu.read_register("PC")
+    except Exception:
+        pc = None
+    return count, pc
+
+
+class HangWatchdog(object):
+    def __init__(self, cpus, window):
+        self.cpus = cpus
+        self.names = [cpu_name(cpu, i) for i, cpu in enumerate(cpus)]
+        self.window = window
+        self.samples = deque(maxlen=g_watchdog_history)    # (time, [(count, pc)])
+        self.last_progress = None
+        self.observable = None
+
+    def sample(self, now):
+        """ Sample the CPUs, returns True if any of them made progress since
+            the previous sample """
+        samples = [sample_cpu(cpu) for cpu in self.cpus]
+        progress = not self.samples or samples != self.samples[-1][1]
+        self.samples.append((now, samples))
+        if self.observable is None:
+            # Without any readable counter, CPU progress cannot be observed
+            self.observable = any(count is not None or pc is not None
+                                  for count, pc in samples)
+        if progress:
+            self.last_progress = now
+        return progress
+
+    def hung(self, now, last_output):
+        """ Sample the CPUs, and return True if neither the CPUs nor the
+            terminals (last output at last_output) progressed for the window """
+        self.sample(now)
+        if not self.observable:
+            return False
+        return (now - last_output >= self.window and
+                now - self.last_progress >= self.window)
+
+    def report(self):
+        """ Returns the last samples of each CPU, as lines """
+        lines = []
+        for i, name in enumerate(self.names):
+            pcs = ", ".join("-" if samples[i][1] is None else "0x{0:x}".format(samples[i][1])
+                            for _, samples in self.samples)
+            count = self.samples[-1][1][i][0] if self.samples else None
+            lines.append("{0}: instructions {1}, last PCs {2}".format(
+                name, "-" if count is None else count, pcs))
+        return lines
@@ -0,0 +1,161 @@
+#!/usr/bin/env python2.7
+
+from __future__ import print_function
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" watcher_bench.py:
+Throughput and host CPU benchmark of the TelnetWatcher receive path.
+A local TCP server plays the role of an FVP telnet terminal and sends output
+to a watcher, which is run by the watcher thread of an FVPWrapper as during a
+test. For each kind of burst, the received throughput, the host CPU time used
+by the process and its peak resident memory are printed. The idle case sends
+nothing for a while, measuring the CPU used by a watcher waiting for a quiet
+terminal (ie. a model booting).
+The benchmarked fvp_wrapper.py may be taken from another directory, ie. an
+earlier revision extracted with:
+git archive <revision> iot/scripts/test | tar -x -C <directory>
+
+Usage:
+python watcher_bench.py [--size MB] [--idle SECONDS] [--timeout SECONDS]
+                        [--wrapper DIRECTORY]
+"""
+
+import argparse
+import os
+import random
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+g_end_marker = "BENCH DONE"
+
+
+def burst_lines(size):
+    line = b"[   12.345678] kernel: a regular line of boot log output\n"
+    return line * (size // len(line))
+
+
+def burst_no_newline(size):
+    # ie. a progress bar redrawn with carriage returns only
+    return b"\r[#####     ] 50%" * (size // 16)
+
+
+def burst_binary(size):
+    # Telnet IAC (0xff) and newline bytes are left out
+    rnd = random.Random(0)
+    alphabet = bytearray(b for b in range(256) if b not in (0xff, 0x0a))
+    return bytes(bytearray(rnd.choice(alphabet) for _ in range(64 * 1024))) * (size // (64 * 1024))
+
+
+g_bursts = [
+    ("lines", burst_lines),
+    ("no newline", burst_no_newline),
+    ("binary noise", burst_binary),
+]
+
+
+def serve(server, payload, delay):
+    conn, _ = server.accept()
+    time.sleep(delay)
+    try:
+        conn.sendall(payload)
+        conn.sendall(b"\n" + g_end_marker.encode('utf-8') + b"\n")
+        # Keep the connection open until the watcher has read everything
+        conn.recv(1)
+    except socket.error:
+        # The watcher gave up
+        pass
+    conn.close()
+
+
+def cpu_time():
+    times = os.times()
+    return times[0] + times[1]
+
+
+def run_burst(fvp_wrapper, name, payload, logdir, timeout, delay=0):
+    """ Send payload after delay seconds to a watcher run by the watcher
+        thread of an FVPWrapper, returning (elapsed, cpu time) or None if the
+        watcher did not receive the end marker within timeout seconds """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('localhost', 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+    thread = threading.Thread(target=serve, args=(server, payload, delay))
+    thread.start()
+
+    wrapper = fvp_wrapper.FVPWrapper("", "bench", logdir, "bench", timeout)
+    watcher = fvp_wrapper.TelnetWatcher(name="bench",
+                                        termfile=os.path.join(logdir, "bench.txt"),
+                                        stop_str=g_end_marker,
+                                        sys_stop_str="/OSCI/SystemC: Simulation stopped by user",
+                                        port=port)
+    startTime = time.time()
+    startCpu = cpu_time()
+    if hasattr(wrapper, "run_watchers"):
+        watcher_thread = wrapper.run_watchers([watcher])
+    else:
+        # One thread per watcher, before the select() loop
+        watcher_thread = wrapper.run_watcher(watcher)
+    watcher_thread.join(timeout)
+    elapsed = time.time() - startTime
+    cpu = cpu_time() - startCpu
+    finished = wrapper.test_complete
+    crashed = not finished and not watcher_thread.is_alive()
+    wrapper.stop()
+    watcher_thread.join()
+    thread.join()
+    server.close()
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    if not finished:
+        print("{0:<14} {1:8.1f} MB: {2} after {3:.1f}s (CPU {4:.1f}s)".format(
+            name, len(payload) / 1e6, "watcher thread failed" if crashed else "not received",
+            elapsed, cpu))
+        return None
+    if payload:
+        print("{0:<14} {1:8.1f} MB in {2:6.3f}s: {3:8.1f} MB/s, CPU {4:6.3f}s, "
+              "peak RSS {5:.1f} MB".format(name, len(payload) / 1e6, elapsed,
+                                           len(payload) / 1e6 / elapsed, cpu, peak))
+    else:
+        print("{0:<14} {1:6.1f}s: CPU {2:6.3f}s ({3:.0f}% of a core)".format(
+            name, elapsed, cpu, 100 * cpu / elapsed))
+    return elapsed, cpu
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TelnetWatcher throughput benchmark")
+    parser.add_argument("--size", type=float, default=8,
+                        help="Size of each burst in MB (default: %(default)s)")
+    parser.add_argument("--idle", type=float, default=5,
+                        help="Duration of the idle case in seconds (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=120,
+                        help="Time given to each case in seconds (default: %(default)s)")
+    parser.add_argument("--wrapper", type=str, default=None,
+                        help="Directory of the fvp_wrapper.py to benchmark (default: "
+                             "the directory of this script)")
+    args = parser.parse_args()
+
+    if args.wrapper is not None:
+        sys.path.insert(0, os.path.abspath(args.wrapper))
+    import fvp_wrapper
+    print("Benchmarking the watcher of {0}".format(
+        os.path.dirname(os.path.abspath(fvp_wrapper.__file__))))
+
+    logdir = tempfile.mkdtemp()
+    try:
+        run_burst(fvp_wrapper, "idle", b"", logdir, args.timeout + args.idle, args.idle)
+        for name, generator in g_bursts:
+            run_burst(fvp_wrapper, name, generator(int(args.size * 1000 * 1000)),
+                      logdir, args.timeout)
+    finally:
+        shutil.rmtree(logdir)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python2.7
+
+__copyright__ = """
+Copyright (c) 2020, Arm Limited and Contributors. All rights reserved.
+
+SPDX-License-Identifier: BSD-3-Clause
+"""
+
+""" workerpool.py:
+Prewarmed worker processes for executing models.
+A model must run in its own process (fm.debug/iris.debug may crash when a
+model is loaded twice in a process), which pays for the import of iris.debug
+before the model can be loaded. A WorkerPool keeps processes forked ahead of
+time, which import the modules while the previous tests run, then wait for
+the single task they execute before exiting. Tasks are handed over through a
+pipe, so only their arguments are pickled; the target is inherited from the
+pool when the worker is forked.
+The worker of a task is a plain multiprocessing.Process, which is joined and
+whose exit code is read as for a process started for the task.
+"""
+
+import importlib
+from collections import deque
+from multiprocessing import Process, Pipe
+
+# Modules imported by the workers before they are given a task
+g_prewarm_modules = ["iris.debug"]
+
+
+def prewarm(modules):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            # Reported when the model is loaded
+            pass
+
+
+def worker_main(conn, target, modules):
+    prewarm(modules)
+    try:
+        task = conn.recv()
+    except EOFError:
+        # The pool was closed
+        return
+    finally:
+        conn.close()
+    if task is None:
+        return
+    args, kwargs = task
+    target(*args, **kwargs)
+
+
+class PrewarmedWorker(object):
+    def __init__(self, target, modules):
+        self.conn, child_conn = Pipe()
+        self.process = Process(target=worker_main, args=(child_conn, target, modules))
+        self.process.start()
+        child_conn.close()
+
+    def run(self, args, kwargs):
+        self.conn.send((args, kwargs))
+        self.conn.close()
+        return self.process
+
+    def discard(self):
+        """ Stop a worker which was not given a task """
+        try:
+            self.conn.send(None)
+            self.conn.close()
+        except (IOError, OSError):
+            pass
+        self.process.join()
+
+
+class WorkerPool(object):
+    def __init__(self, target, size, modules=g_prewarm_modules):
+        """ Keep size workers ready to call target """
+        self.target = target
+        self.size = size
+        self.modules = list(modules)
+        self.idle = deque(PrewarmedWorker(target, self.modules) for _ in range(size))
+
+    def submit(self, args=(), kwargs={}, refill=True):
+        """ Call target(*args, **kwargs) in a prewarmed worker, and return its
+            process. If refill is set, a new worker is started in its place,
+            warming up while the task runs """
+        worker = self.idle.popleft() if self.idle else \
+                 PrewarmedWorker(self.target, self.modules)
+        process = worker.run(args, kwargs)
+        if refill and len(self.idle) < self.size:
+            self.idle.append(PrewarmedWorker(self.target, self.modules))
+        return process
+
+    def close(self):
+        while self.idle:
+            self.idle.popleft().discard()
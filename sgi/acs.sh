@@ -180,6 +180,7 @@ sleep 5
 
 if [ "$ret" != "0" ]; then
 	echo "[ERROR]: ACS test failed or timedout!"
+	archive_uart_logs "$PWD/$platform"
 	exit 1
 else
 	echo "[SUCCESS]: ACS test completed!"
@@ -193,5 +194,8 @@ print_acs_test_summary
 # Get the ACS test results
 get_acs_test_results
 
+# Compress the UART logs, once parsed
+archive_uart_logs "$PWD/$platform"
+
 popd
 exit 0
@@ -153,6 +153,7 @@ sleep 2
 
 if [ "$ret" != "0" ]; then
 	echo "[ERROR]: SCT test failed or timedout!"
+	archive_uart_logs "$PWD/$platform"
 	exit 1
 else
 	echo "[SUCCESS]: SCT test completed!"
@@ -163,5 +164,8 @@ outdir="$PWD/$platform/uefisct"
 # Get the UEFI SCT test results
 get_sct_test_results
 
+# Compress the UART logs, once parsed
+archive_uart_logs "$PWD/$platform"
+
 popd
 exit 0
@@ -35,6 +35,10 @@
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
 
 SGI_TEST_MAX_TIMEOUT=7200
+SGI_SCRIPTS_DIR=$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)
+# Interpreter of iot/scripts/test/logwait.py and logstore.py, which are
+# written for python2.7 (as their shebang says) and also run with python3
+SGI_PYTHON=$(command -v python2.7 || command -v python3 || command -v python)
 CURRENT_DATE_TIME=`date +%Y-%m-%d_%H.%M.%S`
 MYPID=$$
 
@@ -160,10 +164,17 @@ kill_model () {
 }
 
 # parse_log_file: waits until the search string is found in the log file
-#				  or timeout occurs
+#				  or timeout occurs. The log file is followed with
+#				  iot/scripts/test/logwait.py when python is available,
+#				  which also stops waiting when the model (MODEL_PID)
+#				  exits or a failure string is found.
+#				  The search and failure strings are matched
+#				  literally, not as grep regular expressions (ie.
+#				  "." and "[" are plain characters).
 # Arguments: 1. log file name
 #            2. search string
 #            3. timeout
+#            4... failure strings (optional)
 # Return Value: 0 -> Success
 #              -1 -> Failure
 parse_log_file ()
@@ -173,6 +184,8 @@ parse_log_file ()
 	local logfile=$1
 	local search_str=$2
 	local timeout=$3
+	local logwait="$SGI_SCRIPTS_DIR/../iot/scripts/test/logwait.py"
+	local args=()
 
 	if [ "$timeout" -le 0 ] || [ "$timeout" -gt $SGI_TEST_MAX_TIMEOUT ]; then
 		echo -e "\n[WARN] timeout value $timeout is invalid. Setting" \
@@ -180,10 +193,39 @@ parse_log_file ()
 		timeout=$SGI_TEST_MAX_TIMEOUT;
 	fi
 
+	if [ -n "$SGI_PYTHON" ] && [ -f "$logwait" ]; then
+		for fail_str in "${@:4}"; do
+			args+=(--fail "$fail_str")
+		done
+		if [ -n "$MODEL_PID" ] && [ "$MODEL_PID" != "0" ]; then
+			args+=(--pid $MODEL_PID)
+		fi
+		$SGI_PYTHON "$logwait" -q --timeout $timeout "${args[@]}" \
+			"$logfile" "$search_str"
+		case $? in
+			0)
+				return 0
+				;;
+			1)
+				echo -e "\n[ERROR]: ${FUNCNAME[0]}: Failure string found in $logfile!\n"
+				;;
+			3)
+				echo -e "\n[ERROR]: ${FUNCNAME[0]}: Timedout or $logfile may not found!\n"
+				;;
+			4)
+				echo -e "\n[ERROR]: ${FUNCNAME[0]}: Model exited before the search string was found!\n"
+				;;
+			*)
+				echo -e "\n[ERROR]: ${FUNCNAME[0]}: $logwait failed!\n"
+				;;
+		esac
+		return -1
+	fi
+
 	while [  $testdone -ne 0 ]; do
 		sleep 1
 		if ls $logfile 1> /dev/null 2>&1; then
-			tail $logfile | grep -q -s -e "$search_str" > /dev/null 2>&1
+			tail $logfile | grep -q -s -F -e "$search_str" > /dev/null 2>&1
 			testdone=$?
 		fi
 		if [ "$cnt" -ge "$timeout" ]; then
@@ -195,6 +237,33 @@ parse_log_file ()
 	return 0
 }
 
+# archive_uart_logs: replaces the UART log files of this run by compressed,
+#                    indexed log stores (<log file>.lzs), which are queried
+#                    with iot/scripts/test/logstore.py (grep, lines, tail).
+#                    Only done if ARCHIVE_UART_LOGS is set.
+# Arguments: 1. directory of the log files
+archive_uart_logs ()
+{
+	local logdir=$1
+	local logstore="$SGI_SCRIPTS_DIR/../iot/scripts/test/logstore.py"
+
+	if [ -z "$ARCHIVE_UART_LOGS" ]; then
+		return 0
+	fi
+	if [ -z "$SGI_PYTHON" ] || [ ! -f "$logstore" ]; then
+		echo -e "\n[WARN] ${FUNCNAME[0]}: python or $logstore not found," \
+			"UART logs are left uncompressed."
+		return 1
+	fi
+
+	for logfile in $logdir/refinfra-${MYPID}-uart-*; do
+		if [ -f "$logfile" ] && [ "${logfile%.lzs}" == "$logfile" ]; then
+			$SGI_PYTHON "$logstore" pack --remove "$logfile"
+		fi
+	done
+	return 0
+}
+
 ##
 # Get the IP address of the Fast Model running Fedora OS.
 #